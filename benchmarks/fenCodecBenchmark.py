@@ -0,0 +1,85 @@
+"""
+Measures the throughput of the FEN parser (Chessboard.FENToBoard) and serializer (Chessboard.boardToFEN).
+
+The corpus is built by playing random legal moves from a few starting positions with a fixed seed, so every
+run uses the same positions: openings, middlegames with castling rights and en passant squares, and endgames
+with promoted pieces. Every FEN is also checked to come back unchanged after a parse and serialize round trip.
+
+Run from the root of the repository:
+    python -m benchmarks.fenCodecBenchmark
+"""
+import random
+import time
+
+from chessboard import Chessboard
+from moveGenerator import legalMoves
+
+STARTING_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+]
+CORPUS_SIZE = 5000
+
+def buildCorpus(size,seed = 13):
+    """
+    Plays random games and keeps the FEN after every move until the corpus has size FENs
+    """
+    rng = random.Random(seed)
+    chessboard = Chessboard(8,8)
+    corpus = []
+    while len(corpus) < size:
+        chessboard.FENToBoard(rng.choice(STARTING_FENS))
+        for _ in range(rng.randint(1,200)):
+            moves = legalMoves(chessboard)
+            if not moves or len(corpus) >= size:
+                break
+            move = rng.choice(moves)
+            chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+            corpus.append(chessboard.boardToFEN())
+    return corpus
+
+def measureParse(corpus,repeats):
+    chessboard = Chessboard(8,8)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for FEN in corpus:
+            chessboard.FENToBoard(FEN)
+    return repeats * len(corpus) / (time.perf_counter() - start)
+
+def measureSerialize(corpus,repeats):
+    chessboards = []
+    for FEN in corpus:
+        chessboard = Chessboard(8,8)
+        chessboard.FENToBoard(FEN)
+        chessboards.append(chessboard)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for chessboard in chessboards:
+            chessboard.boardToFEN()
+    return repeats * len(chessboards) / (time.perf_counter() - start)
+
+def checkRoundTrip(corpus):
+    """
+    Returns the FENs that change after being parsed and serialized again
+    """
+    chessboard = Chessboard(8,8)
+    changed = []
+    for FEN in corpus:
+        chessboard.FENToBoard(FEN)
+        if chessboard.boardToFEN() != FEN:
+            changed.append(FEN)
+    return changed
+
+def main():
+    corpus = buildCorpus(CORPUS_SIZE)
+    changed = checkRoundTrip(corpus)
+    print("Corpus: {} FENs, {} change after a round trip".format(len(corpus),len(changed)))
+    for FEN in changed[:5]:
+        print("    " + FEN)
+    print("FENToBoard: {:>10.0f} FENs/s".format(measureParse(corpus,5)))
+    print("boardToFEN: {:>10.0f} FENs/s".format(measureSerialize(corpus,5)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures how many times per second Chessboard.FENToBoard can rebuild a board.
+
+The client calls FENToBoard every frame, so this number bounds how much of each frame is spent
+rebuilding the board. The "per piece textures" row reproduces the old behaviour, where every
+piece type constructor loaded and scaled its png from the assets folder.
+
+Run from the root of the repository:
+    python -m benchmarks.fenToBoardBenchmark
+"""
+import os
+import time
+
+import pygame
+
+from chessboard import Chessboard
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "4k3/4P3/8/4K3/8/8/8/8 w - - 0 1",
+]
+
+def loadTexturesPerPiece(chessboard):
+    """
+    Loads one texture per piece on the board, like the piece type constructors used to do
+    """
+    for piece in chessboard.board:
+        if piece:
+            name = type(piece.pieceType).__name__.replace("Night","Knight")
+            texture = pygame.image.load("assets/" + piece.pieceType.color + name + ".png")
+            pygame.transform.scale_by(texture,1.5)
+
+def measure(iterations,perPieceTextures):
+    chessboard = Chessboard(8,8)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for FEN in FENS:
+            chessboard.FENToBoard(FEN)
+            if perPieceTextures:
+                loadTexturesPerPiece(chessboard)
+    elapsed = time.perf_counter() - start
+    return iterations * len(FENS) / elapsed
+
+def main():
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    shared = measure(2000,False)
+    perPiece = measure(50,True)
+    print("FENToBoard, shared piece types:  {:>10.0f} boards/s".format(shared))
+    print("FENToBoard, per piece textures:  {:>10.0f} boards/s".format(perPiece))
+    print("Speedup: {:.1f}x".format(shared / perPiece))
+
+if __name__ == "__main__":
+    main()
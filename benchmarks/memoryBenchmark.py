@@ -0,0 +1,104 @@
+"""
+Measures the memory used by the rules engine with tracemalloc: the bytes a Chessboard holds once a position is
+loaded, and the memory blocks allocated by one call of moveGenerator.legalMoves.
+
+The "dict piece with a set" row reproduces the old Piece, which had row, column and position attributes in an
+instance dictionary plus its own set of possibilities, to compare it with the slotted Piece.
+
+Run from the root of the repository:
+    python -m benchmarks.memoryBenchmark
+"""
+import tracemalloc
+
+from chessboard import Chessboard
+from moveGenerator import legalMoves
+from pieces import Piece,PIECE_TYPES
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+]
+BOARDS = 500
+GENERATIONS = 500
+
+class DictPiece:
+    """
+    The layout of Piece before it was slotted
+    """
+    def __init__(self,square,pieceType):
+        self.row = square // 8
+        self.column = square % 8
+        self.position = (self.column,self.row)
+        self.pieceType = pieceType
+        self.currentPossibilities = set()
+
+def allocatedSince(before):
+    """
+    Returns the memory blocks and bytes allocated since a snapshot and still alive
+    """
+    stats = tracemalloc.take_snapshot().compare_to(before,"filename")
+    return sum(stat.count_diff for stat in stats),sum(stat.size_diff for stat in stats)
+
+def measureBoards(FEN,pieceClass):
+    """
+    Returns the bytes held by each board of a FEN, with its pieces built with pieceClass
+    """
+    chessboards = [None]*BOARDS
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(BOARDS):
+        chessboard = Chessboard(8,8)
+        chessboard.FENToBoard(FEN)
+        if pieceClass != Piece:
+            chessboard.board = [pieceClass(piece.square,piece.pieceType) if piece else None for piece in chessboard.board]
+        chessboards[i] = chessboard
+    _,size = allocatedSince(before)
+    tracemalloc.stop()
+    return size / BOARDS
+
+def measurePiece(pieceClass):
+    """
+    Returns the bytes held by one piece
+    """
+    pieces = [None]*BOARDS
+    pieceType = PIECE_TYPES["P"]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(BOARDS):
+        pieces[i] = pieceClass(i % 64,pieceType)
+    _,size = allocatedSince(before)
+    tracemalloc.stop()
+    return size / BOARDS
+
+def measureGeneration(FEN):
+    """
+    Returns the number of legal moves of a FEN, the memory blocks and bytes that one legalMoves call leaves
+        allocated (the returned moves), and the extra bytes it needs while it runs
+    """
+    chessboard = Chessboard(8,8)
+    chessboard.FENToBoard(FEN)
+    results = [None]*GENERATIONS
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start,_ = tracemalloc.get_traced_memory()
+    for i in range(GENERATIONS):
+        results[i] = legalMoves(chessboard)
+    end,peak = tracemalloc.get_traced_memory()
+    blocks,size = allocatedSince(before)
+    tracemalloc.stop()
+    return len(results[0]),blocks / GENERATIONS,size / GENERATIONS,peak - end
+
+def main():
+    print("{:<70} {:>12} {:>12}".format("Bytes per board","slotted","dict + set"))
+    for FEN in FENS:
+        print("{:<70} {:>12.0f} {:>12.0f}".format(FEN,measureBoards(FEN,Piece),measureBoards(FEN,DictPiece)))
+    print("{:<70} {:>12.0f} {:>12.0f}".format("Bytes per piece",measurePiece(Piece),measurePiece(DictPiece)))
+    print()
+    print("{:<70} {:>6} {:>8} {:>8} {:>10}".format("Allocations per legalMoves call","moves","blocks","bytes","transient"))
+    for FEN in FENS:
+        moves,blocks,size,peak = measureGeneration(FEN)
+        print("{:<70} {:>6} {:>8.0f} {:>8.0f} {:>10.0f}".format(FEN,moves,blocks,size,peak))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures how the parallel search scales with the number of cores: every position is searched to the same depth with
+1, 2, ... N worker processes, reporting the time to reach that depth, the speedup over one worker and the nodes per
+second of all the workers together. The workers are started before the clock starts, so only the search is timed.
+
+More workers than cores only share the same cores, so N defaults to the cores of the machine.
+
+Run from the root of the repository:
+    python -m benchmarks.parallelBenchmark
+    python -m benchmarks.parallelBenchmark --cores 8
+"""
+import argparse
+import os
+
+from chessboard import Chessboard
+from parallel import ParallelSearch
+
+FENS = [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",5),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",6),
+    ("r1bq1rk1/pp2bppp/2n1pn2/2pp4/3P4/2PBPN2/PP1N1PPP/R2QK2R w KQ - 0 8",4),
+]
+
+def measure(cores):
+    """
+    Returns the seconds and nodes every position takes to reach its depth with a number of workers
+    """
+    measurements = []
+    for FEN,depth in FENS:
+        chessboard = Chessboard(8,8)
+        chessboard.FENToBoard(FEN)
+        #A new table for every position, so no search starts with the results of the last one
+        with ParallelSearch(cores,10**6,depth) as search:
+            result = search.search(chessboard)
+        measurements.append((result.elapsed,result.nodes))
+    return measurements
+
+def main():
+    parser = argparse.ArgumentParser(description = "Scaling of the parallel search from 1 to N cores")
+    parser.add_argument("--cores",type = int,default = os.cpu_count() or 1,help = "largest number of worker processes")
+    arguments = parser.parse_args()
+
+    print("Machine cores: {}".format(os.cpu_count()))
+    print("{:>5} {:>10} {:>8} {:>10}".format("cores","time","speedup","nodes/s"))
+    baseline = None
+    for cores in range(1,max(1,arguments.cores) + 1):
+        measurements = measure(cores)
+        elapsed = sum(seconds for seconds,_ in measurements)
+        nodes = sum(nodes for _,nodes in measurements)
+        if baseline == None:
+            baseline = elapsed
+        print("{:>5} {:>9.2f}s {:>7.2f}x {:>10.0f}".format(cores,elapsed,baseline / elapsed,nodes / elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares the binary wire protocol (protocol.py) with pickle, which the server and clients used before: the bytes
+of every message, how many messages per second are encoded and decoded, and a send and receive through a local
+socket pair, the way the server loop does it. Pickle sends the states as they were, with the position as a FEN,
+the binary protocol sends the packed position of Chessboard.boardToPosition. A second table times what each
+format costs the boards: the server writing the position of every move and the client loading it.
+
+The game states come from random games played with a fixed seed, the inputs are clicks on random squares.
+
+Run from the root of the repository:
+    python -m benchmarks.protocolBenchmark
+"""
+import pickle
+import random
+import socket
+import time
+
+from chessboard import Chessboard
+from moveGenerator import legalMoves
+from protocol import MessageStream,encodeMessage,decodeMessage,STATE,INPUT
+
+MESSAGES = 2000
+REPEATS = 10
+
+def buildMessages(count,seed = 3):
+    """
+    Plays random games and returns count states as the server sends them with pickle (a FEN) and with the binary
+        protocol (a packed position), and count inputs as the clients send them
+    """
+    rng = random.Random(seed)
+    chessboard = Chessboard(8,8)
+    eaten = {letter: 0 for letter in "rbnqkpRBNQKP"}
+    states = []
+    pickleStates = []
+    while len(states) < count:
+        chessboard.FENToBoard("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        for _ in range(rng.randint(10,120)):
+            moves = legalMoves(chessboard)
+            if not moves or len(states) >= count:
+                break
+            move = rng.choice(moves)
+            captured = chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+            if captured:
+                eaten[captured.pieceType.letter] += 1
+            states.append({"position": chessboard.boardToPosition(),"toMove": chessboard.toMove,"selectedPiecePos": rng.choice((-1,move.toSquare)),
+                           "eaten": dict(eaten),"checkmate": None,"restart": False,"quit": False})
+            pickleStates.append(dict(states[-1],FEN = chessboard.boardToFEN()))
+            del pickleStates[-1]["position"]
+    inputs = [{"color": rng.choice(("white","black")),"clickPos": rng.choice(((-1,-1),(rng.randrange(800),rng.randrange(800)))),"wantsToPlay": None}
+              for _ in range(count)]
+    return states,pickleStates,inputs
+
+def rate(function,items):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for item in items:
+            function(item)
+    return REPEATS * len(items) / (time.perf_counter() - start)
+
+def socketRate(messages,binary):
+    """
+    Returns the messages per second sent and received through a socket pair, one at a time like the server loop
+    """
+    sender,receiver = socket.socketpair()
+    stream = MessageStream(receiver)
+    try:
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            for message in messages:
+                sender.sendall(message)
+                if binary:
+                    stream.receive()
+                else:
+                    pickle.loads(receiver.recv(4096))
+        return REPEATS * len(messages) / (time.perf_counter() - start)
+    finally:
+        sender.close()
+        receiver.close()
+
+def boardRates(states,pickleStates):
+    """
+    Returns the positions per second the server writes and the client loads, as a FEN and as a packed position
+    """
+    server = Chessboard(8,8)
+    client = Chessboard(8,8)
+    server.FENToBoard(pickleStates[0]["FEN"])
+    FENs = [state["FEN"] for state in pickleStates[:MESSAGES // 10]]
+    positions = [state["position"] for state in states[:MESSAGES // 10]]
+    return ((rate(lambda _: server.boardToFEN(),FENs),rate(client.FENToBoard,FENs)),
+            (rate(lambda _: server.boardToPosition(),positions),rate(client.positionToBoard,positions)))
+
+def main():
+    states,pickleStates,inputs = buildMessages(MESSAGES)
+    print("{:<8} {:<8} {:>8} {:>12} {:>12} {:>12}".format("Message","Format","bytes","encode/s","decode/s","socket/s"))
+    for name,messageType,items,pickleItems in (("state",STATE,states,pickleStates),("input",INPUT,inputs,inputs)):
+        pickled = [pickle.dumps(item) for item in pickleItems]
+        encoded = [encodeMessage(messageType,item) for item in items]
+        assert all(decodeMessage(message)[1] == dict(item,promotion = None) if messageType == INPUT else decodeMessage(message)[1] == item
+                   for message,item in zip(encoded,items))
+        print("{:<8} {:<8} {:>8.1f} {:>12.0f} {:>12.0f} {:>12.0f}".format(name,"pickle",sum(map(len,pickled)) / len(items),
+              rate(pickle.dumps,pickleItems),rate(pickle.loads,pickled),socketRate(pickled,False)))
+        print("{:<8} {:<8} {:>8.1f} {:>12.0f} {:>12.0f} {:>12.0f}".format(name,"binary",sum(map(len,encoded)) / len(items),
+              rate(lambda item: encodeMessage(messageType,item),items),rate(decodeMessage,encoded),socketRate(encoded,True)))
+    (FENWrite,FENLoad),(positionWrite,positionLoad) = boardRates(states,pickleStates)
+    print()
+    print("{:<17} {:>12} {:>12}".format("Board","write/s","load/s"))
+    print("{:<17} {:>12.0f} {:>12.0f}".format("FEN",FENWrite,FENLoad))
+    print("{:<17} {:>12.0f} {:>12.0f}".format("packed position",positionWrite,positionLoad))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Measures the import cost of server.py, which is what the headless game server pays on startup.
+
+The "with pygame" row imports pygame first, which is what importing server.py cost when the rules
+core (pieces, chessboard, serverInterface) and server.py itself depended on pygame. Each import runs
+in a fresh interpreter, and the time of an empty interpreter is subtracted.
+
+Run from the root of the repository:
+    python -m benchmarks.serverStartupBenchmark
+"""
+import os
+import subprocess
+import sys
+import time
+
+RUNS = 10
+
+def timeImport(code):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable,"-c",code],check=True,stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    #The rules core must not pull pygame in
+    subprocess.run([sys.executable,"-c","import sys, server; assert 'pygame' not in sys.modules, 'server.py imports pygame'"],check=True)
+
+    empty = timeImport("pass")
+    headless = timeImport("import server") - empty
+    withPygame = timeImport("import pygame, server") - empty
+    print("import server (headless):     {:>8.1f} ms".format(headless * 1000))
+    print("import server (with pygame):  {:>8.1f} ms".format(withPygame * 1000))
+    print("Speedup: {:.1f}x".format(withPygame / headless))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Measures what the transposition table saves the engine: every position is searched to the same depth without the
+table and with it, reporting the time to reach that depth, the nodes searched and the hit rate of the table (the
+lookups that found their position). The positions are fixed, so the runs can be compared between changes.
+
+Run from the root of the repository:
+    python -m benchmarks.transpositionBenchmark
+"""
+import time
+
+from chessboard import Chessboard
+from engine import Engine
+
+FENS = [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",5),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",3),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",6),
+    ("r1bq1rk1/pp2bppp/2n1pn2/2pp4/3P4/2PBPN2/PP1N1PPP/R2QK2R w KQ - 0 8",4),
+    ("8/8/4k3/8/2K5/8/3P4/8 w - - 0 1",10),
+]
+TABLE_SIZE = 16
+
+def measure(FEN,depth,tableSize):
+    """
+    Searches a position to a depth and returns the seconds taken, the nodes searched and the hit rate of the table
+    """
+    chessboard = Chessboard(8,8)
+    chessboard.FENToBoard(FEN)
+    #The budget is large enough for the search to always reach the depth
+    engine = Engine(10**6,depth,tableSize = tableSize)
+    start = time.perf_counter()
+    result = engine.search(chessboard)
+    elapsed = time.perf_counter() - start
+    hitRate = engine.table.hits / engine.table.probes if engine.table and engine.table.probes else 0
+    return elapsed,result.nodes,hitRate
+
+def main():
+    print("{:<72} {:>5} {:>9} {:>9} {:>9} {:>9} {:>8}".format("Position","depth","time","nodes","time TT","nodes TT","hits"))
+    totals = [0,0,0,0]
+    for FEN,depth in FENS:
+        elapsed,nodes,_ = measure(FEN,depth,0)
+        elapsedTable,nodesTable,hitRate = measure(FEN,depth,TABLE_SIZE)
+        for i,value in enumerate((elapsed,nodes,elapsedTable,nodesTable)):
+            totals[i] += value
+        print("{:<72} {:>5} {:>8.2f}s {:>9} {:>8.2f}s {:>9} {:>7.1%}".format(FEN,depth,elapsed,nodes,elapsedTable,nodesTable,hitRate))
+    print("{:<72} {:>5} {:>8.2f}s {:>9} {:>8.2f}s {:>9}".format("Total","",*totals))
+    print("Time to depth with the table: {:.0%} of the time without it".format(totals[2] / totals[0]))
+
+if __name__ == "__main__":
+    main()
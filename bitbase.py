@@ -0,0 +1,538 @@
+"""
+Endgame bitbases: for every position of an endgame of a king and one or two pieces against a lone king (KPK, KQK,
+KRK, KBNK...) one bit that says if the side with the pieces wins with best play (1) or not (0: draw or illegal
+position). They are generated offline by retrograde analysis and saved as files of bits, so looking a position up
+is reading one bit of a memory mapped file.
+
+Only the defending king is ever alone: the tables cover one side with pieces against a bare king, so a position is
+a win for the side with the pieces or a draw, and the side to move loses only when it is the bare king. Endings with
+material on both sides (KQKR, KRKP, KPKP...) would need the moves of both sides, a third result and captures into
+every smaller table, and are not covered: Bitbases.probe returns None for them and they are searched as usual.
+
+Tables are built for white having the pieces, a position where black has them is looked up mirrored. The index of a
+position is 2*(wk + 64*bk + 4096*p1 + 262144*p2) + blackToMove, with the squares of location.py.
+
+The generation is pure Python, about 40000 positions per second and process, so it is bounded: a table can have at
+most maxPositions positions (MAX_TABLE_POSITIONS, the 33.5 million of a 4 piece table, 2 bytes of memory each while
+it is generated) and the whole generation, with the smaller tables it needs, stops with a TimeoutError after
+timeLimit seconds (DEFAULT_TIME_LIMIT). A table is only written once it is complete.
+
+Generation:
+    1. Every position is visited once (split between processes) to find the positions already won: black is
+        checkmated, every move of black loses (taking a piece into a lost smaller endgame), or white promotes into a
+        won endgame. Black to move positions also count their moves.
+    2. Going backwards from the won positions: a white to move position is won if a white move reaches a won
+        position, a black to move one when its last move that didnt lose reaches a won position.
+The smaller endgames reached by captures and promotions are generated first.
+
+Usage, from the root of the repository:
+    python bitbase.py --tables KQK KRK KPK --processes 4       Generates the tables in the bitbases folder
+    python bitbase.py --tables KBNK --max-seconds 7200          Allows a longer generation
+    python bitbase.py --probe "8/8/8/4k3/8/8/4P3/4K3 w - - 0 1"   Looks a position up
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque
+from location import SQUARE_Y,KNIGHT_TARGETS,KING_TARGETS,PAWN_CAPTURES,RAYS,ROOK_RAYS,BISHOP_RAYS
+from chessboard import Chessboard
+
+DEFAULT_DIRECTORY = "bitbases"
+EXTENSION = ".bitbase"
+#Pieces of a table name, in the order they are written (KQRK, not KRQK)
+PIECE_ORDER = "QRBNP"
+MAX_PIECES = 4
+PROMOTIONS = ("Q","R")
+#Positions of a generation task, a chunk of the first pass. The time limit is also checked every CHUNK_SIZE
+#positions of the second pass
+CHUNK_SIZE = 1 << 16
+#Most positions of a table that is generated, and seconds a generation can take
+MAX_TABLE_POSITIONS = 2 * 64**MAX_PIECES
+DEFAULT_TIME_LIMIT = 3600.0
+
+def buildAttackLines():
+    """
+    Builds, for every white piece letter and square, the squares it attacks on an empty board and the squares
+        between that must be empty for the attack
+
+    Returns
+    --------
+    dict[str] = tuple<dict[int] = tuple<int>>
+        ATTACK_LINES[letter][square][target] are the squares between square and target
+    """
+    lines = {}
+    for letter,directions in (("Q",ROOK_RAYS + BISHOP_RAYS),("R",ROOK_RAYS),("B",BISHOP_RAYS)):
+        table = []
+        for square in range(64):
+            targets = {}
+            for direction in directions:
+                ray = RAYS[direction][square]
+                for i,target in enumerate(ray):
+                    targets[target] = ray[:i]
+            table.append(targets)
+        lines[letter] = tuple(table)
+    lines["N"] = tuple({target: () for target in KNIGHT_TARGETS[square]} for square in range(64))
+    lines["P"] = tuple({target: () for target in PAWN_CAPTURES["white"][square]} for square in range(64))
+    return lines
+
+ATTACK_LINES = buildAttackLines()
+KING_SETS = tuple(frozenset(targets) for targets in KING_TARGETS)
+
+def tablePieces(name):
+    """
+    Returns the white pieces of a table name, e.g. ("B","N") for "KBNK"
+
+    Raises
+    -------
+    ValueError
+        If the name isnt a king and pieces against a king, in PIECE_ORDER, with at most MAX_PIECES pieces in total
+    """
+    if type(name) != str:
+        raise ValueError("The table name must be of type string, current type is " + str(type(name)))
+    pieces = tuple(name[1:-1])
+    if (len(name) < 3 or name[0] != "K" or name[-1] != "K" or len(name) > MAX_PIECES
+            or any(letter not in PIECE_ORDER for letter in pieces) or list(pieces) != sorted(pieces,key = PIECE_ORDER.index)):
+        raise ValueError("Invalid table name: {}, has to be like KPK or KBNK".format(name))
+    return pieces
+
+def tableName(pieces):
+    """
+    Returns the name of the table of some white pieces, in any order
+    """
+    return "K" + "".join(sorted(pieces,key = PIECE_ORDER.index)) + "K"
+
+def positionIndex(blackToMove,whiteKing,blackKing,squares):
+    """
+    Returns the index of a position in its table, squares being the squares of the pieces in the order of the name
+    """
+    index = whiteKing + 64*blackKing
+    factor = 4096
+    for square in squares:
+        index += factor*square
+        factor *= 64
+    return 2*index + blackToMove
+
+def canonicalIndex(blackToMove,whiteKing,blackKing,pieces):
+    """
+    Returns the name of the table and the index of a position with (letter, square) pieces in any order
+    """
+    pieces = sorted(pieces,key = lambda piece: PIECE_ORDER.index(piece[0]))
+    return tableName(letter for letter,_ in pieces),positionIndex(blackToMove,whiteKing,blackKing,[square for _,square in pieces])
+
+def decodeIndex(index,pieceCount):
+    """
+    Returns (blackToMove, whiteKing, blackKing, squares) of an index, the inverse of positionIndex
+    """
+    rest = index >> 1
+    return index & 1,rest & 63,(rest >> 6) & 63,[(rest >> (12 + 6*i)) & 63 for i in range(pieceCount)]
+
+def isAttacked(square,whiteKing,pieces,occupied):
+    """
+    Returns True if a square is attacked by white
+
+    Parameters
+    ----------
+    square : int
+        The square
+    whiteKing : int
+        The square of the white king
+    pieces : list<tuple>
+        (letter, square) of the white pieces
+    occupied : set<int>
+        The occupied squares, that block the rays
+    """
+    if square in KING_SETS[whiteKing]:
+        return True
+    for letter,pieceSquare in pieces:
+        between = ATTACK_LINES[letter][pieceSquare].get(square)
+        if between != None and not any(blocker in occupied for blocker in between):
+            return True
+    return False
+
+def pieceSources(letter,square,occupied):
+    """
+    Returns the squares a white piece on square could have come from with a move that didnt capture
+    """
+    if letter == "P":
+        sources = []
+        if SQUARE_Y[square] < 6 and square + 8 not in occupied:
+            sources.append(square + 8)
+            #Double step from the 2nd rank
+            if SQUARE_Y[square] == 4 and square + 16 not in occupied:
+                sources.append(square + 16)
+        return sources
+    if letter == "N":
+        return [source for source in KNIGHT_TARGETS[square] if source not in occupied]
+    sources = []
+    for direction in (ROOK_RAYS if letter == "R" else BISHOP_RAYS if letter == "B" else ROOK_RAYS + BISHOP_RAYS):
+        for source in RAYS[direction][square]:
+            if source in occupied:
+                break
+            sources.append(source)
+    return sources
+
+class Bitbase:
+    """
+    One table opened read only with mmap
+
+    Attributes
+    ----------
+    name : str
+        The name of the table, e.g. "KPK"
+    pieces : tuple<str>
+        The white pieces of the table
+    memory : mmap
+        The bits of the table
+
+    Methods
+    -------
+    isWin(self,index)
+        Returns True if white wins the position of an index
+    close(self)
+        Closes the file
+    """
+    def __init__(self,path):
+        self.name = os.path.basename(path)[:-len(EXTENSION)]
+        self.pieces = tablePieces(self.name)
+        self.file = open(path,"rb")
+        size = 2 * 64**(len(self.pieces) + 2) // 8
+        if os.fstat(self.file.fileno()).st_size != size:
+            self.file.close()
+            raise ValueError("{} should have {} bytes".format(path,size))
+        self.memory = mmap.mmap(self.file.fileno(),0,access = mmap.ACCESS_READ)
+
+    def isWin(self,index):
+        return self.memory[index >> 3] >> (index & 7) & 1 == 1
+
+    def close(self):
+        self.memory.close()
+        self.file.close()
+
+class Bitbases:
+    """
+    Every table of a directory, to look up positions of any of their endgames from either side
+
+    Attributes
+    ----------
+    tables : dict[str] = Bitbase
+        The tables by name
+    maxPieces : int
+        The most pieces, kings included, of a position that can be in a table
+
+    Methods
+    -------
+    probe(self,chessboard)
+        Returns 1 if the player to move wins, -1 if it loses, 0 if its a draw or None if there is no table
+    close(self)
+        Closes every table
+    """
+    def __init__(self,directory = DEFAULT_DIRECTORY):
+        self.tables = {}
+        if os.path.isdir(directory):
+            for fileName in sorted(os.listdir(directory)):
+                if fileName.endswith(EXTENSION):
+                    table = Bitbase(os.path.join(directory,fileName))
+                    self.tables[table.name] = table
+        self.maxPieces = max((len(table.pieces) + 2 for table in self.tables.values()),default = 2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exception):
+        self.close()
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def lookup(self,blackToMove,whiteKing,blackKing,pieces):
+        """
+        Returns True if white wins a position with (letter, square) white pieces, None if there is no table
+        """
+        if not pieces:
+            return False
+        name,index = canonicalIndex(blackToMove,whiteKing,blackKing,pieces)
+        table = self.tables.get(name)
+        return table.isWin(index) if table else None
+
+    def probe(self,chessboard):
+        """
+        Looks a position up. Castling rights and the move counters are ignored, there is no en passant with a
+            lone king
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The position
+
+        Returns
+        --------
+        int
+            1 if the player to move wins, -1 if it loses, 0 if its a draw and None if the position isnt in a table
+        """
+        whitePieces = []
+        blackPieces = []
+        whiteKing = blackKing = None
+        for square,piece in enumerate(chessboard.board):
+            if piece:
+                letter = piece.pieceType.letter
+                if letter == "K":
+                    whiteKing = square
+                elif letter == "k":
+                    blackKing = square
+                elif letter.isupper():
+                    whitePieces.append((letter,square))
+                else:
+                    blackPieces.append((letter.upper(),square))
+                if len(whitePieces) + len(blackPieces) + 2 > self.maxPieces:
+                    return None
+        if whitePieces and blackPieces:
+            return None
+        if blackPieces:
+            #Black has the pieces: mirror the board vertically so they become white pieces
+            strongColor = "black"
+            result = self.lookup(chessboard.toMove == "white",blackKing ^ 56,whiteKing ^ 56,[(letter,square ^ 56) for letter,square in blackPieces])
+        else:
+            strongColor = "white"
+            result = self.lookup(chessboard.toMove == "black",whiteKing,blackKing,whitePieces)
+        if result == None:
+            return None
+        if not result:
+            return 0
+        return 1 if chessboard.toMove == strongColor else -1
+
+def firstPass(task):
+    """
+    Visits a chunk of positions of a table. Returns the start of the chunk, the number of moves of black that dont
+        lose for every position (0 for the rest) and the positions already won
+    """
+    pieces,start,end,directory = task
+    #The tables reached by black taking a piece or a pawn promoting
+    smaller = Bitbases(directory)
+    counts = bytearray(end - start)
+    won = []
+    pieceCount = len(pieces)
+    for index in range(start,end):
+        blackToMove,whiteKing,blackKing,squares = decodeIndex(index,pieceCount)
+        occupied = {whiteKing,blackKing,*squares}
+        if len(occupied) != pieceCount + 2 or blackKing in KING_SETS[whiteKing]:
+            continue
+        if any(letter == "P" and (SQUARE_Y[square] == 0 or SQUARE_Y[square] == 7) for letter,square in zip(pieces,squares)):
+            continue
+        whitePieces = list(zip(pieces,squares))
+        if not blackToMove:
+            #Illegal if black is in check with white to move
+            occupied.discard(blackKing)
+            if isAttacked(blackKing,whiteKing,whitePieces,occupied):
+                continue
+            occupied.add(blackKing)
+            promotes = False
+            for i,(letter,square) in enumerate(whitePieces):
+                if letter == "P" and SQUARE_Y[square] == 1 and square - 8 not in occupied:
+                    for promotion in PROMOTIONS:
+                        if smaller.lookup(1,whiteKing,blackKing,whitePieces[:i] + [(promotion,square - 8)] + whitePieces[i + 1:]):
+                            promotes = True
+            if promotes:
+                won.append(index)
+            continue
+
+        occupied.discard(blackKing)
+        legal = 0
+        notLosing = 0
+        for target in KING_TARGETS[blackKing]:
+            if target == whiteKing or target in KING_SETS[whiteKing]:
+                continue
+            if target in occupied:
+                remaining = [piece for piece in whitePieces if piece[1] != target]
+                if isAttacked(target,whiteKing,remaining,occupied):
+                    continue
+                legal += 1
+                if not smaller.lookup(0,whiteKing,target,remaining):
+                    notLosing += 1
+            elif not isAttacked(target,whiteKing,whitePieces,occupied):
+                legal += 1
+                notLosing += 1
+        if legal == 0:
+            #Checkmate, a stalemate is a draw
+            if isAttacked(blackKing,whiteKing,whitePieces,occupied):
+                won.append(index)
+        elif notLosing == 0:
+            won.append(index)
+        counts[index - start] = notLosing
+    smaller.close()
+    return start,bytes(counts),won
+
+def checkDeadline(deadline,name):
+    """
+    Raises TimeoutError if the deadline (a time.perf_counter value, None for none) has passed while generating name
+    """
+    if deadline != None and time.perf_counter() > deadline:
+        raise TimeoutError("The generation of {} ran out of time, nothing was written for it".format(name))
+
+def generate(name,directory = DEFAULT_DIRECTORY,processes = 1,report = print,timeLimit = DEFAULT_TIME_LIMIT,
+             maxPositions = MAX_TABLE_POSITIONS,deadline = None):
+    """
+    Generates a table and saves it in directory, after the smaller tables it depends on if they arent there yet
+
+    Parameters
+    ----------
+    name : str
+        The name of the table, e.g. "KPK"
+    directory : str
+        The directory of the tables
+    processes : int
+        The processes that share the first pass
+    report : function
+        Called with a line of progress, None to stay silent
+    timeLimit : float
+        The seconds the generation can take, the smaller tables included. None for no limit
+    maxPositions : int
+        The most positions of a table, checked before anything is generated
+    deadline : float
+        The time.perf_counter value the generation has to end by, used instead of timeLimit by the generations
+        of the smaller tables
+
+    Returns
+    --------
+    str
+        The path of the table
+
+    Raises
+    -------
+    ValueError
+        If the name isnt valid or the table has more than maxPositions positions
+    TimeoutError
+        If the generation takes longer than timeLimit, the tables finished until then are kept
+    """
+    pieces = tablePieces(name)
+    size = 2 * 64**(len(pieces) + 2)
+    if size > maxPositions:
+        raise ValueError("{} has {} positions, more than the limit of {}".format(name,size,maxPositions))
+    if deadline == None and timeLimit != None:
+        deadline = time.perf_counter() + timeLimit
+    os.makedirs(directory,exist_ok = True)
+    path = os.path.join(directory,name + EXTENSION)
+    if os.path.exists(path):
+        return path
+    #Tables after a capture or a promotion
+    for i,letter in enumerate(pieces):
+        remaining = pieces[:i] + pieces[i + 1:]
+        if remaining:
+            generate(tableName(remaining),directory,processes,report,maxPositions = maxPositions,deadline = deadline)
+        if letter == "P":
+            for promotion in PROMOTIONS:
+                generate(tableName(remaining + (promotion,)),directory,processes,report,maxPositions = maxPositions,deadline = deadline)
+
+    start = time.perf_counter()
+    counts = bytearray(size)
+    won = bytearray(size)
+    queue = deque()
+    tasks = [(pieces,chunk,min(chunk + CHUNK_SIZE,size),directory) for chunk in range(0,size,CHUNK_SIZE)]
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.imap_unordered(firstPass,tasks)
+            for chunk,chunkCounts,chunkWon in results:
+                counts[chunk:chunk + len(chunkCounts)] = chunkCounts
+                queue.extend(chunkWon)
+                #Leaving the pool terminates the processes still working
+                checkDeadline(deadline,name)
+    else:
+        for task in tasks:
+            chunk,chunkCounts,chunkWon = firstPass(task)
+            counts[chunk:chunk + len(chunkCounts)] = chunkCounts
+            queue.extend(chunkWon)
+            checkDeadline(deadline,name)
+    for index in queue:
+        won[index] = 1
+
+    pieceCount = len(pieces)
+    visited = 0
+    while queue:
+        visited += 1
+        if visited % CHUNK_SIZE == 0:
+            checkDeadline(deadline,name)
+        index = queue.popleft()
+        blackToMove,whiteKing,blackKing,squares = decodeIndex(index,pieceCount)
+        occupied = {whiteKing,blackKing,*squares}
+        if blackToMove:
+            #White moved into this won position: the positions before that move are won
+            whitePieces = list(zip(pieces,squares))
+            for source in KING_TARGETS[whiteKing]:
+                if source in occupied or source in KING_SETS[blackKing]:
+                    continue
+                before = occupied - {whiteKing} | {source}
+                if not isAttacked(blackKing,source,whitePieces,before - {blackKing}):
+                    previous = positionIndex(0,source,blackKing,squares)
+                    if not won[previous]:
+                        won[previous] = 1
+                        queue.append(previous)
+            for i,(letter,square) in enumerate(whitePieces):
+                for source in pieceSources(letter,square,occupied):
+                    moved = whitePieces[:i] + [(letter,source)] + whitePieces[i + 1:]
+                    before = occupied - {square,blackKing} | {source}
+                    if not isAttacked(blackKing,whiteKing,moved,before):
+                        previous = positionIndex(0,whiteKing,blackKing,squares[:i] + [source] + squares[i + 1:])
+                        if not won[previous]:
+                            won[previous] = 1
+                            queue.append(previous)
+        else:
+            #Black moved into this won position: one less move that doesnt lose for the positions before
+            for source in KING_TARGETS[blackKing]:
+                if source in occupied or source in KING_SETS[whiteKing]:
+                    continue
+                previous = positionIndex(1,whiteKing,source,squares)
+                if not won[previous]:
+                    counts[previous] -= 1
+                    if counts[previous] == 0:
+                        won[previous] = 1
+                        queue.append(previous)
+
+    bits = bytearray(size // 8)
+    for index in range(size):
+        if won[index]:
+            bits[index >> 3] |= 1 << (index & 7)
+    with open(path + ".tmp","wb") as file:
+        file.write(bits)
+    os.replace(path + ".tmp",path)
+    if report:
+        report("{}: {} won positions, generated in {:.1f}s".format(name,sum(won),time.perf_counter() - start))
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description = "Generates and probes endgame bitbases")
+    parser.add_argument("--tables",nargs = "*",default = ["KQK","KRK","KPK"],help = "tables to generate, e.g. KPK KBNK")
+    parser.add_argument("--directory",default = DEFAULT_DIRECTORY,help = "directory of the tables")
+    parser.add_argument("--processes",type = int,default = os.cpu_count() or 1,help = "processes of the generation")
+    parser.add_argument("--probe",metavar = "FEN",help = "position to look up instead of generating")
+    parser.add_argument("--max-seconds",type = float,default = DEFAULT_TIME_LIMIT,help = "seconds the generation of each table can take, with the tables it needs")
+    arguments = parser.parse_args()
+
+    if arguments.probe:
+        chessboard = Chessboard(8,8)
+        chessboard.FENToBoard(arguments.probe)
+        with Bitbases(arguments.directory) as bitbases:
+            result = bitbases.probe(chessboard)
+        print({None: "Not in the bitbases",1: "The player to move wins",0: "Draw",-1: "The player to move loses"}[result])
+        return 0
+    if arguments.processes < 1:
+        parser.error("processes must be at least 1")
+    for name in arguments.tables:
+        try:
+            tablePieces(name)
+        except ValueError as error:
+            parser.error(str(error))
+    if arguments.max_seconds <= 0:
+        parser.error("max-seconds must be positive")
+    for name in arguments.tables:
+        try:
+            generate(name,arguments.directory,arguments.processes,timeLimit = arguments.max_seconds)
+        except TimeoutError as error:
+            print(error)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
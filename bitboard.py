@@ -0,0 +1,356 @@
+"""
+Squares are numbered from 0 to 63 as in location.py and Chessboard.board: square = y*8 + x, so a8 is 0,
+h8 is 7 and h1 is 63. Bit number n of a bitboard is set if square n is in the set
+"""
+import location
+from location import KING_STEPS,KNIGHT_TARGETS,KING_TARGETS,PAWN_CAPTURES
+from chessboard import Chessboard
+from pieces import Piece,PIECE_TYPES
+
+
+#Directions as (dx,dy) in grid coordinates
+ROOK_DIRECTIONS = KING_STEPS[:4]
+BISHOP_DIRECTIONS = KING_STEPS[4:]
+
+def buildBitboards(table):
+    """
+    Converts a table of location.py, with the target squares of every square, into bitboards
+
+    Returns
+    --------
+    list<int>
+        The 64 bitboards, one for each square
+    """
+    return [sum(1 << target for target in targets) for targets in table]
+
+#For every direction, the bitboard of the ray starting in each of the 64 squares, without the square itself
+RAYS = {direction: buildBitboards(rays) for direction,rays in zip(KING_STEPS,location.RAYS)}
+KNIGHT_ATTACKS = buildBitboards(KNIGHT_TARGETS)
+KING_ATTACKS = buildBitboards(KING_TARGETS)
+PAWN_ATTACKS = {color: buildBitboards(table) for color,table in PAWN_CAPTURES.items()}
+
+def lowestSquare(bitboard):
+    """
+    Returns the lowest square of a non empty bitboard
+    """
+    return (bitboard & -bitboard).bit_length() - 1
+
+def squares(bitboard):
+    """
+    Iterates through the squares of a bitboard, from lowest to highest
+    """
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+def slidingAttacks(square,occupancy,directions):
+    """
+    Calculates the squares attacked by a sliding piece using the precomputed rays. Each ray is cut after the
+        first piece found in it, the square of that piece is included (it can be captured or defended)
+
+    Parameters
+    ----------
+    square : int
+        The square of the sliding piece. Ensures 0 <= square < 64
+    occupancy : int
+        Bitboard of every piece on the board
+    directions : list<tuple(int,int)>
+        The directions the piece slides in
+
+    Returns
+    --------
+    int
+        The bitboard of the attacked squares
+    """
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][square]
+        blockers = ray & occupancy
+        if blockers:
+            #Rays with dy*8+dx > 0 go towards higher squares, so the nearest blocker is the lowest one
+            if direction[1]*8 + direction[0] > 0:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[direction][first]
+        attacks |= ray
+    return attacks
+
+def rookAttacks(square,occupancy):
+    return slidingAttacks(square,occupancy,ROOK_DIRECTIONS)
+
+def bishopAttacks(square,occupancy):
+    return slidingAttacks(square,occupancy,BISHOP_DIRECTIONS)
+
+def queenAttacks(square,occupancy):
+    return slidingAttacks(square,occupancy,KING_STEPS)
+
+class BitboardPosition:
+    """
+    Alternative representation of a chess game using bitboards: one 64 bit integer for every piece type and color,
+        plus the occupancy of each color. Lives next to the Chessboard class, and can be converted from and to it
+
+    Attributes
+    ----------
+    pieces : dict[str] = int
+        The bitboard of every piece type, indexed by its FEN letter ("P" for white pawns, "k" for the black king...)
+    whiteOccupancy : int
+        The bitboard of all the white pieces
+    blackOccupancy : int
+        The bitboard of all the black pieces
+    occupancy : int
+        The bitboard of all the pieces
+    toMove : str
+        Whoevers turn is to move in the chess game. Must be either "white" or "black"
+    whiteKingCastling, whiteQueenCastling, blackKingCastling, blackQueenCastling : bool
+        The castling rights, same as in Chessboard
+    enPassantSquare : int
+        The square where en passant can be done, None if there is none
+    halfMoves : int
+        This is the number of moves since the last capture or pawn advance
+    fullMoves : int
+        The total number of chess moves that have been done in the game
+
+    Methods
+    -------
+    fromChessboard(chessboard)
+        Builds the bitboards of a Chessboard
+    fromFEN(FEN)
+        Builds the bitboards of a FEN
+    toChessboard(self)
+        Builds a Chessboard with the same game
+    toBoard(self)
+        Builds the list of 64 Pieces of the position
+    toFEN(self)
+        Returns the FEN of the position
+    pieceAt(self,square)
+        Returns the FEN letter of the piece in a square
+    attacksFrom(self,square)
+        Returns the squares attacked by the piece in a square
+    isSquareAttacked(self,square,color)
+        Checks if any piece of a color attacks a square
+    """
+    def __init__(self):
+        self.pieces = {letter: 0 for letter in PIECE_TYPES}
+        self.whiteOccupancy = 0
+        self.blackOccupancy = 0
+        self.occupancy = 0
+
+        self.toMove = "white"
+        self.whiteKingCastling = True
+        self.whiteQueenCastling = True
+        self.blackKingCastling = True
+        self.blackQueenCastling = True
+        self.enPassantSquare = None
+        self.halfMoves = 0
+        self.fullMoves = 1
+
+    @classmethod
+    def fromChessboard(cls,chessboard):
+        """
+        Builds the bitboards of the current game of a Chessboard
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The game to convert. Ensures its size is 8x8
+
+        Returns
+        --------
+        BitboardPosition
+            The same game as bitboards
+
+        Raises
+        -------
+        ValueError
+            If the chessboard isnt 8x8
+        """
+        if chessboard.height != 8 or chessboard.width != 8:
+            raise ValueError("Bitboards can only represent 8x8 boards, current size is {} x {}".format(chessboard.width,chessboard.height))
+
+        position = cls()
+        for square,piece in enumerate(chessboard.board):
+            if piece:
+                bit = 1 << square
+                position.pieces[piece.pieceType.letter] |= bit
+                if piece.pieceType.color == "white":
+                    position.whiteOccupancy |= bit
+                else:
+                    position.blackOccupancy |= bit
+        position.occupancy = position.whiteOccupancy | position.blackOccupancy
+
+        position.toMove = chessboard.toMove
+        position.whiteKingCastling = chessboard.whiteKingCastling
+        position.whiteQueenCastling = chessboard.whiteQueenCastling
+        position.blackKingCastling = chessboard.blackKingCastling
+        position.blackQueenCastling = chessboard.blackQueenCastling
+        position.enPassantSquare = chessboard.enPassantSquare
+        position.halfMoves = chessboard.halfMoves
+        position.fullMoves = chessboard.fullMoves
+        return position
+
+    @classmethod
+    def fromFEN(cls,FEN):
+        """
+        Builds the bitboards of a FEN. The FEN is read by Chessboard.FENToBoard, so both accept the same FENs
+
+        Parameters
+        ----------
+        FEN : str
+            The FEN of the game
+
+        Returns
+        --------
+        BitboardPosition
+            The game of the FEN as bitboards
+        """
+        chessboard = Chessboard(8,8)
+        chessboard.FENToBoard(FEN)
+        return cls.fromChessboard(chessboard)
+
+    def toBoard(self):
+        """
+        Builds the list of 64 squares of the position, the same one used in Chessboard.board
+
+        Returns
+        --------
+        List<Piece>
+            The 64 squares, with a new Piece on each occupied square and None on the empty ones
+        """
+        board = [None]*64
+        for letter,bitboard in self.pieces.items():
+            for square in squares(bitboard):
+                board[square] = Piece(square,PIECE_TYPES[letter])
+        return board
+
+    def toChessboard(self):
+        """
+        Builds a Chessboard with the same game as the bitboards
+
+        Returns
+        --------
+        Chessboard
+            The equivalent chessboard, including castling, en passant, counters, king positions and material
+        """
+        chessboard = Chessboard(8,8)
+        chessboard.board = self.toBoard()
+        chessboard.toMove = self.toMove
+        chessboard.whiteKingCastling = self.whiteKingCastling
+        chessboard.whiteQueenCastling = self.whiteQueenCastling
+        chessboard.blackKingCastling = self.blackKingCastling
+        chessboard.blackQueenCastling = self.blackQueenCastling
+        chessboard.enPassantSquare = self.enPassantSquare
+        chessboard.halfMoves = self.halfMoves
+        chessboard.fullMoves = self.fullMoves
+
+        for letter,bitboard in self.pieces.items():
+            count = bin(bitboard).count("1")
+            if letter.isupper():
+                chessboard.whiteMaterial[letter] = count
+            else:
+                chessboard.blackMaterial[letter] = count
+        if self.pieces["K"]:
+            chessboard.whiteKingPos = lowestSquare(self.pieces["K"])
+        if self.pieces["k"]:
+            chessboard.blackKingPos = lowestSquare(self.pieces["k"])
+        chessboard.updateZobristKey()
+        return chessboard
+
+    def toFEN(self):
+        """
+        Returns the FEN of the position, written by Chessboard.boardToFEN
+
+        Returns
+        --------
+        str
+            The FEN of the position
+        """
+        return self.toChessboard().boardToFEN()
+
+    def pieceAt(self,square):
+        """
+        Returns the FEN letter of the piece placed in a square
+
+        Parameters
+        ----------
+        square : int
+            The square to look at. Ensures 0 <= square < 64
+
+        Returns
+        --------
+        str
+            The letter of the piece, None if the square is empty
+        """
+        bit = 1 << square
+        if not self.occupancy & bit:
+            return None
+        for letter,bitboard in self.pieces.items():
+            if bitboard & bit:
+                return letter
+
+    def attacksFrom(self,square):
+        """
+        Calculates the squares attacked by the piece placed in a square, including squares of pieces of its same color
+
+        Parameters
+        ----------
+        square : int
+            The square of the piece. Ensures 0 <= square < 64
+
+        Returns
+        --------
+        int
+            The bitboard of the attacked squares, 0 if the square is empty
+        """
+        letter = self.pieceAt(square)
+        if letter == None:
+            return 0
+        kind = letter.upper()
+        if kind == "P":
+            return PAWN_ATTACKS["white" if letter == "P" else "black"][square]
+        if kind == "N":
+            return KNIGHT_ATTACKS[square]
+        if kind == "K":
+            return KING_ATTACKS[square]
+        if kind == "B":
+            return bishopAttacks(square,self.occupancy)
+        if kind == "R":
+            return rookAttacks(square,self.occupancy)
+        return queenAttacks(square,self.occupancy)
+
+    def isSquareAttacked(self,square,color):
+        """
+        Checks if a square is attacked by any piece of a color. Instead of generating the attacks of every piece,
+            looks from the square itself: a knight of that color a knight jump away, a pawn of that color on
+            the square a pawn of the other color would attack, and so on
+
+        Parameters
+        ----------
+        square : int
+            The square to check. Ensures 0 <= square < 64
+        color : str
+            The color of the attackers. Ensures its either "white" or "black"
+
+        Returns
+        --------
+        bool
+            True if the square is attacked
+        """
+        pieces = self.pieces
+        if color == "white":
+            pawn,knight,bishop,rook,queen,king,defender = "P","N","B","R","Q","K","black"
+        else:
+            pawn,knight,bishop,rook,queen,king,defender = "p","n","b","r","q","k","white"
+
+        if PAWN_ATTACKS[defender][square] & pieces[pawn]:
+            return True
+        if KNIGHT_ATTACKS[square] & pieces[knight]:
+            return True
+        if KING_ATTACKS[square] & pieces[king]:
+            return True
+        if bishopAttacks(square,self.occupancy) & (pieces[bishop] | pieces[queen]):
+            return True
+        if rookAttacks(square,self.occupancy) & (pieces[rook] | pieces[queen]):
+            return True
+        return False
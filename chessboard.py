@@ -1,5 +1,47 @@
-from pieces import Piece,King,Night,Bishop,Queen,Rook,Pawn
-from location import Square
+import random
+from pieces import Piece,King,Night,Bishop,Queen,Rook,Pawn,PIECE_TYPES
+from location import (BOARD_SIZE,SQUARE_COUNT,SQUARE_Y,SQUARE_X,SQUARE_NAMES,SQUARE_INDICES,
+                      KNIGHT_TARGETS,KING_TARGETS,PAWN_CAPTURES,RAYS)
+
+#Rook corners, moving from or capturing on them removes the castling right of that side
+A8,H8,A1,H1 = (SQUARE_INDICES[name] for name in ("a8","h8","a1","h1"))
+E8,E1 = SQUARE_INDICES["e8"],SQUARE_INDICES["e1"]
+#For every castling letter, the king and the rook it needs: (king letter, king square, rook letter, rook square)
+CASTLING_PIECES = {"K": ("K",E1,"R",H1),"Q": ("K",E1,"R",A1),"k": ("k",E8,"r",H8),"q": ("k",E8,"r",A8)}
+
+#Lookup tables of the FEN parser and serializer
+EMPTY_SQUARES = {str(n): n for n in range(1,10)}
+EMPTY_RUNS = [str(n) for n in range(10)]
+ACTIVE_COLORS = {"w": "white","b": "black"}
+CASTLING_LETTERS = "KQkq"
+#The pieces a pawn can promote to, as makeMove takes them
+PROMOTION_LETTERS = ("q","r","b","n")
+
+#Packed positions (see boardToPosition): one byte per square, 0 for an empty square and 1 to 12 for the pieces in
+#this order
+POSITION_LETTERS = "PNBRQKpnbrqk"
+POSITION_CODES = {PIECE_TYPES[letter]: code for code,letter in enumerate(POSITION_LETTERS,1)}
+POSITION_TYPES = (None,) + tuple(PIECE_TYPES[letter] for letter in POSITION_LETTERS)
+WHITE_CODES = tuple((letter,code) for code,letter in enumerate(POSITION_LETTERS,1) if letter.isupper())
+BLACK_CODES = tuple((letter,code) for code,letter in enumerate(POSITION_LETTERS,1) if letter.islower())
+WHITE_KING_CODE = POSITION_LETTERS.index("K") + 1
+BLACK_KING_CODE = POSITION_LETTERS.index("k") + 1
+#Flags of a packed position: black to move, then one per castling right in CASTLING_LETTERS order
+BLACK_TO_MOVE_FLAG = 1
+CASTLING_FLAGS = (2,4,8,16)
+POSITION_FLAGS = 31
+#The en passant square of a packed position without one
+NO_SQUARE = 255
+
+#Random 64 bit numbers for the Zobrist key. The seed is fixed so every process gets the same key for the same position
+zobristRandom = random.Random(5489)
+#For every piece letter, one number per square
+ZOBRIST_PIECES = {letter: [zobristRandom.getrandbits(64) for _ in range(64)] for letter in PIECE_TYPES}
+ZOBRIST_BLACK_TO_MOVE = zobristRandom.getrandbits(64)
+#White king side, white queen side, black king side and black queen side castling
+ZOBRIST_CASTLING = [zobristRandom.getrandbits(64) for _ in range(4)]
+#One number per column of the en passant square
+ZOBRIST_EN_PASSANT = [zobristRandom.getrandbits(64) for _ in range(8)]
 
 
 
@@ -13,8 +55,9 @@ class Chessboard:
         The number of squares, vertically, of the chessboard. Ensures height = width
     width : int
         The number of squares, horizontally, of the chessboard. Ensures width = height
-    board: List<List<Piece>>
-        The current board of the chess game as a 2D matrix. All squares set to None at initialization
+    board: List<Piece>
+        The current board of the chess game, a list of 64 squares indexed as in location.py (a8 is 0, h1 is 63).
+        All squares set to None at initialization
     toMove : str
         Whoevers turn is to move in the chess game. Must be either "white" or "black"
     fullMoves : int
@@ -25,11 +68,11 @@ class Chessboard:
         The material for the white player currently on the board
     blackMaterial : dict[str] = int
         The material for the black player currently on the board
-    enPassantSquare : tuple(int,int)
+    enPassantSquare : int
         The square to where en Passant can be done. Is set to None at construction
-    whiteKingPos : tuple(int,int)
+    whiteKingPos : int
         The square where the white king is currently placed at. Is set to None at construction
-    blackKingPos : tuple(int,int)
+    blackKingPos : int
         The square where the black king is currently placed at. Is set to None at construction
     whiteKingCastling : bool
         The ability to castle for the white king in the kings side (the short side)
@@ -39,6 +82,17 @@ class Chessboard:
         The ability to castle for the black king in the kings side (the short side)
     blackQueenCastling : bool
         The ability to castle for the black queen in the kings side (the long side)
+    undoStack : list
+        The information needed to take back every move played with makeMove, the last move is at the end
+    zobristKey : int
+        64 bit key of the current position (pieces, who is to move, castling rights and en passant), read only.
+        It is updated incrementally by makeMove and unmakeMove
+    repetitions : dict[int] = int
+        How many times each position key has appeared since the last irreversible move (a capture, a pawn move
+        or a change in the castling rights). Older positions cant appear again, so they are dropped
+    version : int
+        Counter increased every time the game changes: makeMove, unmakeMove, FENToBoard, setBoard and
+        updateZobristKey. Two equal versions of the same chessboard always mean the same position
         
     
     Methods
@@ -48,23 +102,45 @@ class Chessboard:
     getHeight(self)
         getter for the height of the chessboard
     getFEN(self)
-        gets the Forsyth–Edwards Notation of the chessboard, represents a current game state
+        gets the Forsyth–Edwards Notation of the chessboard, only serialized again if the version changed
+    getPosition(self)
+        gets the packed position of the chessboard, only packed again if the version changed
     setFEN(self,value)
         sets the chessboards FEN to the value
     getBoard(self)
-        returns a copy of the board as a 2d matrix of size height and width
+        returns a copy of the board as a list of 64 squares
     setBoard(self,board)
-        sets the board when given a 2D matrix
+        sets the board when given a list of 64 squares
     FENToBoard(self,FEN)
-        Converts a valid given FEN into its board equivalent (2D matrix)
+        Converts a valid given FEN into its board equivalent (list of 64 squares)
+    positionToBoard(self,position)
+        Loads a position packed by boardToPosition, without going through a FEN
+    setGame(self,board,whiteMaterial,blackMaterial,kingPositions,toMove,rights,enPassantSquare,halfMoves,fullMoves)
+        Replaces the whole game with a position that has already been validated
+    castlingPiecesInPlace(self,board,letter)
+        Checks if the king and rook of a castling right are on their starting squares
     boardToFEN(self,board = None)
-        Converts a valid 2D matrix into its FEN equivalent
+        Converts a valid list of 64 squares into its FEN equivalent
+    boardToPosition(self)
+        Packs the position into 64 bytes and 4 numbers, the way the server sends it
     getTempBoard(self)
         Returns a perfect copy of the board without including any references
     printBoardInfo(self)
         Prints all the chessboards information, for debugging purposes
-    simulateMoveTempBoard(self,piece,goToPosition,enPassant = False)
-        Simulates a move on the temporary board and returns the updated board
+    makeMove(self,fromSquare,toSquare,promotion = "q")
+        Plays a move in place on the board, it can be taken back with unmakeMove
+    unmakeMove(self)
+        Takes back the last move played with makeMove
+    clearUndoStack(self)
+        Forgets the moves played so far, they cant be taken back anymore
+    isSquareAttacked(self,square,color,board = None)
+        Checks if any piece of a color attacks a square
+    computeZobristKey(self)
+        Calculates the Zobrist key of the position from scratch
+    updateZobristKey(self)
+        Sets the Zobrist key from scratch, after changing the game without makeMove
+    repetitionCount(self)
+        Returns how many times the current position has appeared
     """
     def __init__(self, height, width):
         """
@@ -73,14 +149,14 @@ class Chessboard:
         Parameters
         ----------
         height : int
-            Height in squares of the chessboard. Ensures height = width
+            Height in squares of the chessboard. Ensures height = width = 8
         width : int
-            Width in squares of the chessboard. Ensures height = width
+            Width in squares of the chessboard. Ensures height = width = 8
         
         Raises
         -------
         ValueError
-            If height isnt equal to width
+            If height isnt equal to width, or the board isnt 8x8
         TypeError
             If the input data is invalid
         """
@@ -91,9 +167,11 @@ class Chessboard:
         
         if (height != width):
             raise ValueError("The chess grid must be square")
+        if height != BOARD_SIZE:
+            raise ValueError("The squares are numbered for a {0}x{0} board, current size is {1}x{1}".format(BOARD_SIZE,height))
         self.height = height
         self.width = width
-        self.board = [[None]*width for _ in range(height)]
+        self.board = [None]*SQUARE_COUNT
         
         self.toMove = "white"
         self.fullMoves = 1
@@ -112,6 +190,14 @@ class Chessboard:
         self.whiteQueenCastling = True
         self.blackKingCastling = True
         self.blackQueenCastling = True
+        
+        self.undoStack = []
+        self.version = 0
+        self.cachedFEN = None
+        self.cachedFENVersion = -1
+        self.cachedPosition = None
+        self.cachedPositionVersion = -1
+        self.updateZobristKey()
      
     def getWidth(self):
         """
@@ -137,14 +223,32 @@ class Chessboard:
     
     def getFEN(self):
         """
-        Getter for the FEN of the board
+        Getter for the FEN of the board. The FEN is kept from the last call and only serialized again when
+            the version changed, so asking for it many times between moves costs a comparison
         
         Returns
         -------
         str
             The FEN of the board
         """
-        return self.boardToFEN()
+        if self.cachedFENVersion != self.version:
+            self.cachedFEN = self.boardToFEN()
+            self.cachedFENVersion = self.version
+        return self.cachedFEN
+
+    def getPosition(self):
+        """
+        Getter for the packed position of the board (see boardToPosition), kept from the last call like getFEN
+        
+        Returns
+        -------
+        tuple
+            The packed position of the board
+        """
+        if self.cachedPositionVersion != self.version:
+            self.cachedPosition = self.boardToPosition()
+            self.cachedPositionVersion = self.version
+        return self.cachedPosition
 
     def setFEN(self, value):
         """
@@ -159,12 +263,12 @@ class Chessboard:
 
     def getBoard(self):
         """
-        Getter for the current board as a 2D matrix
+        Getter for the current board as a list of 64 squares
         
         Returns
         -------
-        List<List<Piece>>>
-            2D matrix of the board, making a copy of it (not a deep copy)
+        List<Piece>
+            The squares of the board, making a copy of it (not a deep copy)
         """
         return self.board[:]
     
@@ -174,8 +278,8 @@ class Chessboard:
         
         Parameters
         -------
-        board : List<List<Piece>>> 
-            2D matrix of the board to be set, must be valid
+        board : List<Piece>
+            The 64 squares of the board to be set, must be valid
         
         Raises
         -----
@@ -184,19 +288,19 @@ class Chessboard:
         TypeError
             If the given board has invalid items inside of it
         """
-        if len(board) != self.width or len(board[0]) != self.height:
-            raise ValueError("Dimensions of the new board must match.  Current dimensions are {} x {}, dimensions that are trying to be set are {} x {}".format(self.width,self.height,len(board[0]),len(board)))
+        if len(board) != SQUARE_COUNT:
+            raise ValueError("The new board must have {} squares, the one that is trying to be set has {}".format(SQUARE_COUNT,len(board)))
         
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise TypeError("Invalid item inside matrix: {}".format(item))
+        for item in board:
+            if item != None and type(item) != Piece:
+                raise TypeError("Invalid item inside board: {}".format(item))
         
         self.board = board[:]
+        self.updateZobristKey()
 
     def FENToBoard(self,FEN):
         """
-        Function to convert a FEN into its appropiate 2D matrix. 
+        Function to convert a FEN into its appropiate board. 
         A FEN record contains six fields, each separated by a space. The fields are as follows:
 
             -Piece placement data: Each rank is described, starting with rank 8 and ending with rank 1, with a 
@@ -233,116 +337,183 @@ class Chessboard:
         TypeError
             Invalid input type
         ValueError
-            FEN doesnt have the format described above
+            FEN doesnt have the format described above, it hasnt exactly one king of each color or it repeats a
+            castling right. Castling rights whose king or rook isnt on its starting square are dropped
         """
         if type(FEN) != str:
             raise TypeError("FEN must be of type string, current type is {}".format(type(FEN)))
         
-        n = len(FEN)
-        i = 0
-        j = 0
-        self.board = [[None]*8 for _ in range(8)]
-        self.whiteKingPos = None
-        self.blackKingPos = None
-        self.whiteMaterial = {"R":0 , "B": 0, "N":0,"Q":0,"K":0,"P":0}
-        self.blackMaterial = {"r":0 , "b": 0, "n":0,"q":0,"k":0,"p":0}
-        #board part of FEN
-        for p in range(n):
-            if FEN[p] == " ":
-                p+= 1
-                break
-            
-            elif FEN[p]  == "/":
-                j += 1
-                i = 0 
-            else:
-                if FEN[p].isdigit():
-                    i += int(FEN[p])
-                else:
-                    if FEN[p].lower() == "p":
-                        self.board[j][i] = Piece(j,i,Pawn("white" if FEN[p] == "P" else "black"))
-                    elif FEN[p].lower() == "r":
-                        self.board[j][i] = Piece(j,i,Rook("white" if FEN[p] == "R" else "black"))
-                    elif FEN[p].lower() == "n":
-                        self.board[j][i] = Piece(j,i,Night("white" if FEN[p] == "N" else "black"))
-                    elif FEN[p].lower() == "b":
-                        self.board[j][i] = Piece(j,i,Bishop("white" if FEN[p] == "B" else "black"))
-                    elif FEN[p].lower() == "q":
-                        self.board[j][i] = Piece(j,i,Queen("white" if FEN[p] == "Q" else "black")) 
-                    elif FEN[p].lower() == "k":
-                        self.board[j][i] = Piece(j,i,King("white" if FEN[p] == "K" else "black"))
-                        
-                        if FEN[p] == "K":
-                            if self.whiteKingPos:
-                                raise ValueError("Already one king on the board of the same color")
-                            self.whiteKingPos  = (i,j)
-                        else:
-                            if self.blackKingPos:
-                                raise ValueError("Already one king on the board of the same color")
-                            self.blackKingPos  = (i,j)
-                    else:
-                        raise ValueError(f"Invalid piece type '{FEN[p]}' at position {p} in FEN: {FEN}")
-
-                    if FEN[p] in self.whiteMaterial:
-                        self.whiteMaterial[FEN[p]] += 1
-                    else:
-                        self.blackMaterial[FEN[p]] += 1
-                    i+= 1
-        
-        currentCheck = 0
-        while p < n:
-            if FEN[p] == " ":
-                currentCheck += 1
-            else:
-                #Checking who is to move
-                if currentCheck == 0:
-                    if FEN[p] == "w":
-                        self.toMove = "white"
-                    elif FEN[p] == "b":
-                        self.toMove = "black"
-                    else:
-                        raise ValueError("Invalid color when reading the FEN")
-                    
-                    
-                elif currentCheck == 1:
-                    self.whiteKingCastling = FEN[p] != "-"
-                    self.whiteQueenCastling = FEN[p+1] != "-"
-                    self.blackKingCastling = FEN[p+2] != "-"
-                    self.blackQueenCastling = FEN[p+3] != "-"
-                    p+= 3 
-                elif currentCheck == 2:
-                    if FEN[p] == "-":
-                        pass
-                    else:
-                        self.enPassantSquare = (ord(FEN[p])-97, int(FEN[p+1]))
-                        if not ( 0 <= self.enPassantSquare[0] < self.width and 0 <= self.enPassantSquare[1] < self.height):
-                            raise ValueError("Invalid en passant square")
-                        p+= 1
-                
-                elif currentCheck == 3:
-                    self.halfMoves = int(FEN[p])
-                
-                elif currentCheck == 4:
-                    self.fullMoves = int(FEN[p])
-                
+        fields = FEN.split()
+        if not 4 <= len(fields) <= 6:
+            raise ValueError("A FEN has 6 fields separated by spaces, found {} in FEN: {}".format(len(fields),FEN))
+        #The halfmove and fullmove counters are optional
+        placement,activeColor,castling,enPassant = fields[:4]
+        
+        rows = placement.split("/")
+        if len(rows) != self.height:
+            raise ValueError("The FEN has {} rows, the board has {}: {}".format(len(rows),self.height,FEN))
+        
+        board = [None]*SQUARE_COUNT
+        kingPositions = {"K": None,"k": None}
+        whiteMaterial = {"R":0 , "B": 0, "N":0,"Q":0,"K":0,"P":0}
+        blackMaterial = {"r":0 , "b": 0, "n":0,"q":0,"k":0,"p":0}
+        for y,row in enumerate(rows):
+            x = 0
+            rowStart = y*self.width
+            for letter in row:
+                if letter in EMPTY_SQUARES:
+                    x += EMPTY_SQUARES[letter]
+                    continue
+                pieceType = PIECE_TYPES.get(letter)
+                if pieceType == None:
+                    raise ValueError(f"Invalid piece type '{letter}' in row {y} of FEN: {FEN}")
+                if x >= self.width:
+                    raise ValueError("Row {} of the FEN has more than {} squares: {}".format(y,self.width,FEN))
+                #Piece types are shared, so building the board doesnt load any texture
+                board[rowStart + x] = Piece(rowStart + x,pieceType)
+                if letter in kingPositions:
+                    if kingPositions[letter] != None:
+                        raise ValueError("Already one king on the board of the same color")
+                    kingPositions[letter] = rowStart + x
+                if pieceType.color == "white":
+                    whiteMaterial[letter] += 1
                 else:
-                    raise ValueError("currentCheck has too high a value. Too many spaces in the FEN")
-            p+= 1
+                    blackMaterial[letter] += 1
+                x += 1
+            if x != self.width:
+                raise ValueError("Row {} of the FEN has {} squares instead of {}: {}".format(y,x,self.width,FEN))
+        if kingPositions["K"] == None or kingPositions["k"] == None:
+            raise ValueError("The FEN needs one king of each color: {}".format(FEN))
+        
+        if activeColor not in ACTIVE_COLORS:
+            raise ValueError("Invalid color when reading the FEN")
+        
+        #Standard castling field ("KQkq", "Kq", "-"), the old fixed width form with dashes ("K-k-") is also read
+        rights = castling.replace("-","")
+        if castling.strip(CASTLING_LETTERS + "-") or len(castling) > 4 or len(set(rights)) != len(rights):
+            raise ValueError("Invalid castling field '{}' in FEN: {}".format(castling,FEN))
+        #A right is only kept if its king and rook havent moved, so castling always finds them
+        rights = [letter for letter in rights if self.castlingPiecesInPlace(board,letter)]
+        
+        if enPassant == "-":
+            enPassantSquare = None
+        else:
+            enPassantSquare = SQUARE_INDICES.get(enPassant)
+            if enPassantSquare == None:
+                raise ValueError("Invalid en passant square '{}' in FEN: {}".format(enPassant,FEN))
+        
+        try:
+            halfMoves = int(fields[4]) if len(fields) > 4 else 0
+            fullMoves = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError("The move counters of the FEN must be integers: {}".format(FEN))
+        
+        #Everything has been validated, the chessboard is only changed now
+        self.setGame(board,whiteMaterial,blackMaterial,kingPositions,ACTIVE_COLORS[activeColor],rights,enPassantSquare,halfMoves,fullMoves)
+    
+    def positionToBoard(self,position):
+        """
+        Loads a position packed by boardToPosition, the way the clients load the state the server sends. The pieces
+            are read straight from the bytes of the squares, and the material and the kings are counted and found
+            by bytes.count and bytes.index, so nothing is parsed
         
+        Parameters
+        ----------
+        position : tuple
+            (squares, flags, en passant square, halfmoves, fullmoves), see boardToPosition
+        
+        Raises
+        ---------
+        TypeError
+            If position isnt a tuple of 5 fields whose squares are bytes
+        ValueError
+            If a square has a code that isnt a piece, it hasnt exactly one king of each color or the flags or the
+            en passant square arent valid. Castling rights whose king or rook isnt on its starting square are dropped
+        """
+        if type(position) != tuple or len(position) != 5 or type(position[0]) != bytes:
+            raise TypeError("position must be a tuple of 5 fields starting with the bytes of the squares: {}".format(position))
+        squares,flags,enPassant,halfMoves,fullMoves = position
+        if len(squares) != SQUARE_COUNT:
+            raise ValueError("A position has {} squares, found {}".format(SQUARE_COUNT,len(squares)))
+        if max(squares) >= len(POSITION_TYPES):
+            raise ValueError("A square of the position isnt a piece: {}".format(max(squares)))
+        if squares.count(WHITE_KING_CODE) != 1 or squares.count(BLACK_KING_CODE) != 1:
+            raise ValueError("The position needs one king of each color")
+        if flags & ~POSITION_FLAGS:
+            raise ValueError("Invalid flags of the position: {}".format(flags))
+        if enPassant == NO_SQUARE:
+            enPassantSquare = None
+        elif 0 <= enPassant < SQUARE_COUNT:
+            enPassantSquare = enPassant
+        else:
+            raise ValueError("Invalid en passant square of the position: {}".format(enPassant))
+        
+        board = [Piece(square,POSITION_TYPES[code]) if code else None for square,code in enumerate(squares)]
+        rights = [letter for letter,flag in zip(CASTLING_LETTERS,CASTLING_FLAGS) if flags & flag and self.castlingPiecesInPlace(board,letter)]
+        self.setGame(board,{letter: squares.count(code) for letter,code in WHITE_CODES},{letter: squares.count(code) for letter,code in BLACK_CODES},
+                     {"K": squares.index(WHITE_KING_CODE),"k": squares.index(BLACK_KING_CODE)},"black" if flags & BLACK_TO_MOVE_FLAG else "white",
+                     rights,enPassantSquare,halfMoves,fullMoves)
+    
+    def setGame(self,board,whiteMaterial,blackMaterial,kingPositions,toMove,rights,enPassantSquare,halfMoves,fullMoves):
+        """
+        Replaces the whole game, the last step of FENToBoard and positionToBoard once they have validated it. The
+            moves played before cant be taken back and the repetitions start again
+        
+        Parameters
+        ----------
+        board : List<Piece>
+            The 64 squares of the board
+        whiteMaterial, blackMaterial : dict[str] = int
+            The number of pieces of every letter of each color
+        kingPositions : dict[str] = int
+            The square of the "K" and the "k"
+        toMove : str
+            "white" or "black"
+        rights : list<str>
+            The castling rights, the letters of CASTLING_LETTERS that are kept
+        enPassantSquare : int
+            The en passant square, None if there is none
+        halfMoves, fullMoves : int
+            The move counters
+        """
+        self.board = board
+        self.whiteMaterial = whiteMaterial
+        self.blackMaterial = blackMaterial
+        self.whiteKingPos = kingPositions["K"]
+        self.blackKingPos = kingPositions["k"]
+        self.toMove = toMove
+        self.whiteKingCastling = "K" in rights
+        self.whiteQueenCastling = "Q" in rights
+        self.blackKingCastling = "k" in rights
+        self.blackQueenCastling = "q" in rights
+        self.enPassantSquare = enPassantSquare
+        self.halfMoves = halfMoves
+        self.fullMoves = fullMoves
+        self.undoStack = []
+        self.updateZobristKey()
+        
+    def castlingPiecesInPlace(self,board,letter):
+        """
+        Returns True if the king and the rook of a castling right ("K", "Q", "k" or "q") are on their starting squares
+        """
+        kingLetter,kingSquare,rookLetter,rookSquare = CASTLING_PIECES[letter]
+        king,rook = board[kingSquare],board[rookSquare]
+        return king != None and king.pieceType.letter == kingLetter and rook != None and rook.pieceType.letter == rookLetter
+    
     def boardToFEN(self,board = None):
         """
-        Converts 2D matrix into its appropiate FEN. Board must be valid. Defaults to None which
+        Converts a board into its appropiate FEN. Board must be valid. Defaults to None which
             defaults to self.board
         
         Parameters
         --------
-        board : List<List<Piece>>
-            The board to be converted
+        board : List<Piece>
+            The 64 squares of the board to be converted
         
         Returns
         --------
         str
-            The FEN of the 2d matrix
+            The FEN of the board
         
         Raises
         ------
@@ -352,59 +523,67 @@ class Chessboard:
             Board has incorrect pieces
         """
         
-        
-        if board == None: board = self.board
-        
-        if type(board) != list:
-            raise TypeError("Input must be a list")
-        
-        if len(board) != self.height or len(board[0]) != self.width:
-            raise TypeError("Board has invalid dimensions, current dimensions are {} x {}, and input dimensions are {} x {}".format(self.width,self.height,len(board[0]),len(board)))
-        
-        for row in board:
-            for item in row:
+        #self.board is validated when it is set, only boards given from outside have to be checked
+        if board == None:
+            board = self.board
+        else:
+            if type(board) != list:
+                raise TypeError("Input must be a list")
+            
+            if len(board) != SQUARE_COUNT:
+                raise TypeError("Board has invalid dimensions, it must have {} squares and has {}".format(SQUARE_COUNT,len(board)))
+            
+            for item in board:
                 if item != None and type(item) != Piece:
-                    raise TypeError("Invalid item inside matrix: {}".format(item))
-        
-        FEN = ""
-        
-        for i in range(len(board)):
-            c = 0
-            for j in range(len(board[0])):
-                if board[i][j] == None:
-                    c += 1
+                    raise TypeError("Invalid item inside board: {}".format(item))
+        
+        rows = []
+        for rowStart in range(0,SQUARE_COUNT,self.width):
+            text = ""
+            empty = 0
+            for piece in board[rowStart:rowStart + self.width]:
+                if piece:
+                    if empty:
+                        text += EMPTY_RUNS[empty]
+                        empty = 0
+                    text += piece.pieceType.letter
                 else:
-                    if c != 0:
-                        FEN += str(c)
-                    pieceTypeLetter = str(type(board[i][j].pieceType))[15]
-                    if board[i][j].pieceType.color == "white":
-                        FEN +=   pieceTypeLetter.upper()
-                    else:
-                        FEN += pieceTypeLetter.lower()
-                    c = 0
-            if c != 0:
-                FEN += str(c)
-            if i != len(board)-1:
-                FEN += "/"
-        FEN += " " + str(self.toMove)[0] + " "
-        
-        
-        FEN += "K"if self.whiteKingCastling else "-"
-        FEN += "Q"if self.whiteQueenCastling else "-"
-        FEN += "k"if self.blackKingCastling else "-"
-        FEN += "q"if self.blackQueenCastling else "-"
-        
-        FEN += " "
-        
-        if self.enPassantSquare:
-            FEN += chr(self.enPassantSquare[0]+97)
-            FEN += str(self.enPassantSquare[1])
+                    empty += 1
+            if empty:
+                text += EMPTY_RUNS[empty]
+            rows.append(text)
+        
+        castling = ""
+        for letter,right in zip(CASTLING_LETTERS,(self.whiteKingCastling,self.whiteQueenCastling,self.blackKingCastling,self.blackQueenCastling)):
+            if right:
+                castling += letter
+        
+        if self.enPassantSquare != None:
+            enPassant = SQUARE_NAMES[self.enPassantSquare]
         else:
-            FEN += "-"
-            
-        FEN += " " + str(self.halfMoves)
-        FEN += " " + str(self.fullMoves)
-        return FEN
+            enPassant = "-"
+        
+        return "{} {} {} {} {} {}".format("/".join(rows),self.toMove[0],castling or "-",enPassant,self.halfMoves,self.fullMoves)
+    
+    def boardToPosition(self):
+        """
+        Packs the position the way the server sends it to the clients. The board is one byte per square from a8
+            to h1, made by a single list comprehension over the squares, and the rest are small numbers, so it packs
+            into a struct as it is and positionToBoard loads it back without parsing any text
+        
+        Returns
+        --------
+        tuple
+            (squares, flags, en passant square, halfmoves, fullmoves). squares is 64 bytes, 0 for an empty square
+            and 1 to 12 for the pieces in POSITION_LETTERS. flags has BLACK_TO_MOVE_FLAG and the CASTLING_FLAGS of
+            the castling rights. The en passant square is NO_SQUARE if there is none
+        """
+        flags = BLACK_TO_MOVE_FLAG if self.toMove == "black" else 0
+        for flag,right in zip(CASTLING_FLAGS,(self.whiteKingCastling,self.whiteQueenCastling,self.blackKingCastling,self.blackQueenCastling)):
+            if right:
+                flags |= flag
+        return (bytes([POSITION_CODES[piece.pieceType] if piece else 0 for piece in self.board]),flags,
+                NO_SQUARE if self.enPassantSquare == None else self.enPassantSquare,self.halfMoves,self.fullMoves)
                                                              
     def getTempBoard(self):
         """
@@ -413,31 +592,19 @@ class Chessboard:
         
         Returns
         --------
-        List<List<Piece>>
+        List<Piece>
             The deep copy of the board
         """
-        
-        
-        temporaryBoard = []
         #create clone of board to not affect the main one
-        for i in range(self.height):
-            temp = []
-            for j in range(self.width):
-                if self.board[i][j] == None:
-                    temp.append(None)
-                else:
-                    curr = self.board[i][j]
-                    temp.append(Piece(curr.row,curr.column, curr.pieceType))
-            temporaryBoard.append(temp)
-        return temporaryBoard         
+        return [Piece(piece.square,piece.pieceType) if piece else None for piece in self.board]
                                 
     def printBoardInfo(self):
         """
         Prints all the boards info, used for debugging purposes
         """
         
-        for row in self.board:
-            temp = [item.pieceType.color + str(type(item.pieceType)) if item else "None" for item in row]
+        for rowStart in range(0,SQUARE_COUNT,self.width):
+            temp = [item.pieceType.color + str(type(item.pieceType)) if item else "None" for item in self.board[rowStart:rowStart + self.width]]
             print(temp)
             
         print("Person to move is: ", self.toMove)
@@ -455,46 +622,320 @@ class Chessboard:
         print("Full moves: " ,self.fullMoves)
         print("Half moves: " ,self.halfMoves)
             
-    def simulateMoveTempBoard(self,piece,goToPosition,enPassant = False):
+    def makeMove(self,fromSquare,toSquare,promotion = "q"):
         """
-        Simulates a move on a temporary board with no effect on the real board, returns altered board
+        Plays a move in place on the board, updating everything the move changes (captures, en passant, the rook
+            when castling, promotions, castling rights, en passant square, halfmove and fullmove counters, king
+            positions, material and who is to move). Everything needed to take the move back is pushed onto
+            self.undoStack, so it can be reverted with unmakeMove. The move is expected to be pseudo legal
         
         Parameters
         ----------
-        piece : Piece
-            The piece that moves
-        goToPosition : tuple(int,int)
-            The position where the piece is moving, is guaranteed to be a valid position
-        enPassant : bool
-            Checks for en passant to delete piece that is affected. Defaults to false
+        fromSquare : int
+            The square of the piece that moves
+        toSquare : int
+            The square where the piece is moving
+        promotion : str
+            The piece a pawn is promoted to if it reaches the last rank. Either "q", "r", "b" or "n". Defaults to "q"
         
         Returns 
         --------
-        List<List<Piece>>
-            The altere board
+        Piece
+            The piece that has been captured, None if the move isnt a capture
         
         Raises
         -------
-        TypeError
-            Invalid input type
+        ValueError
+            If there is no piece in fromSquare, or a pawn reaches the last rank and promotion isnt one of them
+        """
+        board = self.board
+        piece = board[fromSquare]
+        if piece == None:
+            raise ValueError("There is no piece to move in {}".format(SQUARE_NAMES[fromSquare]))
+        pieceType = piece.pieceType
+        color = pieceType.color
+        if type(pieceType) == Pawn and (SQUARE_Y[toSquare] == 0 or SQUARE_Y[toSquare] == self.height-1) and promotion not in PROMOTION_LETTERS:
+            raise ValueError("A pawn can only promote to q, r, b or n, current promotion is " + str(promotion))
+        
+        #Captures, including en passant where the captured pawn is behind the target square
+        capturedSquare = toSquare
+        if type(pieceType) == Pawn and toSquare == self.enPassantSquare and board[toSquare] == None:
+            capturedSquare = toSquare + self.width if color == "white" else toSquare - self.width
+        captured = board[capturedSquare]
+        
+        castling = (self.whiteKingCastling,self.whiteQueenCastling,self.blackKingCastling,self.blackQueenCastling)
+        undo = (piece,fromSquare,toSquare,captured,capturedSquare,castling,
+                self.enPassantSquare,self.halfMoves,self.fullMoves,self.whiteKingPos,self.blackKingPos,self._zobristKey)
+        
+        #The key is updated by XORing out what leaves a square and XORing in what arrives
+        key = self._zobristKey ^ self.enPassantZobristKey() ^ ZOBRIST_BLACK_TO_MOVE
+        key ^= ZOBRIST_PIECES[pieceType.letter][fromSquare]
+        if captured:
+            key ^= ZOBRIST_PIECES[captured.pieceType.letter][capturedSquare]
+            board[capturedSquare] = None
+            if color == "white":
+                self.blackMaterial[captured.pieceType.letter] -= 1
+            else:
+                self.whiteMaterial[captured.pieceType.letter] -= 1
+        
+        board[fromSquare] = None
+        board[toSquare] = piece
+        piece.setPosition(toSquare)
+        
+        if type(pieceType) == Pawn:
+            self.halfMoves = 0
+            #Double pawn push leaves the en passant square behind the pawn
+            self.enPassantSquare = (fromSquare + toSquare) // 2 if abs(toSquare - fromSquare) == 2*self.width else None
+            if SQUARE_Y[toSquare] == 0 or SQUARE_Y[toSquare] == self.height-1:
+                promoted = Piece(toSquare,PIECE_TYPES[promotion.upper() if color == "white" else promotion])
+                board[toSquare] = promoted
+                material = self.whiteMaterial if color == "white" else self.blackMaterial
+                material[pieceType.letter] -= 1
+                material[promoted.pieceType.letter] += 1
+        else:
+            self.halfMoves = 0 if captured else self.halfMoves + 1
+            self.enPassantSquare = None
+            if type(pieceType) == King:
+                if color == "white":
+                    self.whiteKingPos = toSquare
+                    self.whiteKingCastling = self.whiteQueenCastling = False
+                else:
+                    self.blackKingPos = toSquare
+                    self.blackKingCastling = self.blackQueenCastling = False
+                #Castling, the rook jumps from its corner to the other side of the king
+                rowStart = fromSquare - SQUARE_X[fromSquare]
+                if toSquare - fromSquare == 2:
+                    cornerSquare,rookSquare = rowStart + 7,rowStart + 5
+                elif fromSquare - toSquare == 2:
+                    cornerSquare,rookSquare = rowStart,rowStart + 3
+                else:
+                    cornerSquare = None
+                if cornerSquare != None:
+                    rook = board[cornerSquare]
+                    board[cornerSquare] = None
+                    board[rookSquare] = rook
+                    rook.setPosition(rookSquare)
+                    key ^= ZOBRIST_PIECES[rook.pieceType.letter][cornerSquare] ^ ZOBRIST_PIECES[rook.pieceType.letter][rookSquare]
+        
+        #Moving a rook or capturing it in its corner disables castling on that side
+        for square in (fromSquare,toSquare):
+            if square == A1:
+                self.whiteQueenCastling = False
+            elif square == H1:
+                self.whiteKingCastling = False
+            elif square == A8:
+                self.blackQueenCastling = False
+            elif square == H8:
+                self.blackKingCastling = False
+        
+        #The piece that arrives can be a promoted one
+        key ^= ZOBRIST_PIECES[board[toSquare].pieceType.letter][toSquare]
+        newCastling = (self.whiteKingCastling,self.whiteQueenCastling,self.blackKingCastling,self.blackQueenCastling)
+        for i in range(4):
+            if castling[i] != newCastling[i]:
+                key ^= ZOBRIST_CASTLING[i]
+        
+        if color == "black":
+            self.fullMoves += 1
+        self.toMove = "black" if self.toMove == "white" else "white"
+        self._zobristKey = key ^ self.enPassantZobristKey()
+        
+        #No position before an irreversible move can be repeated, start counting again. Only then the old table
+        #is kept to take the move back, a reversible move is taken back by decreasing its count
+        previousRepetitions = None
+        if self.halfMoves == 0 or castling != newCastling:
+            previousRepetitions = self.repetitions
+            self.repetitions = {}
+        self.repetitions[self._zobristKey] = self.repetitions.get(self._zobristKey,0) + 1
+        self.undoStack.append(undo + (previousRepetitions,))
+        self.version += 1
+        return captured
+    
+    def unmakeMove(self):
+        """
+        Takes back the last move played with makeMove, restoring the board and all the state of the game
+        to how it was before that move
+        
+        Raises
+        -------
+        IndexError
+            If there are no moves to take back
         """
-        if type(piece) != Piece:
-            raise TypeError("piece must be of type Piece, current type is {}".format(type(piece)))
-        if type(goToPosition) != tuple or type(goToPosition[0]) != int or type(goToPosition[1]) != int or len(goToPosition) != 2:
-            raise TypeError("goToPosition must be of type tuple(int,int), current type is {}".format(goToPosition))
-        
-        x,y = goToPosition
-        if (x,y) == (3,-1):
-            print("ALERTTT")
-        temporaryBoard = self.getTempBoard()
-        temporaryPiece = Piece(piece.row,piece.column,piece.pieceType)
-        temporaryBoard[piece.row][piece.column] = None
-        temporaryBoard[y][x]= temporaryPiece
-        temporaryPiece.setPosition(x,y)
-        if enPassant:
-            if piece.pieceType.color == "white":
-                temporaryBoard[y+1][x] = None
+        lastMove = self.undoStack.pop()
+        previousRepetitions = lastMove[-1]
+        if previousRepetitions != None:
+            self.repetitions = previousRepetitions
+        elif self.repetitions[self._zobristKey] == 1:
+            del self.repetitions[self._zobristKey]
+        else:
+            self.repetitions[self._zobristKey] -= 1
+        (piece,fromSquare,toSquare,captured,capturedSquare,castling,self.enPassantSquare,self.halfMoves,self.fullMoves,
+            self.whiteKingPos,self.blackKingPos,self._zobristKey,_) = lastMove
+        self.whiteKingCastling,self.whiteQueenCastling,self.blackKingCastling,self.blackQueenCastling = castling
+        board = self.board
+        pieceType = piece.pieceType
+        color = pieceType.color
+        
+        #Undo promotions
+        promoted = board[toSquare]
+        if promoted is not piece:
+            material = self.whiteMaterial if color == "white" else self.blackMaterial
+            material[promoted.pieceType.letter] -= 1
+            material[pieceType.letter] += 1
+        
+        board[toSquare] = None
+        board[fromSquare] = piece
+        piece.setPosition(fromSquare)
+        
+        if captured:
+            board[capturedSquare] = captured
+            if color == "white":
+                self.blackMaterial[captured.pieceType.letter] += 1
             else:
-                temporaryBoard[y-1][x] = None
-        return temporaryBoard[:]
-        
\ No newline at end of file
+                self.whiteMaterial[captured.pieceType.letter] += 1
+        
+        #Put the rook back in its corner after castling
+        if type(pieceType) == King and abs(toSquare - fromSquare) == 2:
+            rowStart = fromSquare - SQUARE_X[fromSquare]
+            rookSquare,cornerSquare = (rowStart + 5,rowStart + 7) if toSquare > fromSquare else (rowStart + 3,rowStart)
+            rook = board[rookSquare]
+            board[rookSquare] = None
+            board[cornerSquare] = rook
+            rook.setPosition(cornerSquare)
+        
+        self.toMove = "black" if self.toMove == "white" else "white"
+        self.version += 1
+    
+    def clearUndoStack(self):
+        """
+        Forgets the moves played so far, so a game that is only played forwards (the server, the lobby) doesnt
+            keep the pieces and repetition tables of every move it had. The position and the repetition counts
+            since the last irreversible move are kept
+        """
+        self.undoStack = []
+    
+    def isSquareAttacked(self,square,color,board = None):
+        """
+        Checks if a square is attacked by any piece of a color. Instead of calculating the moves of every piece,
+            it looks outwards from the square: along the eight rays for sliding pieces, the knight jumps, the
+            king steps and the two pawn diagonals, all read from the tables of location.py. Returns as soon as
+            the first attacker is found
+        
+        Parameters
+        ----------
+        square : int
+            The square to look at. Ensures 0 <= square < 64
+        color : str
+            The color of the attacking pieces. Ensures its either "white" or "black"
+        board : List<Piece>, optional
+            The board to look at, defaults to self.board
+        
+        Returns
+        --------
+        bool
+            True if any piece of that color attacks the square
+        """
+        if not board:
+            board = self.board
+        
+        #A white pawn attacks the square from the squares a black pawn would capture on, and the other way around
+        for attackerSquare in PAWN_CAPTURES["black" if color == "white" else "white"][square]:
+            attacker = board[attackerSquare]
+            if attacker and attacker.pieceType.color == color and type(attacker.pieceType) == Pawn:
+                return True
+        
+        for attackerSquare in KNIGHT_TARGETS[square]:
+            attacker = board[attackerSquare]
+            if attacker and attacker.pieceType.color == color and type(attacker.pieceType) == Night:
+                return True
+        
+        for attackerSquare in KING_TARGETS[square]:
+            attacker = board[attackerSquare]
+            if attacker and attacker.pieceType.color == color and type(attacker.pieceType) == King:
+                return True
+        
+        #Walk every ray until the first piece, it attacks the square if its a slider of that color moving along the ray
+        for direction,rays in enumerate(RAYS):
+            slider = Rook if direction < 4 else Bishop
+            for attackerSquare in rays[square]:
+                attacker = board[attackerSquare]
+                if attacker:
+                    if attacker.pieceType.color == color and type(attacker.pieceType) in (slider,Queen):
+                        return True
+                    break
+        return False
+    
+    @property
+    def zobristKey(self):
+        """
+        The 64 bit Zobrist key of the current position, kept up to date by makeMove and unmakeMove. Two positions
+            with the same pieces, player to move, castling rights and en passant possibilities have the same key
+        
+        Returns
+        --------
+        int
+            The key of the position
+        """
+        return self._zobristKey
+    
+    def enPassantZobristKey(self):
+        """
+        Returns the part of the Zobrist key that comes from the en passant square. Its only included when a pawn of
+            the player to move is next to the pawn that just moved two squares, otherwise the en passant square
+            doesnt change the possible moves and the position is the same as without it
+        
+        Returns
+        --------
+        int
+            The number of the en passant column, 0 if en passant isnt possible
+        """
+        if self.enPassantSquare == None:
+            return 0
+        #The pawns that can capture are the ones that would attack the en passant square
+        for pawnSquare in PAWN_CAPTURES["black" if self.toMove == "white" else "white"][self.enPassantSquare]:
+            pawn = self.board[pawnSquare]
+            if pawn and type(pawn.pieceType) == Pawn and pawn.pieceType.color == self.toMove:
+                return ZOBRIST_EN_PASSANT[SQUARE_X[self.enPassantSquare]]
+        return 0
+    
+    def computeZobristKey(self):
+        """
+        Calculates the Zobrist key of the current position from scratch, XORing the numbers of every piece on its
+            square, the player to move, the castling rights and the en passant column
+        
+        Returns
+        --------
+        int
+            The key of the position
+        """
+        key = 0
+        for square,piece in enumerate(self.board):
+            if piece:
+                key ^= ZOBRIST_PIECES[piece.pieceType.letter][square]
+        if self.toMove == "black":
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        for i,right in enumerate((self.whiteKingCastling,self.whiteQueenCastling,self.blackKingCastling,self.blackQueenCastling)):
+            if right:
+                key ^= ZOBRIST_CASTLING[i]
+        return key ^ self.enPassantZobristKey()
+    
+    def updateZobristKey(self):
+        """
+        Sets the Zobrist key from scratch. Needed after changing the board or the state of the game directly
+            instead of with makeMove. The repetitions start again from the new position and the version increases
+        """
+        self._zobristKey = self.computeZobristKey()
+        self.repetitions = {self._zobristKey: 1}
+        self.version += 1
+    
+    def repetitionCount(self):
+        """
+        Returns how many times the current position has appeared since the last irreversible move, a threefold
+            repetition happens when it reaches 3. Its a dictionary lookup, no matter how long the game is
+        
+        Returns
+        --------
+        int
+            The number of times the position has appeared, including the current one
+        """
+        return self.repetitions[self._zobristKey]
@@ -4,10 +4,10 @@ import threading
 import pygame
 from graphics import Graphics
 from chessboard import Chessboard
-import pickle
+from protocol import MessageStream,encodeMessage,COLOR,STATE,INPUT,DEFAULT_PROMOTION
 from clientInterface import ClientInterface
 from button import Button
-import time
+from location import SQUARE_X,SQUARE_Y,orientSquare
 
 HOST = '127.0.0.1'
 
@@ -23,111 +23,94 @@ pygame.font.init()
 board = Chessboard(8,8)
 graphics = Graphics(1000,800,board)
 interface = ClientInterface(board,graphics)
-FEN = None
+position = None
 toMove = None
 
-"""
-Function to convert grid coordinates based on color
-Server side color doesnt matter, but client side, for rendering and otherwise,
-black has an updated grid position.
-Examples:
-
-(1,1,"white") => (1,1)
-(1,1,"black") => (6,6)
-"""
-def convertGridCoords(x,y,color):
-    if (x,y) == (-1,-1):
-        return (-1,-1)
-    if color == "white":
-        return (x,y)
-    else:
-        return (7-x , 7-y)
-    
-
 #Variables to send data and recieve data
-selectedPiecePos = (-1,-1)
-dataToSend = {"clickPos": (-1,-1),"color": None,"wantsToPlay": None}
+selectedPiecePos = -1
+dataToSend = {"clickPos": (-1,-1),"color": None,"wantsToPlay": None,"promotion": DEFAULT_PROMOTION}
 quit = False
 quit_event = threading.Event()
 moveMade = False
 clickDone = False
 restart = False
-#Function that runs a second thread in charge of the interchange of data with the server
+#Function that runs a second thread in charge of the data pushed by the server
 def receive_data(conn):
-    global secondPos,color,FEN,toMove,selectedPiecePos,interface,restart,dataToSend,quit
+    global secondPos,color,position,toMove,selectedPiecePos,interface,restart,dataToSend,quit,moveMade
     """
-        Handles the recieving and sending of data with the server
+        Handles the recieving of data from the server. The server only sends when the game changes, the inputs of
+        the player are sent by the main loop when they happen
 
         Parameters
         ----------
-        conn : socket
-            The connection to the socket
+        conn : MessageStream
+            The connection to the server
         """
     
     while not quit_event.is_set():
         
         
         """
-        Recieving 1024 bytes of data through the connection
-        The data is a dictionary with the following format:
+        Recieving the next message of the server, the color of the client (COLOR) or the state of the game (STATE)
+        The state is a dictionary with the following format:
         
-        - "FEN" Is a string displaying the Forsyth–Edwards Notation that describes a current chess game state. 
-            Format is described in the FENToBoard Method in the Chessboard class
+        - "position" is the current chess game state packed into bytes and numbers, loaded straight into the
+            chessboard. Format is described in the boardToPosition Method in the Chessboard class
         - "toMove" is a string either "white" or "black" that displays the color to move in the current chess match
-        - "selectedPiecePos" is a integer tuple the current grid position of the selected piece. Has to be within
-            the range of 0 and 7 (both inclusive) the selected piece is intended to have its square have a red color
+        - "selectedPiecePos" is the square of the selected piece, numbered as in location.py. Has to be within
+            the range of 0 and 63 (both inclusive) or -1 if there is none, the selected piece is intended to have its square have a red color
         - "eaten" is a dictionary representing the pieces that have been eaten during the current chess match
         """
-        if interface.checkmate != "black" and interface.checkmate != "white":
-            data = conn.recv(1024)
-            if data:
-                #Remember to lock the thread to prevent multiple threads grabbing the same data
-                with lock:
-                    
-                    #Load the data using pickle
-                    data = pickle.loads(data)
-                    
-                    #First data is to asign color to the client
-                    if data =="white" or data =="black":
-                        color = data
-                        graphics.clientColor = color
-                    else:
-                        
-                        #If the FEN has changed, update the client. If the FEN remains the same, no further changes are needed
-                        if FEN != data["FEN"] and FEN:
-                            print("new FEN: " + data["FEN"])
-                            moveMade = True
-
-                        #Take the data sent and integrate it to the itnerface
-                        FEN = data["FEN"]
-                        toMove = data["toMove"]
-                        selectedPiecePos = data["selectedPiecePos"]
-                        interface.eaten = data["eaten"]
-                        interface.checkmate = data["checkmate"]
-                        #Update the client side selected position
-                        if selectedPiecePos != (-1,-1) and interface.chessboard.board[selectedPiecePos[1]][selectedPiecePos[0]].pieceType.color == color:
-                            interface.selectedPiece = interface.chessboard.board[selectedPiecePos[1]][selectedPiecePos[0]]
-                        else:
-                            interface.selectedPiece = None
-            
-            
+        try:
+            messageType,data = conn.receive()
+        except OSError:
+            #The server has closed the connection
+            quit = True
+            quit_event.set()
+            break
+        #Remember to lock the thread to prevent multiple threads grabbing the same data
+        with lock:
             
-                #Send the values to the server using pickle
-                conn.send(pickle.dumps(dataToSend))
-        else:
-            with lock:
-                data = conn.recv(1024)
-                if data:
-                    data = pickle.loads(data)
-                    if data["restart"]:
-                        restart = True
-                    if data["quit"]:
-                        quit = True
-                        quit_event.set()
-                conn.send(pickle.dumps(dataToSend))
-                time.sleep(0.1)
-                    
+            #First data is to asign color to the client
+            if messageType == COLOR:
+                color = data
+                graphics.clientColor = color
+            elif messageType == STATE:
                 
+                #If the position has changed, update the client. If it remains the same, no further changes are needed
+                if position != data["position"] and position:
+                    moveMade = True
+
+                #Take the data sent and integrate it to the itnerface
+                position = data["position"]
+                toMove = data["toMove"]
+                selectedPiecePos = data["selectedPiecePos"]
+                interface.eaten = data["eaten"]
+                interface.checkmate = data["checkmate"]
+                #Update the client side selected position
+                selectedPiece = interface.chessboard.board[selectedPiecePos] if selectedPiecePos != -1 else None
+                if selectedPiece and selectedPiece.pieceType.color == color:
+                    interface.selectedPiece = selectedPiece
+                else:
+                    interface.selectedPiece = None
+                if data["restart"]:
+                    restart = True
+                if data["quit"]:
+                    quit = True
+                    quit_event.set()
+            #Heartbeats only keep the connection alive, nothing to do
+
+def sendInput(conn):
+    """
+    Sends dataToSend to the server, called only when the player clicks
+    """
+    global quit
+    try:
+        conn.send(encodeMessage(INPUT,dataToSend))
+    except OSError:
+        quit = True
+        quit_event.set()
+
 def main():
     global interface,quit,dataToSend,moveMade,restart
     # Pygame setup
@@ -138,9 +121,10 @@ def main():
     # Connect to server
     conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     conn.connect((HOST, PORT))
+    conn = MessageStream(conn)
     
     #Initialize secondary thread to handle server side interactions
-    threading.Thread(target=receive_data, args=(conn,)).start()
+    threading.Thread(target=receive_data, args=(conn,), daemon=True).start()
     
     #Main loop handling chess-side stuff, not socket stuff
     running = True
@@ -155,15 +139,16 @@ def main():
         
         #If no checkmate, game is running
         if interface.checkmate != "black" and interface.checkmate != "white" and interface.checkmate != "draw":
-            #Recieve the server side FEN, and apply it to the client side chessboard, remembering locking the thread        
-            if FEN:
+            #Recieve the server side position, and apply it to the client side chessboard, remembering locking the thread        
+            if position:
                 with lock:
                     graphics.getEvents()
                     
                     previousWhiteMaterial = interface.chessboard.whiteMaterial
                     previousBlackMaterial = interface.chessboard.blackMaterial
-                    interface.chessboard.FENToBoard(FEN)
+                    interface.loadPosition(position)
                     if moveMade:
+                        print("new FEN: " + interface.chessboard.getFEN())
                         
                         
                         #Compare previous material to current material to look for captures to play the sound
@@ -188,12 +173,14 @@ def main():
             Asign values of data to send to the server, which consists of the following:
             - "color" represents the color of the client, for server side comparisons
             - "clickPos" is the current Mouse position in case of a click, else (-1,-1) as discard values
+            - "promotion" is the piece a pawn promotes to if the click moves it to the last rank, changed with the keys
             """
             dataToSend["color"] = color
+            dataToSend["promotion"] = graphics.checkForPromotionKey() or dataToSend["promotion"]
             if graphics.checkForClick() and color == toMove:
                 dataToSend["clickPos"] = graphics.getPos()
-            else:
-                dataToSend["clickPos"] = (-1,-1)
+                sendInput(conn)
+            dataToSend["clickPos"] = (-1,-1)
             
             if quit or graphics.checkForQuit():
                 quit_event.set()
@@ -204,8 +191,8 @@ def main():
             
             #Drawing the selectedPiece square
             if interface.selectedPiece and graphics:
-                convertedPos = convertGridCoords(*selectedPiecePos,color)
-                graphics.drawSquare("red",(convertedPos[0]* graphics.pixelsPerSquare, convertedPos[1]* graphics.pixelsPerSquare, graphics.pixelsPerSquare, graphics.pixelsPerSquare))
+                convertedPos = orientSquare(selectedPiecePos,color)
+                graphics.drawSquare("red",(SQUARE_X[convertedPos]* graphics.pixelsPerSquare, SQUARE_Y[convertedPos]* graphics.pixelsPerSquare, graphics.pixelsPerSquare, graphics.pixelsPerSquare))
             
             #Draw the pieces of the current state
             if color:
@@ -214,8 +201,7 @@ def main():
             #Render the circles that represents the possibilities of the current piece
             with lock:
                 if interface.selectedPiece:
-                    interface.selectedPiece.currentPossibilities.clear()
-                    interface.renderSelectedPiece(True,None,None,False)
+                    interface.renderSelectedPiece()
             
             graphics.renderToMove()
             if interface.eaten:
@@ -227,6 +213,7 @@ def main():
             
             if color:
                 graphics.renderOwnColor(color)
+            graphics.renderPromotion(dataToSend["promotion"])
             
             
             graphics.updateDisplay()
@@ -237,16 +224,18 @@ def main():
                 
                 graphics.getEvents()
                 
-                interface.chessboard.FENToBoard(FEN)
+                interface.loadPosition(position)
                 if graphics.checkForClick():
                     if playAgainButton.posInButton(graphics.getPos()):
                         dataToSend["wantsToPlay"] = "p"
                         playAgainButton.outline = "red" 
                         quitButton.outline = None                  
+                        sendInput(conn)
                     if quitButton.posInButton(graphics.getPos()):
                         dataToSend["wantsToPlay"] = "q"
                         quitButton.outline = "red"
                         playAgainButton.outline = None
+                        sendInput(conn)
                         
                 if quit or graphics.checkForQuit():
                     quit_event.set()
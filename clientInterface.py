@@ -1,7 +1,10 @@
 import pygame
-import copy
 from pieces import Piece,King,Night,Bishop,Queen,Rook,Pawn
-from location import Square
+from location import SQUARE_COUNT
+from moveGenerator import legalMoves,checkStatus,isCheckmate
+
+#Targets of the squares without legal moves
+NO_TARGETS = frozenset()
 
 class ClientInterface:
     """
@@ -22,19 +25,15 @@ class ClientInterface:
         All the pieces that have been eaten throughout the game
     checkmate : bool
         If the current game has ended
+    position : tuple
+        The last position loaded into the chessboard with loadPosition, packed as the server sends it
+    legalMoveCache : dict[int] = frozenset
+        The legal targets of the squares of the current position that have any, emptied when a new position is loaded
+    legalMoveCacheKey : int
+        The Zobrist key of the position legalMoveCache belongs to, None while it is empty
 
     Methods
     -------
-    rookPossiblities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Rook
-    bishopPossiblities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Bishop
-    kingPossibilities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType King
-    knightPossibilities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Night
-    pawnPossibilities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Pawn
     getPieceByLetter(self,x)
         Converts a letter seen in the FEN into its pieceType
     getBoard(self)
@@ -47,8 +46,12 @@ class ClientInterface:
         Renders all the pieces that have been eaten on the right hand side of the board
     isValidBoard(self,board,whiteKingPos, blackKingPos,renderAllPossibilities)
         Checks board and returns an integer representing no checks, white in check or black in check
-    renderSelectedPiece(self,draw = True,piece = None,board = None,renderAllPossibilities = True)
-        Renders the possibilities of a piece no matter the type
+    loadPosition(self,position)
+        Loads the position sent by the server if it has changed
+    getLegalTargets(self,position)
+        Returns the legal targets of a square, using the legal move cache
+    renderSelectedPiece(self,draw = True,piece = None)
+        Renders the legal moves of a piece no matter the type
     isCheckmate(self,color)
         Looks at a position in check and checks if it is salvagable or if its checkmate
     main(self)
@@ -60,462 +63,10 @@ class ClientInterface:
         self.selectedPiece = None
         self.eaten = {"r":0 , "b": 0, "n":0,"q":0,"k":0,"p":0, "R":0 , "B": 0, "N":0,"Q":0,"K":0,"P":0}
         self.checkmate = False
+        self.position = None
+        self.legalMoveCache = {}
+        self.legalMoveCacheKey = None
     
-    def rookPossiblities(self,draw,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Rook
-
-        Parameters
-        ----------
-        draw : bool
-            If True, the possibilities of the piece are drawn onto the clients screen. If False, possibilities arent drawn
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.column,piece.row
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        Iterates through all four main directions of the rook (up,down,left,right)
-        Second loop repeats until the position is out of the grid, or found a piece. If the piece is of a different color, allows 
-            that possibility but stops anyway
-        
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for dx,dy in [(1,0),(0,1),(-1,0),(0,-1)]:
-            p = 1
-            while currentPosX  + p*dx < self.chessboard.width and currentPosY  + p*dy < self.chessboard.height and currentPosX  + p*dx >= 0 and currentPosY  + p*dy >= 0:
-                
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+p*dx,currentPosY+p*dy)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+p*dy][currentPosX+p*dx] or  board[currentPosY+p*dy][currentPosX+p*dx].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+p*dx,currentPosY+p*dy))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+p*dy,currentPosX+p*dx)
-                
-                if board[currentPosY+p*dy][currentPosX+p*dx] != None:
-                    break
-                
-                p+= 1
-                  
-    def bishopPossiblities(self,draw,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Bishop
-
-        Parameters
-        ----------
-        draw : bool
-            If True, the possibilities of the piece are drawn onto the clients screen. If False, possibilities arent drawn
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.column,piece.row
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-        
-        """
-        Iterates through all four main directions of the bishop (top-left,top-right,bottom-left,bottom-right)
-        Second loop repeats until the position is out of the grid, or found a piece. If the piece is of a different color, allows 
-            that possibility but stops anyway
-        
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for dx,dy in [(1,1),(1,-1),(-1,1),(-1,-1)]:
-            p = 1
-            while currentPosX  + p*dx < self.chessboard.width and currentPosY  + p*dy < self.chessboard.height and currentPosX  + p*dx >= 0 and currentPosY  + p*dy >= 0:
-                
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+p*dx,currentPosY+p*dy)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+p*dy][currentPosX+p*dx] or  board[currentPosY+p*dy][currentPosX+p*dx].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+p*dx,currentPosY+p*dy))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+p*dy,currentPosX+p*dx)
-                
-                if board[currentPosY+p*dy][currentPosX+p*dx] != None:
-                    break
-                
-                p+= 1
-        
-    def kingPossibilities(self,draw,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType King
-
-        Parameters
-        ----------
-        draw : bool
-            If True, the possibilities of the piece are drawn onto the clients screen. If False, possibilities arent drawn
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.column,piece.row
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        Iterates through all eight main directions of the king (up,down,left,right,top-left,top-right,bottom-left,bottom-right)
-            and ensures it is within the boards bounds.If the the target square has a piece of the same color, the move isnt added
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for x,y in [(-1,0),(-1,1),(1,-1),(0,-1),(1,0),(0,1),(1,1),(-1,-1)]:
-            dx = currentPosX + x
-            dy = currentPosY + y
-            if 0 <= dy < len(board) and 0 <= dx < len(board[0]):
-                
-                if not renderAllPossibilities:
-                    if self.selectedPiece.pieceType.color == "white":
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(dx,dy)),(dx,dy),self.chessboard.blackKingPos,True)
-                    else:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(dx,dy)),self.chessboard.whiteKingPos,(dx,dy),True)
-                
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[dy][dx] or board[dy][dx].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((dx,dy))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(dy,dx)
-                    
-        
-        """
-        Checks all all castling possibilities, whites queen and king side castling and the same for black
-        For castling to be allowed the following criteria must be met:
-        - That sides castling has to be enabled (which can be seen in the self.chessboard object)
-        - All the squares between the king and the rook must be empty (must be None)
-        - If not renderAllPossibilities, the move cant put you in check
-        
-        If all those criteria are met, the probability is added to the kings currentPossibilities, and if draw == True
-            it is drawn onto the screen
-        """
-        if piece.pieceType.color == "white":
-            if self.chessboard.whiteQueenCastling and self.chessboard.board[7][1] == self.chessboard.board[7][2]  == self.chessboard.board[7][3] == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(2,7)),(2,7),self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    piece.currentPossibilities.add((2,7))
-                    if draw:
-                        self.graphics.drawPossibilityCircle(7,2)
-                                
-            if self.chessboard.whiteKingCastling and self.chessboard.board[7][5] == self.chessboard.board[7][6]  == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(6,7)),(6,7),self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):                        
-                    piece.currentPossibilities.add((6,7))
-                    if draw:
-                        self.graphics.drawPossibilityCircle(7,6)
-                    
-        else:
-            if self.chessboard.blackQueenCastling and self.chessboard.board[0][1] == self.chessboard.board[0][2]  == self.chessboard.board[0][3] == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(2,0)),self.chessboard.whiteKingPos,(2,0),True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[0][2] or board[0][2].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((2,0))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(0,2)
-            if self.chessboard.blackKingCastling and self.chessboard.board[0][5] == self.chessboard.board[0][6]  == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(6,0)),self.chessboard.whiteKingPos,(6,0),True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[0][6] or board[0][6].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((6,0))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(0,6)
-    
-    def knightPossibilities(self,draw,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Night
-
-        Parameters
-        ----------
-        draw : bool
-            If True, the possibilities of the piece are drawn onto the clients screen. If False, possibilities arent drawn
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.column,piece.row
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        Iterates through all eight main directions of the knight (2-up-1-left,2-up-1-right,2-down-1-left,
-            2-down-1-right,2-left-1-up,2-left-1-down,2-right-1-up,2-right-1-down) and ensures it is within the
-            boards bounds. If the the target square has a piece of the same color, the move isnt added
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for x,y in [(2,-1),(2,1),(1,2),(-1,2),(-2,1),(-2,-1),(-1,-2),(1,-2)]:
-            dx = currentPosX + x
-            dy = currentPosY + y
-            if 0 <= dy < len(board) and 0 <= dx < len(board[0]):
-                if not board[dy][dx] or board[dy][dx].pieceType.color != piece.pieceType.color:
-                    if not renderAllPossibilities:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(dx,dy)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                    if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                        if not board[dy][dx] or  board[dy][dx].pieceType.color != piece.pieceType.color:
-                            piece.currentPossibilities.add((dx,dy))
-                            if draw:
-                                self.graphics.drawPossibilityCircle(dy,dx)               
-    
-    def pawnPossibilities(self,draw,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Pawn
-
-        Parameters
-        ----------
-        draw : bool
-            If True, the possibilities of the piece are drawn onto the clients screen. If False, possibilities arent drawn
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.column,piece.row
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        For each pawn, the following checks are made:
-        - For one square forward, checking if the square in front is empty 
-        - For two squares forward, that the pawn is in its initial rank (either the second row for black or the seventh for white).
-            and that the two squares in front are empty
-        -For diagonal captures, that there is a piece of the opposite color in said diagonal
-        -For en passant, that the diagonal is the en Passant Target square (found in self.chessboard.enPassantSquare)
-        
-        For all the previous check, the move isnt added if not renderAllPossibilities and the move puts you in check
-            or if the move puts you out of the bounds of the board
-        """
-        if piece.pieceType.color == "white":
-            #One and two squares forward
-            if currentPosY > 0 and board[currentPosY-1][currentPosX] == None:
-                if not renderAllPossibilities:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY-1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY-1][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY-1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY-1,currentPosX)
-            if currentPosY == 6  and board[currentPosY-2][currentPosX] == None == board[currentPosY-1][currentPosX] :
-                
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY-2)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY-2][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY-2))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY-2,currentPosX)
-                
-            #diagonals
-            if currentPosX > 0 and currentPosY > 0 and board[currentPosY-1][currentPosX-1] != None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY-1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY-1][currentPosX-1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX-1,currentPosY-1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY-1,currentPosX-1)
-            if currentPosX < len(board[0])-1 and currentPosY > 0 and board[currentPosY-1][currentPosX+1] != None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY-1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY-1][currentPosX+1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY-1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY-1,currentPosX+1)
-                    
-            #look for en passant 
-            if currentPosX > 0 and currentPosY > 0 and (currentPosX-1,currentPosY-1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY-1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    piece.currentPossibilities.add((currentPosX-1,currentPosY-1))
-                    if draw:
-                        self.graphics.drawPossibilityCircle(currentPosY-1,currentPosX-1)
-            if currentPosX < len(board[0])-1 and currentPosY > 0 and (currentPosX+1,currentPosY-1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY-1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY-1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY-1,currentPosX+1)
-                
-        else:
-            #One and two squares forward
-            if currentPosY < len(board)-1 and board[currentPosY+1][currentPosX] == None:
-                if not renderAllPossibilities:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY+1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+1][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY+1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+1,currentPosX)
-            if currentPosY == 1  and board[currentPosY+2][currentPosX] == None == board[currentPosY+1][currentPosX]:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY+2)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+2][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY+2))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+2,currentPosX)
-                
-            #diagonals
-            if currentPosX > 0 and currentPosY < len(board)-1 and board[currentPosY+1][currentPosX-1] != None:
-                #check for oposite color
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY+1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY+1][currentPosX-1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX-1,currentPosY+1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+1,currentPosX-1)
-            if currentPosX < len(board[0])-1 and currentPosY < len(board)-1 and board[currentPosY+1][currentPosX+1] != None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY+1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY+1][currentPosX+1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY+1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+1,currentPosX+1)
-            
-            #EN PASSANT
-            if currentPosX > 0 and currentPosY < len(board)-1 and (currentPosX-1,currentPosY+1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY+1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    piece.currentPossibilities.add((currentPosX-1,currentPosY+1))
-                    if draw:
-                        self.graphics.drawPossibilityCircle(currentPosY+1,currentPosX-1)
-            if currentPosX < len(board[0])-1 and currentPosY < len(board)-1 and (currentPosX+1,currentPosY+1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY+1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY+1))
-                        if draw:
-                            self.graphics.drawPossibilityCircle(currentPosY+1,currentPosX+1)
-
     def getPieceByLetter(self,x):
         """
         Converts a letter into its said PieceType, following the same rules that the FEN uses.
@@ -641,16 +192,14 @@ class ClientInterface:
 
         Parameters
         ----------
-        board : <List<List<Piece>>>
-            2D Matrix representing a chess board
-        whiteKingPos : tuple(int,int)
-            A tuple of (x,y) integers that represents the current grid position of the white king
-            Ensures that 0 <= x < self.chessboard.width and 0 <= y < self.chessboard.height
-        blackKingPos : tuple(int,int)
-            A tuple of (x,y) integers that represents the current grid position of the black king
-            Ensures that 0 <= x < self.chessboard.width and 0 <= y < self.chessboard.height
+        board : <List<Piece>>
+            The 64 squares of a chess board
+        whiteKingPos : int
+            The square of the white king. Ensures that 0 <= whiteKingPos < 64
+        blackKingPos : int
+            The square of the black king. Ensures that 0 <= blackKingPos < 64
         renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
+            Not used anymore, checks are found by moveGenerator.checkStatus. Kept so old calls still work
         
         Returns
         -------
@@ -664,51 +213,73 @@ class ClientInterface:
         """
         
         #Validate the kings positions
-        if whiteKingPos[0] < 0 or whiteKingPos[0] >= self.chessboard.width:
-            raise ValueError("White kings position has an invalid x value: ", str(whiteKingPos[0]))
-        if whiteKingPos[1] < 0 or whiteKingPos[1] >= self.chessboard.height:
-            raise ValueError("White kings position has an invalid y value: ", str(whiteKingPos[1]))
-        
-        if blackKingPos[0] < 0 or blackKingPos[0] >= self.chessboard.width:
-            raise ValueError("White kings position has an invalid x value: ", str(whiteKingPos[0]))
-        if blackKingPos[1] < 0 or blackKingPos[1] >= self.chessboard.height:
-            raise ValueError("Black kings position has an invalid y value: ", str(whiteKingPos[1]))
+        if whiteKingPos < 0 or whiteKingPos >= SQUARE_COUNT:
+            raise ValueError("White kings position has an invalid square: ", str(whiteKingPos))
+        if blackKingPos < 0 or blackKingPos >= SQUARE_COUNT:
+            raise ValueError("Black kings position has an invalid square: ", str(blackKingPos))
         
         #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
+        if len(board) != SQUARE_COUNT:
+            raise ValueError("Input board size doesnt align with chessboard size. Input board squares: ",str(len(board)) ,", chessboard squares: ", str(SQUARE_COUNT))
+        for item in board:
+            if item != None and type(item) != Piece:
+                raise ValueError("Item in board is invalid: " + item)
                 
         
-        #Quick check if the kings are too close
-        if abs(whiteKingPos[0]-blackKingPos[0]) == 1 or abs(whiteKingPos[1]-blackKingPos[1]) == 1:
-            return 3
+        return checkStatus(self.chessboard,board,whiteKingPos,blackKingPos)
+       
+    def loadPosition(self,position):
         """
-        Loops through the entire board. If the current square has a value, we render its possibilities and look if any 
-            of those possibilities include the opposite kings position.
-            
-        Return accordingly
-        If nothing is found, no checks
+        Loads a position sent by the server into the chessboard with Chessboard.positionToBoard, straight from its
+            bytes. Nothing is done if it is the same position as last time, otherwise the legal move cache is emptied
+            since the position has changed
+        
+        Parameters
+        ----------
+        position : tuple
+            The packed position of the current game, see Chessboard.boardToPosition
+        
+        Returns
+        --------
+        bool
+            True if the position had changed and has been loaded
+        """
+        if position == self.position:
+            return False
+        self.chessboard.positionToBoard(position)
+        self.position = position
+        self.legalMoveCache.clear()
+        self.legalMoveCacheKey = None
+        return True
+    
+    def getLegalTargets(self,square):
         """
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                if board[i][j] != None:
-                    temporarySelectedPiece = board[i][j]
-                    temporarySelectedPiece.currentPossibilities.clear()
-                    self.renderSelectedPiece(False,temporarySelectedPiece,board,renderAllPossibilities)
-                    if temporarySelectedPiece.pieceType.color == "black" and whiteKingPos in temporarySelectedPiece.currentPossibilities:
-                        return 1
-                    if temporarySelectedPiece.pieceType.color == "white" and blackKingPos in temporarySelectedPiece.currentPossibilities:
-                        return 2
-        return 0
-       
-    def renderSelectedPiece(self,draw = True,piece = None,board = None,renderAllPossibilities = True):
+        Returns the squares a piece can legally move to, reading them from the legal move cache. The legal moves
+            of a position are generated the first time one of its squares is asked for, and stored for every square
+        
+        Parameters
+        ----------
+        square : int
+            The square of the piece
+        
+        Returns
+        --------
+        frozenset
+            The squares the piece can move to
+        """
+        #The board can also be changed without loadPosition
+        if self.legalMoveCacheKey != self.chessboard.zobristKey:
+            targets = {}
+            for move in legalMoves(self.chessboard):
+                targets.setdefault(move.fromSquare,set()).add(move.toSquare)
+            self.legalMoveCache = {fromSquare: frozenset(squareTargets) for fromSquare,squareTargets in targets.items()}
+            self.legalMoveCacheKey = self.chessboard.zobristKey
+        return self.legalMoveCache.get(square,NO_TARGETS)
+    
+    def renderSelectedPiece(self,draw = True,piece = None):
         """
-        Renders the possibilities of a piece, no matter its type. Acts like a parent method for the methods with
-            the name <PieceType>Possibilities
+        Renders the possibilities of a piece, no matter its type. The possibilities are the legal moves read from
+            getLegalTargets, this method only draws them and returns them
 
         Parameters
         ----------
@@ -717,62 +288,30 @@ class ClientInterface:
         piece : Piece, optional
             The piece to be rendered, if left blank, defaults to None, which defaults to self.selectedPiece
             Ensures valid position
-        board : <List<List<Piece>>>, optional
-            The board which to which the piece is compared. If left blank defaults to none, which 
-            defaults to self.chessboard.board
-            Ensures the board size matches the self.chessboard size and all its pieceTypes are valid or None
-        renderAllPossibilities : bool, optional
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal).
-            Defaults to true
+        
+        Returns
+        --------
+        frozenset
+            The squares the piece can move to
         
         Raises
         -------
-        TypeError
-            If the input of the piece not of the allowed values, this will be triggered
         ValueError
-            Will appear if either the pieces position is invalid, the boards size is invalid or the boards contents are invalid
+            If the pieces position is invalid
         """
         
         #Defaulting the variables
         if not piece:
             piece = self.selectedPiece
-        if not board:
-            board = self.chessboard.board
-            
             
-        if piece.column < 0 or piece.column >= self.chessboard.width:
-            raise ValueError("piece position has an invalid x value: ", str(piece.column))
-        if piece.row < 0 or piece.row >= self.chessboard.height:
-            raise ValueError("piece position has an invalid y value: ", str(piece.row))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-        
-        """
-        Looks at the type of the piece and triggers the children methods accordingly
-        
-        Note: a queen is seen as the combination of rook and bishop, not its own method
-        """
-        if type(piece.pieceType) == Rook:
-            self.rookPossiblities(draw,piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Bishop:
-            self.bishopPossiblities(draw,piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Queen:
-            self.bishopPossiblities(draw,piece,board,renderAllPossibilities)
-            self.rookPossiblities(draw,piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == King:
-            self.kingPossibilities(draw,piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Night:
-            self.knightPossibilities(draw,piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Pawn:
-            self.pawnPossibilities(draw,piece,board,renderAllPossibilities)
-        else:
-            raise TypeError("Piece has no correct type")
+        if piece.square < 0 or piece.square >= SQUARE_COUNT:
+            raise ValueError("piece position has an invalid square: ", str(piece.square))
+        
+        targets = self.getLegalTargets(piece.square)
+        if draw:
+            for square in targets:
+                self.graphics.drawPossibilityCircle(square)
+        return targets
     
     def isCheckmate(self,color):
         """
@@ -805,38 +344,5 @@ class ClientInterface:
         if color != "black" and color != "white":
             raise ValueError("the value of color is neither black or white, its: ", color)
         
-        """
-        Iterates through the entire move, and for each piece do the following
-        
-        Calculate all its possibilities. And simulate each of the possibilities.
-        If any of those possibilities stop the check, return False inmediatly
-        
-        In case none of the moves of any of the pieces stop the check, return False
-        """
-        for i in range(len(self.chessboard.board)):
-            for j in range(len(self.chessboard.board[0])):
-                temporaryBoard = self.chessboard.getTempBoard()
-                currentPiece = temporaryBoard[i][j]
-                if currentPiece and currentPiece.pieceType.color == color:
-                    
-                    self.renderSelectedPiece(False,currentPiece,temporaryBoard)
-                    whiteKingPos = self.chessboard.whiteKingPos
-                    blackKingPos = self.chessboard.blackKingPos
-                    
-                    movesToCheck = copy.copy(currentPiece.currentPossibilities)
-                    for moves in movesToCheck:
-                        if type(currentPiece.pieceType) == King:
-                            if color == "white":
-                                whiteKingPos = moves
-                            else:
-                                blackKingPos = moves
-                        
-                        temporaryBoard = self.chessboard.getTempBoard()
-                        temporaryBoard[i][j] = None
-                        temporaryBoard[moves[1]][moves[0]] = currentPiece
-                        currentPiece.position = moves
-                        
-                        if self.isValidBoard(temporaryBoard,whiteKingPos,blackKingPos,True) == 0:
-                            return False
-        return True
-    
\ No newline at end of file
+        return isCheckmate(self.chessboard,color)
+    
@@ -0,0 +1,499 @@
+"""
+Chess engine built on the rules engine: iterative deepening negamax with alpha-beta pruning and quiescence search.
+Positions are scored by material plus piece-square tables, and moves are ordered with MVV-LVA for captures and
+the killer and history heuristics for quiet moves, after the best move stored in the transposition table. Every search is limited by a time budget, and reports its depth,
+score, nodes and nodes per second after each completed iteration.
+
+Usage, from the root of the repository:
+    python engine.py --movetime 5                   Best move of the start position
+    python engine.py --fen "<FEN>" --depth 6        Searches a position up to a depth
+    python engine.py --book book.bin                Plays a move of a Polyglot book if the position is in it
+    python engine.py --bitbases bitbases            Scores the endgames of the bitbases without searching them
+"""
+import argparse
+import time
+from collections import namedtuple
+from chessboard import Chessboard
+from pieces import Pawn
+from moveGenerator import legalMoves,isInCheck
+from location import START_FEN,moveToString
+from transposition import TranspositionTable,DEFAULT_TABLE_SIZE,EXACT,LOWER_BOUND,UPPER_BOUND
+from polyglot import OpeningBook
+from bitbase import Bitbases
+
+#Scores are in centipawns from the point of view of the player to move. Mates are scored MATE minus the plies to mate
+MATE = 100000
+INFINITY = MATE + 1
+MAX_PLY = 128
+#Score of a position the bitbases say is won, plus its evaluation so the search still makes progress
+KNOWN_WIN = 20000
+#The clock is read once every this many nodes
+NODES_BETWEEN_CLOCK_CHECKS = 1024
+
+PIECE_VALUES = {"P": 100,"N": 320,"B": 330,"R": 500,"Q": 900,"K": 0}
+#Ranks for MVV-LVA: the most valuable victim first, then the least valuable attacker
+CAPTURE_RANKS = {"P": 1,"N": 2,"B": 3,"R": 4,"Q": 5,"K": 6}
+
+#Piece-square tables from the white side, a8 first as in location.py. Black reads them mirrored vertically
+PIECE_SQUARE_TABLES = {
+    "P": (  0,  0,  0,  0,  0,  0,  0,  0,
+           50, 50, 50, 50, 50, 50, 50, 50,
+           10, 10, 20, 30, 30, 20, 10, 10,
+            5,  5, 10, 25, 25, 10,  5,  5,
+            0,  0,  0, 20, 20,  0,  0,  0,
+            5, -5,-10,  0,  0,-10, -5,  5,
+            5, 10, 10,-20,-20, 10, 10,  5,
+            0,  0,  0,  0,  0,  0,  0,  0),
+    "N": (-50,-40,-30,-30,-30,-30,-40,-50,
+          -40,-20,  0,  0,  0,  0,-20,-40,
+          -30,  0, 10, 15, 15, 10,  0,-30,
+          -30,  5, 15, 20, 20, 15,  5,-30,
+          -30,  0, 15, 20, 20, 15,  0,-30,
+          -30,  5, 10, 15, 15, 10,  5,-30,
+          -40,-20,  0,  5,  5,  0,-20,-40,
+          -50,-40,-30,-30,-30,-30,-40,-50),
+    "B": (-20,-10,-10,-10,-10,-10,-10,-20,
+          -10,  0,  0,  0,  0,  0,  0,-10,
+          -10,  0,  5, 10, 10,  5,  0,-10,
+          -10,  5,  5, 10, 10,  5,  5,-10,
+          -10,  0, 10, 10, 10, 10,  0,-10,
+          -10, 10, 10, 10, 10, 10, 10,-10,
+          -10,  5,  0,  0,  0,  0,  5,-10,
+          -20,-10,-10,-10,-10,-10,-10,-20),
+    "R": (  0,  0,  0,  0,  0,  0,  0,  0,
+            5, 10, 10, 10, 10, 10, 10,  5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+           -5,  0,  0,  0,  0,  0,  0, -5,
+            0,  0,  0,  5,  5,  0,  0,  0),
+    "Q": (-20,-10,-10, -5, -5,-10,-10,-20,
+          -10,  0,  0,  0,  0,  0,  0,-10,
+          -10,  0,  5,  5,  5,  5,  0,-10,
+           -5,  0,  5,  5,  5,  5,  0, -5,
+            0,  0,  5,  5,  5,  5,  0, -5,
+          -10,  5,  5,  5,  5,  5,  0,-10,
+          -10,  0,  5,  0,  0,  0,  0,-10,
+          -20,-10,-10, -5, -5,-10,-10,-20),
+    "K": (-30,-40,-40,-50,-50,-40,-40,-30,
+          -30,-40,-40,-50,-50,-40,-40,-30,
+          -30,-40,-40,-50,-50,-40,-40,-30,
+          -30,-40,-40,-50,-50,-40,-40,-30,
+          -20,-30,-30,-40,-40,-30,-30,-20,
+          -10,-20,-20,-20,-20,-20,-20,-10,
+           20, 20,  0,  0,  0,  0, 20, 20,
+           20, 30, 10,  0,  0, 10, 30, 20),
+}
+#Once the queens are off the board the king should walk to the center
+KING_ENDGAME_TABLE = (-50,-40,-30,-20,-20,-30,-40,-50,
+                      -30,-20,-10,  0,  0,-10,-20,-30,
+                      -30,-10, 20, 30, 30, 20,-10,-30,
+                      -30,-10, 30, 40, 40, 30,-10,-30,
+                      -30,-10, 30, 40, 40, 30,-10,-30,
+                      -30,-10, 20, 30, 30, 20,-10,-30,
+                      -30,-30,  0,  0,  0,  0,-30,-30,
+                      -50,-30,-30,-30,-30,-30,-30,-50)
+
+def buildPieceSquareValues(kingTable):
+    """
+    Adds the material value to the piece-square tables of both colors, negative for black, so a position is scored by
+        adding one number per piece
+
+    Returns
+    --------
+    dict[str] = tuple<int>
+        The 64 values of every piece letter
+    """
+    values = {}
+    for letter,table in PIECE_SQUARE_TABLES.items():
+        if letter == "K":
+            table = kingTable
+        values[letter] = tuple(PIECE_VALUES[letter] + table[square] for square in range(64))
+        #Black squares are mirrored vertically: a8 (0) reads the value of a1 (56)
+        values[letter.lower()] = tuple(-PIECE_VALUES[letter] - table[square ^ 56] for square in range(64))
+    return values
+
+MIDDLEGAME_VALUES = buildPieceSquareValues(PIECE_SQUARE_TABLES["K"])
+ENDGAME_VALUES = buildPieceSquareValues(KING_ENDGAME_TABLE)
+
+SearchResult = namedtuple("SearchResult",["move","score","depth","nodes","elapsed"])
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget runs out or the search is stopped
+    """
+
+def evaluate(chessboard):
+    """
+    Scores a position by material and piece-square tables. Once there are no queens left the kings use
+        KING_ENDGAME_TABLE
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The position to score
+
+    Returns
+    --------
+    int
+        The score in centipawns, positive if the player to move is better
+    """
+    score = 0
+    queens = False
+    for square,piece in enumerate(chessboard.board):
+        if piece:
+            letter = piece.pieceType.letter
+            score += MIDDLEGAME_VALUES[letter][square]
+            if letter == "Q" or letter == "q":
+                queens = True
+    if not queens:
+        #Endgame: the kings are scored with the endgame table instead
+        for letter,square in (("K",chessboard.whiteKingPos),("k",chessboard.blackKingPos)):
+            score += ENDGAME_VALUES[letter][square] - MIDDLEGAME_VALUES[letter][square]
+    return score if chessboard.toMove == "white" else -score
+
+class Engine:
+    """
+    Searches the best move of a position with iterative deepening alpha-beta, stopping when the time budget runs out.
+    The position is searched in place with Chessboard.makeMove and unmakeMove, and left as it was
+
+    Attributes
+    ----------
+    timeBudget : float
+        The seconds a search can take. The depth being searched when it runs out is abandoned
+    maxDepth : int
+        The deepest iteration of a search
+    report : function
+        Called with a SearchResult after every completed iteration, None to stay silent
+    nodes : int
+        The positions visited by the current search, including quiescence
+    killers : list<list<Move>>
+        The two last quiet moves that caused a beta cutoff at every ply
+    history : dict[str] = list<int>
+        For every color, a score for each move (fromSquare*64 + toSquare), raised when the move causes a cutoff
+    table : TranspositionTable
+        The results of the positions already searched, kept between searches. None to search without it
+    bitbases : Bitbases
+        The endgame bitbases to score the positions they have, None to search every position
+
+    Methods
+    -------
+    search(self,chessboard)
+        Returns the SearchResult of the best move found within the time budget
+    stop(self)
+        Makes a running search return as soon as possible
+    negamax(self,chessboard,depth,alpha,beta,ply)
+        Alpha-beta search of a position up to a depth
+    quiescence(self,chessboard,alpha,beta,ply)
+        Searches the captures of a position until it is quiet
+    orderMoves(self,chessboard,moves,ply,firstMove = None)
+        Sorts the moves so the ones most likely to be best are searched first
+    """
+    def __init__(self,timeBudget = 5.0,maxDepth = 64,report = None,tableSize = DEFAULT_TABLE_SIZE,bitbases = None):
+        if type(timeBudget) not in (int,float):
+            raise TypeError("timeBudget must be a number of seconds, current type is " + str(type(timeBudget)))
+        if timeBudget <= 0:
+            raise ValueError("timeBudget must be positive, current value is " + str(timeBudget))
+        self.timeBudget = timeBudget
+        self.maxDepth = maxDepth
+        self.report = report
+        self.nodes = 0
+        self.killers = [[None,None] for _ in range(MAX_PLY)]
+        self.history = {"white": [0]*4096,"black": [0]*4096}
+        self.deadline = None
+        self.stopped = False
+        self.rootBestMove = None
+        self.table = TranspositionTable(tableSize) if tableSize else None
+        self.bitbases = bitbases
+
+    def stop(self):
+        """
+        Makes a running search return its best move as soon as possible, can be called from another thread
+        """
+        self.stopped = True
+
+    def search(self,chessboard):
+        """
+        Searches the position with iterative deepening: depth 1, 2, 3... until the time budget runs out or maxDepth
+            is reached. Each iteration searches the best move of the last one first
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The position to search, left unchanged
+
+        Returns
+        --------
+        SearchResult
+            The best move (None if there are no legal moves), its score, the last completed depth, the nodes
+            searched and the seconds taken
+        """
+        start = time.perf_counter()
+        self.deadline = start + self.timeBudget
+        self.stopped = False
+        self.nodes = 0
+        self.killers = [[None,None] for _ in range(MAX_PLY)]
+        if self.table:
+            self.table.newSearch()
+        undoDepth = len(chessboard.undoStack)
+
+        rootMoves = legalMoves(chessboard)
+        if not rootMoves:
+            return SearchResult(None,-MATE if isInCheck(chessboard,chessboard.toMove) else 0,0,0,0.0)
+        result = SearchResult(rootMoves[0],0,0,0,0.0)
+        for depth in range(1,self.maxDepth + 1):
+            self.rootBestMove = result.move if depth > 1 else None
+            try:
+                score = self.negamax(chessboard,depth,-INFINITY,INFINITY,0)
+            except SearchTimeout:
+                #Take back the moves of the abandoned iteration. Its best move so far is kept, it was searched first
+                while len(chessboard.undoStack) > undoDepth:
+                    chessboard.unmakeMove()
+                if self.rootBestMove != None and self.rootBestMove != result.move:
+                    result = result._replace(move = self.rootBestMove)
+                break
+            elapsed = time.perf_counter() - start
+            result = SearchResult(self.rootBestMove,score,depth,self.nodes,elapsed)
+            if self.report:
+                self.report(result)
+            #A mate has been found, or the next iteration wont finish in time
+            if abs(score) >= MATE - MAX_PLY or elapsed > self.timeBudget / 2:
+                break
+        return result._replace(nodes = self.nodes,elapsed = time.perf_counter() - start)
+
+    def checkClock(self):
+        """
+        Raises SearchTimeout if the search has to stop. Depth 1 is always completed, so there is a move to return
+        """
+        if (self.stopped or time.perf_counter() > self.deadline) and self.rootBestMove != None:
+            raise SearchTimeout()
+
+    def negamax(self,chessboard,depth,alpha,beta,ply):
+        """
+        Alpha-beta search in negamax form: the score of a position is minus the best score of the positions after it
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The position to search
+        depth : int
+            The plies left to search before the quiescence search
+        alpha, beta : int
+            The window of scores that can still change the result, alpha < beta
+        ply : int
+            The distance to the root of the search
+
+        Returns
+        --------
+        int
+            The score of the position, from the point of view of the player to move
+        """
+        self.nodes += 1
+        if self.nodes % NODES_BETWEEN_CLOCK_CHECKS == 0:
+            self.checkClock()
+        if ply > 0 and (chessboard.halfMoves >= 100 or chessboard.repetitionCount() > 1):
+            return 0
+
+        #A stored search at least as deep answers the position if its score is exact or outside the window
+        table = self.table
+        hashMove = None
+        if table and depth > 0:
+            entry = table.probe(chessboard.zobristKey,ply)
+            if entry:
+                entryDepth,bound,entryScore,hashMove = entry
+                if ply > 0 and entryDepth >= depth and (bound == EXACT or (bound == LOWER_BOUND and entryScore >= beta) or (bound == UPPER_BOUND and entryScore <= alpha)):
+                    return entryScore
+
+        moves = legalMoves(chessboard)
+        if not moves:
+            return -MATE + ply if isInCheck(chessboard,chessboard.toMove) else 0
+        if self.bitbases and ply > 0:
+            result = self.bitbases.probe(chessboard)
+            if result != None:
+                return 0 if result == 0 else result*KNOWN_WIN + evaluate(chessboard)
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.quiescence(chessboard,alpha,beta,ply,moves)
+
+        color = chessboard.toMove
+        board = chessboard.board
+        alphaStart = alpha
+        bestScore = -INFINITY
+        bestMove = None
+        for move in self.orderMoves(chessboard,moves,ply,self.rootBestMove if ply == 0 else hashMove):
+            quiet = board[move.toSquare] == None and move.promotion == None
+            chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+            score = -self.negamax(chessboard,depth - 1,-beta,-alpha,ply + 1)
+            chessboard.unmakeMove()
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+                if ply == 0:
+                    self.rootBestMove = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if quiet:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[color][move.fromSquare*64 + move.toSquare] += depth*depth
+                break
+
+        if table:
+            if bestScore >= beta:
+                table.store(chessboard.zobristKey,depth,LOWER_BOUND,bestScore,bestMove,ply)
+            elif bestScore > alphaStart:
+                table.store(chessboard.zobristKey,depth,EXACT,bestScore,bestMove,ply)
+            else:
+                #No move reached alpha, so none of them is known to be the best
+                table.store(chessboard.zobristKey,depth,UPPER_BOUND,bestScore,None,ply)
+        return bestScore
+
+    def quiescence(self,chessboard,alpha,beta,ply,moves = None):
+        """
+        Searches only captures and promotions until the position is quiet, so the evaluation isnt taken in the middle
+            of an exchange. The player to move can also stop capturing and keep the static evaluation (stand pat),
+            except when in check, where every legal move is searched
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The position to search
+        alpha, beta : int
+            The window of scores that can still change the result
+        ply : int
+            The distance to the root of the search
+        moves : list<Move>, optional
+            The legal moves of the position if they are already known
+
+        Returns
+        --------
+        int
+            The score of the position, from the point of view of the player to move
+        """
+        if moves == None:
+            self.nodes += 1
+            if self.nodes % NODES_BETWEEN_CLOCK_CHECKS == 0:
+                self.checkClock()
+            moves = legalMoves(chessboard)
+            if not moves:
+                return -MATE + ply if isInCheck(chessboard,chessboard.toMove) else 0
+
+        inCheck = isInCheck(chessboard,chessboard.toMove)
+        if inCheck:
+            bestScore = -INFINITY
+        else:
+            bestScore = evaluate(chessboard)
+            if bestScore >= beta or ply >= MAX_PLY - 1:
+                return bestScore
+            alpha = max(alpha,bestScore)
+            board = chessboard.board
+            enPassantSquare = chessboard.enPassantSquare
+            moves = [move for move in moves if board[move.toSquare] or move.promotion == "q"
+                     or (move.toSquare == enPassantSquare and type(board[move.fromSquare].pieceType) == Pawn)]
+
+        for move in self.orderMoves(chessboard,moves,ply):
+            chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+            score = -self.quiescence(chessboard,-beta,-alpha,ply + 1)
+            chessboard.unmakeMove()
+            if score > bestScore:
+                bestScore = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+        return bestScore
+
+    def orderMoves(self,chessboard,moves,ply,firstMove = None):
+        """
+        Sorts the moves in the order they should be searched: firstMove, then promotions and captures by MVV-LVA
+            (most valuable victim, least valuable attacker), then the killer moves of the ply, then the other quiet
+            moves by their history score
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The position of the moves
+        moves : list<Move>
+            The legal moves to sort
+        ply : int
+            The distance to the root of the search, to read the killer moves
+        firstMove : Move, optional
+            A move to search before all the others, usually the best move of a previous search
+
+        Returns
+        --------
+        list<Move>
+            The same moves, sorted
+        """
+        board = chessboard.board
+        killers = self.killers[ply]
+        history = self.history[chessboard.toMove]
+        def moveOrder(move):
+            if move == firstMove:
+                return (4,0)
+            victim = board[move.toSquare]
+            attacker = board[move.fromSquare].pieceType.letter.upper()
+            if victim:
+                return (3,10*CAPTURE_RANKS[victim.pieceType.letter.upper()] - CAPTURE_RANKS[attacker] + (50 if move.promotion == "q" else 0))
+            if move.promotion:
+                return (3 if move.promotion == "q" else 0,CAPTURE_RANKS[move.promotion.upper()])
+            if attacker == "P" and move.toSquare == chessboard.enPassantSquare:
+                return (3,10*CAPTURE_RANKS["P"] - CAPTURE_RANKS["P"])
+            if move == killers[0]:
+                return (2,1)
+            if move == killers[1]:
+                return (2,0)
+            return (1,history[move.fromSquare*64 + move.toSquare])
+        return sorted(moves,key = moveOrder,reverse = True)
+
+def scoreToString(score):
+    """
+    Writes a score like UCI does: "cp" and the centipawns, or "mate" and the moves to mate, negative if the player to
+        move is the one being mated
+    """
+    if abs(score) >= MATE - MAX_PLY:
+        return "mate {}".format((MATE - abs(score) + 1) // 2 * (1 if score > 0 else -1))
+    return "cp {}".format(score)
+
+def printResult(result):
+    """
+    Prints one line per completed iteration: depth, score, nodes, nodes per second and best move
+    """
+    nodesPerSecond = result.nodes / result.elapsed if result.elapsed else 0
+    print("depth {:>2} score {:<10} nodes {:>9} nps {:>7.0f} time {:>6.2f}s move {}".format(result.depth,scoreToString(result.score),result.nodes,nodesPerSecond,result.elapsed,moveToString(result.move)))
+
+def main():
+    parser = argparse.ArgumentParser(description = "Searches the best move of a position")
+    parser.add_argument("--fen",default = START_FEN,help = "position to search, defaults to the start position")
+    parser.add_argument("--movetime",type = float,default = 5.0,help = "seconds the search can take")
+    parser.add_argument("--depth",type = int,default = 64,help = "deepest iteration to search")
+    parser.add_argument("--hash",type = float,default = DEFAULT_TABLE_SIZE,help = "megabytes of the transposition table, 0 to search without it")
+    parser.add_argument("--book",help = "Polyglot opening book to look the position up in before searching")
+    parser.add_argument("--bitbases",help = "directory of the endgame bitbases made by bitbase.py")
+    arguments = parser.parse_args()
+    if arguments.movetime <= 0 or arguments.depth < 1 or arguments.hash < 0:
+        parser.error("movetime must be positive, depth at least 1 and hash not negative")
+
+    chessboard = Chessboard(8,8)
+    chessboard.FENToBoard(arguments.fen)
+    if arguments.book:
+        with OpeningBook(arguments.book) as book:
+            move = book.chooseMove(chessboard)
+        if move:
+            print("Book move: {}".format(moveToString(move)))
+            return 0
+    bitbases = Bitbases(arguments.bitbases) if arguments.bitbases else None
+    engine = Engine(arguments.movetime,arguments.depth,printResult,arguments.hash,bitbases)
+    result = engine.search(chessboard)
+    if result.move == None:
+        print("No legal moves")
+        return 0
+    nodesPerSecond = result.nodes / result.elapsed if result.elapsed else 0
+    print("Best move: {}, depth {}, {} nodes in {:.2f}s, {:.0f} nodes/s".format(moveToString(result.move),result.depth,result.nodes,result.elapsed,nodesPerSecond))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,35 @@
 import pygame
 from chessboard import Chessboard
-from pieces import Piece,King,Bishop,Queen,Rook,Pawn,Night
-from location import Square
+from pieces import King,Bishop,Queen,Rook,Pawn,Night
+from location import SQUARE_COUNT,SQUARE_X,SQUARE_Y,orientSquare
+
+#Name of the png of each piece type in the assets folder, prefixed by its color
+TEXTURE_NAMES = {"R":"Rook","B":"Bishop","P":"Pawn","Q":"Queen","N":"Knight","K":"King"}
+#Pieces a pawn of the client can promote to, by the key that chooses them
+PROMOTION_NAMES = {"q":"QUEEN","r":"ROOK","b":"BISHOP","n":"KNIGHT"}
+
+#Textures shared by every piece of the same type, loaded from the assets folder the first time they are drawn
+textureCache = {}
+
+def getTexture(pieceType):
+    """
+    Returns the texture of a piece type, loading it (only once) from the assets folder.
+    The rules side of the game (pieces, chessboard, server) never loads textures, they are only attached here
+
+    Parameters
+    -----------
+    pieceType : Queen, Rook, Bishop, Night, Pawn, King
+        The piece type whose texture is needed
+
+    Returns
+    --------
+    pygame.image
+        The .png associated to the piece type, upscaled to fit the board squares
+    """
+    if pieceType not in textureCache:
+        texture = pygame.image.load("assets/" + pieceType.color + TEXTURE_NAMES[pieceType.letter.upper()] + ".png")
+        textureCache[pieceType] = pygame.transform.scale_by(texture,1.5)
+    return textureCache[pieceType]
 
 class Graphics:
     """
@@ -54,14 +82,14 @@ class Graphics:
         Plays the default sound, set in __init__
     playCaptureSound(self)
         Plays the capture sound, set in __init__
-    convertGridCoords(self,x,y,color)
-        Converts grid coordinates depending on the color.
+    convertGridCoords(self,square,color)
+        Converts a square depending on the color.
         Example:
-            (1,1,"white) -> (1,1)
-            (1,1,"black") -> (6,6)
+            (9,"white) -> 9
+            (9,"black") -> 54
     drawSmallPiece(self,pieceType,x,y)
         Draws a chess piece in a small size, done to render eaten material for each player
-    drawPossibilityCircle(self,y,x)
+    drawPossibilityCircle(self,square)
         Draws a gray circle in a grid square to represent where selectedPiece can move
     checkForClick(self)
         Checks if in the current frame the user has clicked his mouse
@@ -73,6 +101,8 @@ class Graphics:
         Saves the events of the frame onto self.events
     checkForQuit(self)
         Detects if the user has closed the window
+    checkForPromotionKey(self)
+        Returns the piece chosen with the keyboard for the promotions
     drawSquare(self,color,rect)
         Draws a square of dimensions rect, of color color, on the screen
     renderToMove(self)
@@ -85,6 +115,8 @@ class Graphics:
         Returns the height and width the rect formed by the text
     renderOwnColor(self,color)
         Render the color you are playing in the chess match as text
+    renderPromotion(self,promotion)
+        Render the piece the pawns promote to as text
     displayEndScreen(self,color)
         In case of checkmate, display the checkmate screen
     drawBoard(self,chessboard)
@@ -177,29 +209,27 @@ class Graphics:
         """
         self.capture.play()
     
-    def convertGridCoords(self,x,y,color):
+    def convertGridCoords(self,square,color):
         """
-        Function to convert grid coordinates based on color
+        Function to convert a square based on color, using the orientation tables of location.py
         Server side color doesnt matter, but client side, for rendering and otherwise,
         black has an updated grid position.
         Examples:
 
-        (1,1,"white") => (1,1)
-        (1,1,"black") => (6,6)
+        (9,"white") => 9 (b7 stays on b7)
+        (9,"black") => 54 (b7 is drawn where g2 is)
         
         Parameters
         -----------
-        x : int
-            The x position of the piece. Ensures that 0 <= x < self.board.width
-        y : int
-            The y position of the piece. Ensures that 0 <= y < self.board.height
+        square : int
+            The square of the piece. Ensures that 0 <= square < 64
         color : str
             The color of the client. Ensures that it is either "white" or "black"
         
         Returns
         ---------
-        tuple(int,int)
-            The updated position in the form of a 2-tuple
+        int
+            The square as seen by the client
         
         Raises
         ----------
@@ -210,12 +240,10 @@ class Graphics:
         """
         
         #validating position input data
-        if type(x) != int :
-            raise TypeError("x must be of type int, current type is " + str(type(x)) + " ,and has a value of: " + str(x))
-        if type(y) != int :
-            raise TypeError("x must be of type int, current type is " + str(type(y)) + " ,and has a value of: " + str(y))
-        if x < 0 or x >= self.board.width or y < 0 or y > self.board.height:
-            raise ValueError("Coordinate input was invalid. Must be in range 0 <= x < " + str(self.board.width) + " , 0 <= y < " + str(self.board.height) + " .Current position is: " +str(x) + ", " + str(y))
+        if type(square) != int :
+            raise TypeError("square must be of type int, current type is " + str(type(square)) + " ,and has a value of: " + str(square))
+        if square < 0 or square >= SQUARE_COUNT:
+            raise ValueError("Square input was invalid. Must be in range 0 <= square < " + str(SQUARE_COUNT) + " .Current square is: " + str(square))
         
         
         
@@ -226,12 +254,7 @@ class Graphics:
             raise ValueError("Color must be either white or black, current color is: " + color)
         
         
-        if (x,y) == (-1,-1):
-            return (-1,-1)
-        if color == "white":
-            return (x,y)
-        else:
-            return (7-x , 7-y)
+        return orientSquare(square,color)
     
     def drawSmallPiece(self,pieceType,x,y):
         """
@@ -262,21 +285,17 @@ class Graphics:
         
         
         pieceSize = 27
-        currentPiece = Piece(-1,-1,pieceType)
-        texture = currentPiece.getTexture()
-        texture = pygame.transform.scale(texture,(pieceSize,pieceSize))
+        texture = pygame.transform.scale(getTexture(pieceType),(pieceSize,pieceSize))
         self.screen.blit(texture, (x,y))
     
-    def drawPossibilityCircle(self,y,x):
+    def drawPossibilityCircle(self,square):
         """
         Draws a small gray circle that represents the grid square where the selected piece can move to
         
         Parameters
         -----------
-        x : int
-            The x grid position of the piece. Ensures that 0 <= x < self.board.width
-        y : int
-            The y grid position of the piece. Ensures that 0 <= y < self.board.height
+        square : int
+            The square where the piece can move to. Ensures that 0 <= square < 64
         
         
         Raises
@@ -284,20 +303,11 @@ class Graphics:
         TypeError
             If the input parameters are not of the correct type, as shown above
         ValueError
-            If the grid coordinates (x,y) are out of their range
+            If the square is out of its range
         """
-        #Validating correct input type
-        if type(x) != int:
-            raise TypeError("x coordinate is not of type integer, current type is " + str(type(x)) + " and its value is " + str(x))
-        if type(y) != int:
-            raise TypeError("y coordinate is not of type integer, current type is " + str(type(y)) + " and its value is " + str(y))
-        
-        #validating data values
-        if x < 0 or x >= self.board.width or y < 0 or y > self.board.height:
-            raise ValueError("Coordinate input was invalid. Must be in range 0 <= x < " + str(self.board.width) + " , 0 <= y < " + str(self.board.height) + " .Current position is: " +str(x) + ", " + str(y))
-        
-        
-        x,y = self.convertGridCoords(x,y,self.clientColor)
+        #The square is validated by convertGridCoords
+        square = self.convertGridCoords(square,self.clientColor)
+        x,y = SQUARE_X[square],SQUARE_Y[square]
         pygame.draw.circle(self.screen, pygame.Color(80,80,80,2),(x*self.pixelsPerSquare + self.pixelsPerSquare // 2, y* self.pixelsPerSquare + self.pixelsPerSquare // 2),15)
     
     def checkForClick(self):
@@ -375,6 +385,21 @@ class Graphics:
                 return True
         return False
     
+    def checkForPromotionKey(self):
+        """
+        Checks if a piece for the promotions has been chosen in the current frame, with the keys q, r, b and n
+        
+        Returns
+        ----------
+        str
+            The letter of the last piece chosen ("q", "r", "b" or "n"), None if no key of a piece has been pressed
+        """
+        promotion = None
+        for event in self.events:
+            if event.type == pygame.KEYDOWN and event.unicode.lower() in PROMOTION_NAMES:
+                promotion = event.unicode.lower()
+        return promotion
+    
     def drawSquare(self,color,rect):
         """
         Draws a square onto the screen. Used to display the squared grid of the chess game
@@ -509,6 +534,29 @@ class Graphics:
         self.screen.blit(text1, (820,100))
         self.screen.blit(text2, (830,140))
         
+    def renderPromotion(self,promotion):
+        """
+        Draws the piece the pawns of the client promote to, and the keys that change it
+        
+        Parameters
+        -----------
+        promotion : str
+            The letter of the piece, "q", "r", "b" or "n"
+        
+        Raises
+        ----------
+        ValueError
+            If promotion isnt the letter of a piece a pawn can promote to
+        """
+        if promotion not in PROMOTION_NAMES:
+            raise ValueError("promotion must be q, r, b or n, current value is " + str(promotion))
+        
+        text1 = self.my_font.render("Promotes to: ", False, (0, 0, 0))
+        text2 = self.my_font.render(PROMOTION_NAMES[promotion], False, (0, 0, 0))
+        self.screen.blit(text1, (820,340))
+        self.screen.blit(text2, (830,380))
+        self.drawSmallText("Change with Q, R, B, N",820,425)
+        
     def displayEndScreen(self,color):
         """
         In case of checkmate, displays in the screen who has won
@@ -585,12 +633,11 @@ class Graphics:
         Prints the boards information for debugging purposes
         """
         
-        for row in self.board.board:
-            for obj in row:
-                if obj is None:
-                    print("None", end=" ")
-                else:
-                    print(type(obj.pieceType), end=" ")
+        for obj in self.board.board:
+            if obj is None:
+                print("None", end=" ")
+            else:
+                print(type(obj.pieceType), end=" ")
     
     def drawPieces(self,chessboard,color):
         """
@@ -621,27 +668,18 @@ class Graphics:
             raise ValueError("color must be either black or white, current color is: " + color)
         
         
-        #Reverses the pieces for black
-        pieces = self.board.getTempBoard()
-        if color =="black":
-            for i in range(len(pieces)):
-                pieces[i] = pieces[i][::-1]
-            pieces = pieces[::-1]
         boardHeight = chessboard.height
-        boardWidth = chessboard.width
         
         pixelsPerSquare = min(self.screenHeight,self.screenWidth) // boardHeight 
         offset = 5
-        n = len(pieces)
-        m = len(pieces[0])
-        
-        for i in range(n):
-            for j in range(m):
-                currentPiece = pieces[i][j]
-                if currentPiece == None:
-                    continue
-                
-                self.screen.blit(currentPiece.getTexture(), (j*pixelsPerSquare + offset,i*pixelsPerSquare + offset))
+        
+        #The board is drawn rotated for black, each square is looked up in the orientation tables
+        for square,currentPiece in enumerate(self.board.board):
+            if currentPiece == None:
+                continue
+            
+            screenSquare = orientSquare(square,color)
+            self.screen.blit(getTexture(currentPiece.pieceType), (SQUARE_X[screenSquare]*pixelsPerSquare + offset,SQUARE_Y[screenSquare]*pixelsPerSquare + offset))
 
     def testColor(self,color):
         """
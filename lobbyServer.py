@@ -0,0 +1,310 @@
+"""
+Server that hosts many games at once on an asyncio event loop. New connections are accepted for as long as it runs
+and wait in a lobby until they are paired with the next player that connects, then every game is played by its
+own task. The clients are the same as for server.py: they receive their color, the state is pushed when it
+changes and they send their clicks.
+
+Every input is applied inline on the event loop. The rules (legal moves, checkmate and draws) are pure Python and
+hold the GIL, so worker threads wouldnt let the loop run meanwhile, and a click costs about 0.1 milliseconds (0.5 at
+most), less than sending a game to a worker process and its state back. The other games wait that long at most.
+
+After a game, players that both want to play again get a rematch with the colors swapped. If only one of them
+does, or the other one disconnects, it goes back to the lobby to be paired again.
+
+Usage, from the root of the repository:
+    python lobbyServer.py
+    python lobbyServer.py --port 5555 --heartbeat 10
+    python lobbyServer.py --bitbases bitbases      Adjudicates the endings the bitbases say are drawn
+"""
+import argparse
+import asyncio
+import struct
+from chessboard import Chessboard
+from serverInterface import ServerInterface
+from location import START_FEN
+from bitbase import Bitbases
+from server import HOST,PORT,HEARTBEAT_INTERVAL,HEARTBEAT_MESSAGE,getDataToSend,getSnapshot,handleClick,gameResult
+from protocol import AsyncMessageStream,encodeMessage,COLOR,STATE,INPUT
+
+COLORS = ("white","black")
+
+def applyInput(interface,dataToSend,snapshot,data):
+    """
+    Applies the click of an input to a game and returns the STATE message of the game after it
+
+    Parameters
+    ----------
+    interface : ServerInterface
+        The interface of the game being played
+    dataToSend : dict
+        The state of the game, its "checkmate" is set if the input ended the game
+    snapshot : dict
+        The last message of the game, see server.getSnapshot
+    data : dict
+        The input of the player to move, its promotion is protocol.DEFAULT_PROMOTION if it has none
+
+    Returns
+    --------
+    bytes
+        The STATE message, the same object as before if the input didnt change the game
+    """
+    handleClick(interface,data,verbose = False)
+    status = interface.gameStatus()
+    if status:
+        dataToSend["checkmate"] = gameResult(interface,status)
+        return encodeMessage(STATE,getDataToSend(interface,dataToSend))
+    return getSnapshot(interface,dataToSend,snapshot)
+
+class Player:
+    """
+    A connection to the lobby server. Its inputs are read for as long as it is connected and put in the events of
+        the game it plays, inputs that arrive while it waits in the lobby are dropped
+
+    Attributes
+    ----------
+    stream : AsyncMessageStream
+        The connection to the client
+    address : tuple
+        The address of the client
+    events : asyncio.Queue
+        The events of the game being played, None in the lobby
+    index : int
+        The seat of the player in its game, 0 for white
+    connected : bool
+        False once the client disconnects
+
+    Methods
+    -------
+    readInputs(self)
+        Puts the inputs of the client in the events of its game as (index, data) until it disconnects, then puts
+        (index, None)
+    send(self,message)
+        Sends a message, a lost connection is found by readInputs
+    """
+    def __init__(self,stream,address):
+        self.stream = stream
+        self.address = address
+        self.events = None
+        self.index = None
+        self.connected = True
+
+    async def readInputs(self):
+        while True:
+            try:
+                messageType,data = await self.stream.receive()
+            except (OSError,ValueError,IndexError,struct.error):
+                #The connection was closed or sent a message that isnt valid
+                self.connected = False
+                self.stream.close()
+                if self.events != None:
+                    self.events.put_nowait((self.index,None))
+                return
+            if messageType == INPUT and self.events != None:
+                self.events.put_nowait((self.index,data))
+
+    async def send(self,message):
+        if self.connected:
+            try:
+                await self.stream.send(message)
+            except OSError:
+                pass
+
+class Lobby:
+    """
+    Accepts the players, pairs them and plays their games
+
+    Attributes
+    ----------
+    pairingQueue : asyncio.Queue
+        The players waiting for an opponent, in the order they arrived
+    games : set<asyncio.Task>
+        The tasks of the games being played
+    FEN : str
+        The position every game starts from
+    heartbeat : float
+        The seconds between the heartbeats of an idle game, 0 for none
+    bitbases : Bitbases
+        The endgame bitbases the drawn endings are adjudicated with, None to play them out
+
+    Methods
+    -------
+    serve(self,host,port)
+        Accepts connections and plays games until cancelled
+
+    Raises
+    -------
+    ValueError
+        If FEN isnt a valid position, checked once here instead of failing every game
+    """
+    def __init__(self,FEN = START_FEN,heartbeat = HEARTBEAT_INTERVAL,bitbases = None):
+        Chessboard(8,8).FENToBoard(FEN)
+        self.pairingQueue = asyncio.Queue()
+        self.games = set()
+        self.FEN = FEN
+        self.heartbeat = heartbeat
+        self.bitbases = bitbases
+
+    async def serve(self,host = HOST,port = PORT):
+        server = await asyncio.start_server(self.handleConnection,host,port)
+        print("Lobby server started on {}:{}".format(host,port))
+        matchmaker = asyncio.create_task(self.matchmaker())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            matchmaker.cancel()
+            for game in list(self.games):
+                game.cancel()
+
+    async def handleConnection(self,reader,writer):
+        """
+        Puts a new connection in the lobby and reads its inputs until it disconnects
+        """
+        player = Player(AsyncMessageStream(reader,writer),writer.get_extra_info("peername"))
+        print("Connection from {}".format(player.address))
+        await self.pairingQueue.put(player)
+        await player.readInputs()
+
+    async def matchmaker(self):
+        """
+        Pairs the players of the pairing queue two by two and starts a game task for every pair. The first one to
+            arrive plays white
+        """
+        waiting = None
+        while True:
+            player = await self.pairingQueue.get()
+            if not player.connected:
+                continue
+            if waiting == None or not waiting.connected:
+                waiting = player
+                continue
+            game = asyncio.create_task(self.playGames([waiting,player]))
+            self.games.add(game)
+            game.add_done_callback(self.games.discard)
+            print("Game started between {} and {}, {} games being played".format(waiting.address,player.address,len(self.games)))
+            waiting = None
+
+    async def playGames(self,players):
+        """
+        Plays games between two players until they dont both want a rematch. Then the ones that want to play go
+            back to the lobby and the others are sent the quit. A game that fails sends both players back to the
+            lobby, so they are never left waiting for a state that wont come
+        """
+        events = asyncio.Queue()
+        for player in players:
+            player.events = events
+        while True:
+            for i,player in enumerate(players):
+                player.index = i
+                await player.send(encodeMessage(COLOR,COLORS[i]))
+            dataToSend = {"position":None, "toMove": None, "selectedPiecePos": None,"eaten":None,"checkmate" : None,"restart":False,"quit":False}
+            try:
+                board = Chessboard(8,8)
+                interface = ServerInterface(board,self.bitbases)
+                board.FENToBoard(self.FEN)
+                finished = await self.playGame(interface,dataToSend,players,events)
+                if finished:
+                    playersWantToPlay = await self.askRematch(players,events)
+            except Exception as error:
+                print("The game between {} and {} failed: {!r}".format(players[0].address,players[1].address,error))
+                finished = False
+            if not finished:
+                #A player disconnected or the game failed, the ones still connected go back to the lobby
+                playersWantToPlay = [player.connected for player in players]
+                break
+            if not (playersWantToPlay[0] and playersWantToPlay[1]):
+                break
+            await self.broadcast(players,encodeMessage(STATE,dict(dataToSend,restart = True)))
+            #The rematch is played with the colors swapped
+            players.reverse()
+        for player,wantsToPlay in zip(players,playersWantToPlay):
+            player.events = None
+            player.index = None
+            if not player.connected:
+                continue
+            if wantsToPlay:
+                await player.send(encodeMessage(STATE,dict(dataToSend,restart = True)))
+                await self.pairingQueue.put(player)
+            else:
+                await player.send(encodeMessage(STATE,dict(dataToSend,quit = True)))
+                player.stream.close()
+
+    async def playGame(self,interface,dataToSend,players,events):
+        """
+        Plays one game like server.runGame: waits for the inputs, applies them and pushes the state when it
+            changes. Only the clicks of the player to move are applied, with the color of its seat
+
+        Returns
+        --------
+        bool
+            True when the game has ended, False if a player disconnected
+        """
+        snapshot = {}
+        sent = getSnapshot(interface,dataToSend,snapshot)
+        await self.broadcast(players,sent)
+        while True:
+            index,data = await self.nextEvent(players,events)
+            if data == None:
+                return False
+            if data["clickPos"] == (-1,-1) or COLORS[index] != interface.chessboard.toMove:
+                continue
+            data["color"] = COLORS[index]
+            message = applyInput(interface,dataToSend,snapshot,data)
+            if message is not sent:
+                await self.broadcast(players,message)
+                sent = message
+            if dataToSend["checkmate"] != None:
+                return True
+
+    async def askRematch(self,players,events):
+        """
+        Waits for the answers of both players to the end screen
+
+        Returns
+        --------
+        list<bool>
+            True for the players that want to play again, False for the ones that quit or disconnected
+        """
+        playersWantToPlay = [None,None]
+        while playersWantToPlay[0] == None or playersWantToPlay[1] == None:
+            index,data = await self.nextEvent(players,events)
+            if data == None:
+                playersWantToPlay[index] = False
+            elif data["wantsToPlay"] == "p":
+                playersWantToPlay[index] = True
+            elif data["wantsToPlay"] == "q":
+                playersWantToPlay[index] = False
+        return playersWantToPlay
+
+    async def nextEvent(self,players,events):
+        """
+        Waits for the next event of a game, sending a heartbeat to its players every heartbeat seconds without one
+        """
+        while True:
+            try:
+                return await asyncio.wait_for(events.get(),self.heartbeat or None)
+            except asyncio.TimeoutError:
+                await self.broadcast(players,HEARTBEAT_MESSAGE)
+
+    async def broadcast(self,players,message):
+        for player in players:
+            await player.send(message)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Chess server that pairs the players that connect and hosts all their games")
+    parser.add_argument("--host",default = HOST,help = "address to listen on")
+    parser.add_argument("--port",type = int,default = PORT,help = "port to listen on")
+    parser.add_argument("--fen",default = START_FEN,help = "position every game starts from")
+    parser.add_argument("--heartbeat",type = float,default = HEARTBEAT_INTERVAL,help = "seconds between the heartbeats of an idle game, 0 for none")
+    parser.add_argument("--bitbases",help = "directory of the endgame bitbases made by bitbase.py, to adjudicate drawn endings")
+    arguments = parser.parse_args()
+    bitbases = Bitbases(arguments.bitbases) if arguments.bitbases else None
+    lobby = Lobby(arguments.fen,arguments.heartbeat,bitbases)
+    try:
+        asyncio.run(lobby.serve(arguments.host,arguments.port))
+    except KeyboardInterrupt:
+        print("Lobby server stopped")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
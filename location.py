@@ -1,3 +1,111 @@
+"""
+Squares of the board and the lookup tables built on them. A square is an int from 0 to 63, square = y*8 + x where x is
+the column (0 is the a file) and y is the row (0 is the 8th rank), so a8 is 0, h8 is 7 and h1 is 63. Every table is
+indexed by square and built once on import, so the rules engine never has to check the edges of the board
+"""
+BOARD_SIZE = 8
+SQUARE_COUNT = BOARD_SIZE * BOARD_SIZE
+FILES = "abcdefgh"
+#The position every game, search and perft starts from unless told otherwise
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+#Grid offsets (dx,dy) of the knight jumps and the king steps, the first four king steps are the rook directions
+KNIGHT_JUMPS = [(2,-1),(2,1),(1,2),(-1,2),(-2,1),(-2,-1),(-1,-2),(1,-2)]
+KING_STEPS = [(1,0),(-1,0),(0,1),(0,-1),(1,1),(1,-1),(-1,1),(-1,-1)]
+
+def squareIndex(x,y):
+    """
+    Returns the square of the grid position (x,y). Ensures 0 <= x < 8 and 0 <= y < 8
+    """
+    return y*BOARD_SIZE + x
+
+def buildTargets(offsets):
+    """
+    Builds the squares reached from every square with one of the given (dx,dy) offsets, leaving out the ones
+        that fall outside the board
+
+    Returns
+    --------
+    tuple<tuple<int>>
+        The 64 tuples of target squares, one for each square
+    """
+    table = []
+    for square in range(SQUARE_COUNT):
+        x,y = square % BOARD_SIZE,square // BOARD_SIZE
+        table.append(tuple(squareIndex(x + dx,y + dy) for dx,dy in offsets if 0 <= x + dx < BOARD_SIZE and 0 <= y + dy < BOARD_SIZE))
+    return tuple(table)
+
+def buildRays():
+    """
+    Builds the ray of every direction from every square, ordered from the nearest square outwards and
+        without including the square itself
+
+    Returns
+    --------
+    tuple<tuple<tuple<int>>>
+        For every direction of KING_STEPS, a tuple with the ray starting in each of the 64 squares
+    """
+    rays = []
+    for dx,dy in KING_STEPS:
+        directionRays = []
+        for square in range(SQUARE_COUNT):
+            ray = []
+            x,y = square % BOARD_SIZE + dx,square // BOARD_SIZE + dy
+            while 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
+                ray.append(squareIndex(x,y))
+                x,y = x + dx,y + dy
+            directionRays.append(tuple(ray))
+        rays.append(tuple(directionRays))
+    return tuple(rays)
+
+SQUARE_X = tuple(square % BOARD_SIZE for square in range(SQUARE_COUNT))
+SQUARE_Y = tuple(square // BOARD_SIZE for square in range(SQUARE_COUNT))
+#The (x,y) grid position of every square, built once so converting a square back doesnt create a tuple
+SQUARE_POSITIONS = tuple(zip(SQUARE_X,SQUARE_Y))
+#Algebraic notation of every square ("a8" is 0) and the square of every name
+SQUARE_NAMES = tuple(FILES[x] + str(BOARD_SIZE - y) for x,y in SQUARE_POSITIONS)
+SQUARE_INDICES = {name: square for square,name in enumerate(SQUARE_NAMES)}
+#0 for light squares and 1 for dark squares
+SQUARE_COLORS = tuple((x + y) % 2 for x,y in SQUARE_POSITIONS)
+
+KNIGHT_TARGETS = buildTargets(KNIGHT_JUMPS)
+KING_TARGETS = buildTargets(KING_STEPS)
+#The squares a pawn of each color captures on. White pawns move towards y = 0 and black pawns towards y = 7
+PAWN_CAPTURES = {"white": buildTargets([(-1,-1),(1,-1)]), "black": buildTargets([(-1,1),(1,1)])}
+RAYS = buildRays()
+#Indices in RAYS of the rook and bishop directions
+ROOK_RAYS = (0,1,2,3)
+BISHOP_RAYS = (4,5,6,7)
+
+#The board seen by each player: black sees it rotated half a turn, so (x,y) is drawn at (7-x,7-y)
+FLIPPED = tuple(SQUARE_COUNT - 1 - square for square in range(SQUARE_COUNT))
+ORIENTATIONS = {"white": tuple(range(SQUARE_COUNT)), "black": FLIPPED}
+
+def orientSquare(square,color):
+    """
+    Converts a square between the board and the screen of a player. The conversion is its own inverse, so the
+        same call converts a clicked square back to the board
+
+    Parameters
+    ----------
+    square : int
+        The square to convert. Ensures 0 <= square < 64
+    color : str
+        The color of the player. Ensures its either "white" or "black"
+
+    Returns
+    --------
+    int
+        The square seen by that player
+    """
+    return ORIENTATIONS[color][square]
+
+def moveToString(move):
+    """
+    Writes a move in coordinate notation, e.g. "e2e4" or "a7a8q"
+    """
+    return SQUARE_NAMES[move.fromSquare] + SQUARE_NAMES[move.toSquare] + (move.promotion or "")
+
 class Square:
     def __init__(self, x, y=None):
         if isinstance(x, int) and isinstance(y, int):  # Vectorial notation
@@ -12,11 +120,18 @@ class Square:
         else:
             raise ValueError("Invalid arguments. Provide either (x, y) as integers or a single chess notation string.")
     
+    @classmethod
+    def fromIndex(cls, square):
+        return cls(SQUARE_X[square] + 1, BOARD_SIZE - SQUARE_Y[square])
+    
     def getSquareVector(self):
         return (self.x, self.y)
     
     def getSquareChessNotation(self):
         return f"{chr(self.x + ord('a') - 1)}{self.y}"
+    
+    def getSquareIndex(self):
+        return squareIndex(self.x - 1, BOARD_SIZE - self.y)
 
 
 
@@ -0,0 +1,322 @@
+"""
+Rules engine shared by ServerInterface and ClientInterface: legal move generation, checks and checkmate for a
+Chessboard. Moves are returned as Move records: fromSquare and toSquare are squares numbered as in location.py and
+promotion is the lowercase letter of the piece a pawn promotes to ("q","r","b" or "n"), or None if the move isnt a
+promotion
+"""
+from collections import namedtuple
+from pieces import King,Night,Bishop,Queen,Rook,Pawn
+from location import SQUARE_X,SQUARE_Y,KNIGHT_TARGETS,KING_TARGETS,PAWN_CAPTURES,RAYS,ROOK_RAYS,BISHOP_RAYS
+
+Move = namedtuple("Move",["fromSquare","toSquare","promotion"])
+
+PROMOTIONS = ("q","r","b","n")
+
+#The directions each sliding piece moves along, as indices of location.RAYS
+SLIDER_RAYS = {Rook: ROOK_RAYS,Bishop: BISHOP_RAYS,Queen: ROOK_RAYS + BISHOP_RAYS}
+
+def findChecksAndPins(chessboard,color):
+    """
+    Looks outwards from the king of a color to find the pieces giving check and the pieces pinned to the king
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at
+    color : str
+        The color of the king. Ensures its either "white" or "black"
+
+    Returns
+    --------
+    list<set>
+        One set per piece giving check, with its square and the squares between it and the king
+    dict[int] = set
+        For every pinned piece, the squares it can still move to: the ones between the king and the pinning piece,
+            including the pinning piece itself
+    """
+    board = chessboard.board
+    kingSquare = chessboard.whiteKingPos if color == "white" else chessboard.blackKingPos
+    checks = []
+    pins = {}
+
+    #Sliding pieces: the first piece on each ray gives check, or is pinned if its ours and a slider comes right after it
+    for direction,rays in enumerate(RAYS):
+        slider = Rook if direction < 4 else Bishop
+        ray = set()
+        pinned = None
+        for square in rays[kingSquare]:
+            ray.add(square)
+            piece = board[square]
+            if piece:
+                if piece.pieceType.color == color:
+                    if pinned:
+                        break
+                    pinned = piece
+                else:
+                    if type(piece.pieceType) in (slider,Queen):
+                        if pinned:
+                            pins[pinned.square] = ray
+                        else:
+                            checks.append(ray)
+                    break
+
+    for square in KNIGHT_TARGETS[kingSquare]:
+        piece = board[square]
+        if piece and piece.pieceType.color != color and type(piece.pieceType) == Night:
+            checks.append({square})
+
+    #The enemy pawns giving check are on the squares a pawn of our color would capture on
+    for square in PAWN_CAPTURES[color][kingSquare]:
+        piece = board[square]
+        if piece and piece.pieceType.color != color and type(piece.pieceType) == Pawn:
+            checks.append({square})
+    return checks,pins
+
+def legalMoves(chessboard,fromSquare = None):
+    """
+    Calculates all the legal moves of the player to move. The pieces giving check and the pinned pieces are found
+        once per position, so moves come out already legal and no move has to be played to test it. The only
+        exception is en passant, which is played on the board and taken back because it removes two pieces from a row
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at. Ensures the kings positions are up to date
+    fromSquare : int, optional
+        Only generates the moves of the piece on this square, defaults to None for the moves of every piece
+
+    Returns
+    --------
+    list<Move>
+        The legal moves, a pawn reaching the last row gives one move for each piece it can promote to
+
+    Raises
+    -------
+    ValueError
+        If fromSquare isnt a square of the board
+    """
+    board = chessboard.board
+    if fromSquare != None and not 0 <= fromSquare < len(board):
+        raise ValueError("fromSquare must be a square of the board, current value is " + str(fromSquare))
+    width = chessboard.width
+    lastRow = chessboard.height - 1
+    color = chessboard.toMove
+    opponent = "black" if color == "white" else "white"
+    kingSquare = chessboard.whiteKingPos if color == "white" else chessboard.blackKingPos
+    king = board[kingSquare]
+    checks,pins = findChecksAndPins(chessboard,color)
+    moves = []
+    kingMoves = fromSquare == None or fromSquare == kingSquare
+
+    #The king is taken off the board so it doesnt hide the squares behind it from the sliding pieces giving check
+    if kingMoves:
+        board[kingSquare] = None
+        for square in KING_TARGETS[kingSquare]:
+            target = board[square]
+            if (not target or target.pieceType.color != color) and not chessboard.isSquareAttacked(square,opponent):
+                moves.append(Move(kingSquare,square,None))
+        board[kingSquare] = king
+
+    #With two pieces giving check only the king can move
+    if len(checks) > 1:
+        return moves
+
+    if not checks and kingMoves:
+        rowStart = lastRow*width if color == "white" else 0
+        if color == "white":
+            kingSide,queenSide = chessboard.whiteKingCastling,chessboard.whiteQueenCastling
+        else:
+            kingSide,queenSide = chessboard.blackKingCastling,chessboard.blackQueenCastling
+        #The rights are only kept with the king and rook in place, the rooks are checked too for boards set by hand
+        rook = "R" if color == "white" else "r"
+        kingSide = kingSide and kingSquare == rowStart + 4 and board[rowStart + 7] != None and board[rowStart + 7].pieceType.letter == rook
+        queenSide = queenSide and kingSquare == rowStart + 4 and board[rowStart] != None and board[rowStart].pieceType.letter == rook
+        if kingSide and board[rowStart + 5] == board[rowStart + 6] == None:
+            if not chessboard.isSquareAttacked(rowStart + 5,opponent) and not chessboard.isSquareAttacked(rowStart + 6,opponent):
+                moves.append(Move(kingSquare,rowStart + 6,None))
+        if queenSide and board[rowStart + 1] == board[rowStart + 2] == board[rowStart + 3] == None:
+            if not chessboard.isSquareAttacked(rowStart + 3,opponent) and not chessboard.isSquareAttacked(rowStart + 2,opponent):
+                moves.append(Move(kingSquare,rowStart + 2,None))
+
+    #With one piece giving check, the other pieces can only capture it or block it
+    evasions = checks[0] if checks else None
+    forward = -width if color == "white" else width
+    startRow = lastRow - 1 if color == "white" else 1
+    enPassantSquare = chessboard.enPassantSquare
+
+    for square,piece in (enumerate(board) if fromSquare == None else ((fromSquare,board[fromSquare]),)):
+        if not piece or piece.pieceType.color != color:
+            continue
+        pieceType = type(piece.pieceType)
+        if pieceType == King:
+            continue
+        pin = pins.get(square)
+        targets = []
+
+        if pieceType == Pawn:
+            forwardSquare = square + forward
+            if 0 <= forwardSquare < len(board) and not board[forwardSquare]:
+                targets.append(forwardSquare)
+                if SQUARE_Y[square] == startRow and not board[forwardSquare + forward]:
+                    targets.append(forwardSquare + forward)
+            for captureSquare in PAWN_CAPTURES[color][square]:
+                target = board[captureSquare]
+                if target and target.pieceType.color != color:
+                    targets.append(captureSquare)
+                elif not target and captureSquare == enPassantSquare:
+                    if isLegalEnPassant(chessboard,piece,captureSquare,opponent):
+                        moves.append(Move(square,captureSquare,None))
+        elif pieceType == Night:
+            for targetSquare in KNIGHT_TARGETS[square]:
+                target = board[targetSquare]
+                if not target or target.pieceType.color != color:
+                    targets.append(targetSquare)
+        else:
+            for direction in SLIDER_RAYS[pieceType]:
+                for targetSquare in RAYS[direction][square]:
+                    target = board[targetSquare]
+                    if target:
+                        if target.pieceType.color != color:
+                            targets.append(targetSquare)
+                        break
+                    targets.append(targetSquare)
+
+        for target in targets:
+            if (evasions is None or target in evasions) and (pin is None or target in pin):
+                if pieceType == Pawn and (SQUARE_Y[target] == 0 or SQUARE_Y[target] == lastRow):
+                    for promotion in PROMOTIONS:
+                        moves.append(Move(square,target,promotion))
+                else:
+                    moves.append(Move(square,target,None))
+    return moves
+
+def isLegalEnPassant(chessboard,pawn,target,opponent):
+    """
+    Checks if an en passant capture leaves the king of the pawn safe. The capture is played on the board and taken back,
+        since removing both pawns from the same row can uncover a check that the pin detection doesnt see
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at
+    pawn : Piece
+        The pawn that captures
+    target : int
+        The en passant square
+    opponent : str
+        The color of the captured pawn
+
+    Returns
+    --------
+    bool
+        True if the capture is legal
+    """
+    board = chessboard.board
+    square = pawn.square
+    #The captured pawn is next to the capturing one, in the column of the target
+    capturedSquare = square + SQUARE_X[target] - SQUARE_X[square]
+    captured = board[capturedSquare]
+    board[square] = None
+    board[capturedSquare] = None
+    board[target] = pawn
+    kingSquare = chessboard.whiteKingPos if opponent == "black" else chessboard.blackKingPos
+    legal = not chessboard.isSquareAttacked(kingSquare,opponent)
+    board[target] = None
+    board[capturedSquare] = captured
+    board[square] = pawn
+    return legal
+
+def legalMovesFrom(chessboard,square):
+    """
+    Returns the legal moves of the piece placed in a square, generating only its own moves. Pieces of the player
+        that isnt moving have none
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at
+    square : int
+        The square of the piece
+
+    Returns
+    --------
+    list<Move>
+        The legal moves of that piece
+
+    Raises
+    -------
+    ValueError
+        If square isnt a square of the board
+    """
+    return legalMoves(chessboard,square)
+
+def checkStatus(chessboard,board = None,whiteKingPos = None,blackKingPos = None):
+    """
+    Finds out which kings are in check, looking outwards from each king with Chessboard.isSquareAttacked
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at
+    board : List<Piece>, optional
+        The board to look at, defaults to chessboard.board
+    whiteKingPos, blackKingPos : int, optional
+        The squares of the kings, default to the ones of the chessboard
+
+    Returns
+    --------
+    int
+        0 represents no checks, 1 represents white is in check, 2 represents black is in check and 3 both are in check
+    """
+    if whiteKingPos == None:
+        whiteKingPos = chessboard.whiteKingPos
+    if blackKingPos == None:
+        blackKingPos = chessboard.blackKingPos
+    whiteInCheck = chessboard.isSquareAttacked(whiteKingPos,"black",board)
+    blackInCheck = chessboard.isSquareAttacked(blackKingPos,"white",board)
+    if whiteInCheck and blackInCheck:
+        return 3
+    if whiteInCheck:
+        return 1
+    if blackInCheck:
+        return 2
+    return 0
+
+def isInCheck(chessboard,color):
+    """
+    Checks if the king of a color is attacked
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at
+    color : str
+        The color of the king. Ensures its either "white" or "black"
+
+    Returns
+    --------
+    bool
+        True if the king is in check
+    """
+    if color == "white":
+        return chessboard.isSquareAttacked(chessboard.whiteKingPos,"black")
+    return chessboard.isSquareAttacked(chessboard.blackKingPos,"white")
+
+def isCheckmate(chessboard,color):
+    """
+    Checks if a color is checkmated. Only the player to move can be checkmated: its king is in check and it has no
+        legal moves
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The game to look at
+    color : str
+        The color that could be checkmated. Ensures its either "white" or "black"
+
+    Returns
+    --------
+    bool
+        True if its checkmate
+    """
+    return color == chessboard.toMove and isInCheck(chessboard,color) and not legalMoves(chessboard)
@@ -0,0 +1,189 @@
+"""
+Parallel search of the engine on several cores with Lazy SMP: every worker process searches the same position with
+its own Engine, and they all share one transposition table in shared memory. The workers dont split the moves
+between them, they help each other through the table: what one worker stores another one finds, so the search of
+the main worker reaches a higher depth in the same time. The helpers start with a different history table, so they
+search the moves in another order and fill the table with different positions.
+
+Python threads dont run Python code in parallel, so every worker is its own process. They are started once and
+wait for positions, so a search doesnt pay the start up of a process.
+
+Usage, from the root of the repository:
+    python parallel.py --cores 4 --movetime 5
+    python parallel.py --cores 2 --fen "<FEN>" --depth 6
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from engine import Engine,printResult
+from location import START_FEN,moveToString
+from chessboard import Chessboard
+from transposition import TranspositionTable,DEFAULT_TABLE_SIZE,tableBytes
+
+class WorkerEngine(Engine):
+    """
+    Engine of a worker process. Besides its own clock, it stops when another worker sets the shared stop event.
+    Helpers (every worker but the first one) start with random history scores, so they order quiet moves differently
+    """
+    def __init__(self,workerId,stopEvent,timeBudget,maxDepth,table):
+        super().__init__(timeBudget,maxDepth,tableSize = 0)
+        self.workerId = workerId
+        self.stopEvent = stopEvent
+        self.table = table
+        if workerId:
+            self.seedHistory()
+
+    def seedHistory(self):
+        rng = random.Random(self.workerId)
+        self.history = {color: [rng.randrange(16) for _ in range(4096)] for color in ("white","black")}
+
+    def checkClock(self):
+        if self.stopEvent.is_set():
+            self.stopped = True
+        super().checkClock()
+
+def runWorker(workerId,sizeMB,memory,tasks,results,stopEvent):
+    """
+    Loop of a worker process: waits for (FEN, timeBudget, maxDepth) tasks and puts (workerId, SearchResult) in
+        results, until it gets None
+    """
+    table = TranspositionTable(sizeMB,memory)
+    engine = WorkerEngine(workerId,stopEvent,1.0,1,table)
+    chessboard = Chessboard(8,8)
+    while True:
+        task = tasks.get()
+        if task == None:
+            return
+        FEN,timeBudget,maxDepth = task
+        chessboard.FENToBoard(FEN)
+        engine.timeBudget = timeBudget
+        engine.maxDepth = maxDepth
+        if engine.workerId:
+            engine.seedHistory()
+        result = engine.search(chessboard)
+        if engine.workerId == 0:
+            #The main worker is done, the helpers return what they have
+            stopEvent.set()
+        results.put((workerId,result))
+
+class ParallelSearch:
+    """
+    Searches positions with several worker processes sharing a transposition table. Use it in a with statement,
+        or call close to stop the workers
+
+    Attributes
+    ----------
+    cores : int
+        The number of worker processes
+    timeBudget : float
+        The seconds a search can take
+    maxDepth : int
+        The deepest iteration of a search
+    sizeMB : float
+        The megabytes of the shared transposition table
+
+    Methods
+    -------
+    search(self,chessboard)
+        Returns the SearchResult of the best move found by the workers
+    close(self)
+        Stops the worker processes
+    """
+    def __init__(self,cores = None,timeBudget = 5.0,maxDepth = 64,sizeMB = DEFAULT_TABLE_SIZE):
+        if cores == None:
+            cores = os.cpu_count() or 1
+        if type(cores) != int:
+            raise TypeError("cores must be an int, current type is " + str(type(cores)))
+        if cores < 1:
+            raise ValueError("cores must be at least 1, current value is " + str(cores))
+        if type(timeBudget) not in (int,float):
+            raise TypeError("timeBudget must be a number of seconds, current type is " + str(type(timeBudget)))
+        if timeBudget <= 0:
+            raise ValueError("timeBudget must be positive, current value is " + str(timeBudget))
+        self.cores = cores
+        self.timeBudget = timeBudget
+        self.maxDepth = maxDepth
+        self.sizeMB = sizeMB
+        _,size = tableBytes(sizeMB)
+        #Raw shared memory without a lock, the table checks its own slots
+        self.memory = multiprocessing.RawArray("B",size)
+        self.stopEvent = multiprocessing.Event()
+        self.results = multiprocessing.Queue()
+        self.tasks = []
+        self.workers = []
+        for workerId in range(cores):
+            tasks = multiprocessing.Queue()
+            worker = multiprocessing.Process(target = runWorker,args = (workerId,sizeMB,self.memory,tasks,self.results,self.stopEvent),daemon = True)
+            worker.start()
+            self.tasks.append(tasks)
+            self.workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exception):
+        self.close()
+
+    def search(self,chessboard):
+        """
+        Searches a position with every worker until the main worker runs out of time or reaches maxDepth
+
+        Parameters
+        ----------
+        chessboard : Chessboard
+            The position to search, only its FEN is sent to the workers. Repetitions before it are not known
+
+        Returns
+        --------
+        SearchResult
+            The result of the worker that completed the deepest iteration (the main worker if tied), with the nodes
+            of every worker added up
+        """
+        start = time.perf_counter()
+        self.stopEvent.clear()
+        FEN = chessboard.getFEN()
+        for tasks in self.tasks:
+            tasks.put((FEN,self.timeBudget,self.maxDepth))
+        results = [self.results.get() for _ in self.workers]
+        nodes = sum(result.nodes for _,result in results)
+        #Sorted by depth and then the main worker first
+        _,best = max(results,key = lambda item: (item[1].depth,-item[0]))
+        return best._replace(nodes = nodes,elapsed = time.perf_counter() - start)
+
+    def close(self):
+        """
+        Stops the worker processes
+        """
+        for tasks in self.tasks:
+            tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.tasks = []
+        self.workers = []
+
+def main():
+    parser = argparse.ArgumentParser(description = "Searches the best move of a position on several cores")
+    parser.add_argument("--fen",default = START_FEN,help = "position to search, defaults to the start position")
+    parser.add_argument("--cores",type = int,default = os.cpu_count() or 1,help = "number of worker processes")
+    parser.add_argument("--movetime",type = float,default = 5.0,help = "seconds the search can take")
+    parser.add_argument("--depth",type = int,default = 64,help = "deepest iteration to search")
+    parser.add_argument("--hash",type = float,default = DEFAULT_TABLE_SIZE,help = "megabytes of the shared transposition table")
+    arguments = parser.parse_args()
+    if arguments.cores < 1 or arguments.movetime <= 0 or arguments.depth < 1 or arguments.hash <= 0:
+        parser.error("cores and depth must be at least 1, movetime and hash positive")
+
+    chessboard = Chessboard(8,8)
+    chessboard.FENToBoard(arguments.fen)
+    with ParallelSearch(arguments.cores,arguments.movetime,arguments.depth,arguments.hash) as search:
+        result = search.search(chessboard)
+    if result.move == None:
+        print("No legal moves")
+        return 0
+    printResult(result)
+    print("Best move: {}, depth {} on {} cores".format(moveToString(result.move),result.depth,arguments.cores))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+"""
+Perft (performance test) for the move generator: counts the leaf nodes of the tree of legal moves up to a depth.
+The counts are compared with known results to validate moveGenerator.legalMoves and Chessboard.makeMove/unmakeMove,
+and the time taken measures their speed in nodes per second.
+
+Usage, from the root of the repository:
+    python perft.py --depth 4                       Perft of the start position
+    python perft.py --depth 3 --fen "<FEN>" --divide  Node count below every legal move of a position
+    python perft.py --suite --depth 3               Checks every reference position up to that depth
+"""
+import argparse
+import time
+from chessboard import Chessboard
+from moveGenerator import legalMoves
+from location import START_FEN,moveToString
+
+#Reference positions with their known node counts by depth, from https://www.chessprogramming.org/Perft_Results
+#and the perft suite of Martin Sedlak for the en passant and promotion edge cases
+REFERENCE_POSITIONS = [
+    ("Start position", START_FEN,
+        {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("Kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ("Position 3, en passant pins", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("Position 4, promotions and castling", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ("Position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ("Illegal en passant, pinned on the row", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1",
+        {1: 18, 2: 92, 3: 1670, 4: 10138, 5: 185429}),
+    ("Illegal en passant, pinned on the diagonal", "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1",
+        {1: 13, 2: 102, 3: 1266, 4: 10276, 5: 135655}),
+    ("En passant capture gives check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1",
+        {1: 15, 2: 126, 3: 1928, 4: 13931, 5: 206379}),
+    ("Promote out of check", "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1",
+        {1: 11, 2: 133, 3: 1442, 4: 19174, 5: 266199}),
+    ("Promote to give check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1",
+        {1: 9, 2: 40, 3: 472, 4: 2661, 5: 38983}),
+    ("Underpromote to check", "8/P1k5/K7/8/8/8/8/8 w - - 0 1",
+        {1: 6, 2: 27, 3: 273, 4: 1329, 5: 18135}),
+]
+
+def perft(chessboard,depth):
+    """
+    Counts the leaf nodes of the tree of legal moves of a position. The moves are played and taken back on the
+        chessboard, which is left as it was. At depth 1 the legal moves are counted without playing them
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The position to start from
+    depth : int
+        The number of plies to look ahead. Ensures depth >= 0
+
+    Returns
+    --------
+    int
+        The number of positions reached at that depth
+    """
+    if depth == 0:
+        return 1
+    moves = legalMoves(chessboard)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+        nodes += perft(chessboard,depth - 1)
+        chessboard.unmakeMove()
+    return nodes
+
+def divide(chessboard,depth):
+    """
+    Perft split by the first move, used to find which move has a wrong count when comparing with another program
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The position to start from
+    depth : int
+        The number of plies to look ahead, including the first move. Ensures depth >= 1
+
+    Returns
+    --------
+    dict[str] = int
+        The number of positions at that depth after every legal move, written in coordinate notation
+    """
+    counts = {}
+    for move in legalMoves(chessboard):
+        chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+        counts[moveToString(move)] = perft(chessboard,depth - 1)
+        chessboard.unmakeMove()
+    return counts
+
+def timedPerft(FEN,depth):
+    """
+    Runs perft on a FEN and measures its speed
+
+    Returns
+    --------
+    int
+        The number of positions at that depth
+    float
+        The time taken, in seconds
+    """
+    chessboard = Chessboard(8,8)
+    chessboard.FENToBoard(FEN)
+    start = time.perf_counter()
+    nodes = perft(chessboard,depth)
+    return nodes,time.perf_counter() - start
+
+def runSuite(maxDepth):
+    """
+    Runs perft on every reference position, for every known depth up to maxDepth, printing the counts and speed
+
+    Returns
+    --------
+    bool
+        True if every count matches the expected one
+    """
+    passed = True
+    totalNodes = 0
+    totalTime = 0
+    for name,FEN,expectedCounts in REFERENCE_POSITIONS:
+        for depth in sorted(expectedCounts):
+            if depth > maxDepth:
+                break
+            nodes,elapsed = timedPerft(FEN,depth)
+            totalNodes += nodes
+            totalTime += elapsed
+            result = "ok" if nodes == expectedCounts[depth] else "FAILED, expected {}".format(expectedCounts[depth])
+            passed = passed and nodes == expectedCounts[depth]
+            print("{:<45} depth {} {:>10} nodes {:>10.0f} nodes/s {}".format(name,depth,nodes,nodes / elapsed,result))
+    print("Total: {} nodes in {:.2f}s, {:.0f} nodes/s".format(totalNodes,totalTime,totalNodes / totalTime))
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description = "Counts the leaf nodes of the legal move tree of a position")
+    parser.add_argument("--depth",type = int,default = 3,help = "number of plies to look ahead")
+    parser.add_argument("--fen",default = START_FEN,help = "position to start from, defaults to the start position")
+    parser.add_argument("--divide",action = "store_true",help = "print the node count below every legal move")
+    parser.add_argument("--suite",action = "store_true",help = "check every reference position up to --depth")
+    arguments = parser.parse_args()
+    if arguments.depth < 1:
+        parser.error("depth must be at least 1")
+
+    if arguments.suite:
+        return 0 if runSuite(arguments.depth) else 1
+
+    chessboard = Chessboard(8,8)
+    chessboard.FENToBoard(arguments.fen)
+    start = time.perf_counter()
+    if arguments.divide:
+        counts = divide(chessboard,arguments.depth)
+        for move in sorted(counts):
+            print("{}: {}".format(move,counts[move]))
+        nodes = sum(counts.values())
+        print("Moves: {}".format(len(counts)))
+    else:
+        nodes = perft(chessboard,arguments.depth)
+    elapsed = time.perf_counter() - start
+    print("Nodes: {}".format(nodes))
+    print("Time: {:.3f}s, {:.0f} nodes/s".format(elapsed,nodes / elapsed if elapsed else 0))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
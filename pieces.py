@@ -1,56 +1,84 @@
-import pygame
 class Piece:
     """
-    Implementation of a chess piece
+    Implementation of a chess piece. Pieces only know where they are and what they are, the squares they can
+    move to are returned by moveGenerator instead of being stored in them. Slotted, so a piece is two references
+    without a dictionary
     
     Attributes
     -----------
-    row : int
-        The y position of the current piece, has to be either 0 <= row < chessboard.height or -1 for 
+    square : int
+        The square of the current piece (see location.py), has to be either 0 <= square < 64 or -1 for 
         piece textures that dont appear on the board
-    column : int
-        The x position of the current piece, has to be either 0 <= column < chessboard.width or -1 for 
-        piece textures that dont appear on the board
-    position : tuple (int,int)
-        A tuple representing the position based on row and column (see above)
     pieceType : Rook, Queen, King, Pawn, Bishop, Night
-        The type of piece, used to display its texture and color
-    currentPossibilities : set
-        The grid squares the current piece has access to. Ensures all possibilities are in the form
-        tuple(int x,int y), and all ints are 0 <= x < chessboard.width and 0 <= y < chessboard.height
+        The type of piece, used to know its movement and color
         
     
     Methods
     -------
-    getTexture(self)
-        Returns the texture of the piece
+    getPieceInfo(self)
+        Returns the color and type of the piece as a string
+    setPosition(self,square)
+        Moves the piece to a square
     """
+    __slots__ = ("square","pieceType")
     
-    def __init__(self,row,column,pieceType):
-        self.row = row
-        self.column = column
-        self.position = (column,row)
+    def __init__(self,square,pieceType):
+        self.square = square
         self.pieceType = pieceType
-        self.currentPossibilities = set()
     
-    def getTexture(self):
-        """
-        Getter of the current pieces texture
-        
-        Returns
-        pygame.image
-            The .png associated to the piece, to be found in the assets folder
-        """
-        return self.pieceType.texture
-
     def getPieceInfo(self):
         return self.pieceType.color + " " + str(type(self.pieceType))
         
-    def setPosition(self,x,y):
-        self.position = (x,y)
-        self.row = y
-        self.column = x
-class Rook:
+    def setPosition(self,square):
+        self.square = square
+
+class PieceType:
+    """
+    Parent class of every piece type. There is only one instance per color and kind, every constructor call
+    returns that shared instance (e.g. Rook("white") is Rook("white")), so piece types cant be modified once built.
+    Piece types dont know anything about their textures, those are attached by the Graphics class client side
+
+    Attributes
+    -----------
+    color : str
+        The color of the piece. Ensures thats its value is either "white" or "black"
+    letter : str
+        The letter of the piece in a FEN, uppercase for white and lowercase for black
+
+    Raises
+    -------
+    ValueError
+        If color is not a string or is neither white or black
+    AttributeError
+        If an attribute of the piece type is changed
+    """
+    __slots__ = ("color","letter")
+    registry = {}
+    symbol = None
+
+    def __new__(cls,color):
+        instance = PieceType.registry.get((cls,color))
+        if instance:
+            return instance
+
+        if type(color) != str:
+            raise ValueError("color must be of type string, current type is " + str(type(color)))
+        if color != "white" and color != "black":
+            raise ValueError("Invalid Piece Color for " + cls.__name__)
+
+        instance = object.__new__(cls)
+        object.__setattr__(instance,"color",color)
+        object.__setattr__(instance,"letter",cls.symbol if color == "white" else cls.symbol.lower())
+        PieceType.registry[(cls,color)] = instance
+        return instance
+
+    def __setattr__(self,name,value):
+        raise AttributeError("Piece types are shared between pieces and cant be modified")
+
+    def __reduce__(self):
+        return (type(self),(self.color,))
+
+class Rook(PieceType):
     """
     Class that implements the rook piece. Can move up, down, left and right until the end of the board is found 
     or if a piece is found in its path. If the piece is of the opposite color, it can also move into that piece,
@@ -60,8 +88,6 @@ class Rook:
     -----------
     color : str
         The color of the piece. Ensures thats its value is either "white" or "black"
-    texture : pygame.image
-        The texture associated to the piece. Its a png file found in the assets folder
     
     
     Raises
@@ -71,21 +97,10 @@ class Rook:
     ValidError 
         If color is neither white or black
     """
-    
-    def __init__(self,color):
-        if type(color) != str:
-            raise ValueError("color must be of type string, current type is " + str(type(color)))
-        
-        self.color = color
-        if self.color == "white":
-            self.texture = pygame.image.load("assets/whiteRook.png")
-        elif self.color == "black":
-            self.texture = pygame.image.load("assets/blackRook.png")
-        else:
-            raise ValueError("Invalid Piece Color for Rook")
-        self.texture = pygame.transform.scale_by(self.texture,1.5)
-        
-class Bishop:
+    __slots__ = ()
+    symbol = "R"
+
+class Bishop(PieceType):
     """
     Class that implements the bishop piece. Can move up-left, down-left, up-right and down-right until the end of the board is found 
     or if a piece is found in its path. If the piece is of the opposite color, it can also move into that piece,
@@ -95,8 +110,6 @@ class Bishop:
     -----------
     color : str
         The color of the piece. Ensures thats its value is either "white" or "black"
-    texture : pygame.image
-        The texture associated to the piece. Its a png file found in the assets folder
     
     
     Raises
@@ -106,21 +119,10 @@ class Bishop:
     ValidError 
         If color is neither white or black
     """
-    
-    def __init__(self,color):
-        if type(color) != str:
-            raise ValueError("color must be of type string, current type is " + str(type(color)))
-        
-        self.color = color
-        if self.color == "white":
-            self.texture = pygame.image.load("assets/whiteBishop.png")
-        elif self.color == "black":
-            self.texture = pygame.image.load("assets/blackBishop.png")
-        else:
-            raise Exception("Invalid Piece Color for Bishop")
-        self.texture = pygame.transform.scale_by(self.texture,1.5)
-        
-class Pawn:
+    __slots__ = ()
+    symbol = "B"
+
+class Pawn(PieceType):
     """
     Class that implements the pawn piece. 
     Possible movements:
@@ -133,8 +135,6 @@ class Pawn:
     -----------
     color : str
         The color of the piece. Ensures thats its value is either "white" or "black"
-    texture : pygame.image
-        The texture associated to the piece. Its a png file found in the assets folder
     
     
     Raises
@@ -144,21 +144,10 @@ class Pawn:
     ValidError 
         If color is neither white or black
     """
-    
-    def __init__(self,color):
-        if type(color) != str:
-            raise ValueError("color must be of type string, current type is " + str(type(color)))
-        
-        self.color = color
-        if self.color == "white":
-            self.texture = pygame.image.load("assets/whitePawn.png")
-        elif self.color == "black":
-            self.texture = pygame.image.load("assets/blackPawn.png")
-        else:
-            raise Exception("Invalid Piece Color for Pawn")
-        self.texture = pygame.transform.scale_by(self.texture,1.5)
-        
-class Queen:
+    __slots__ = ()
+    symbol = "P"
+
+class Queen(PieceType):
     """
     Class that implements the queen piece. It can move as the combination of the Rook and Bishop class (see above).
     
@@ -166,8 +155,6 @@ class Queen:
     -----------
     color : str
         The color of the piece. Ensures thats its value is either "white" or "black"
-    texture : pygame.image
-        The texture associated to the piece. Its a png file found in the assets folder
     
     
     Raises
@@ -177,21 +164,10 @@ class Queen:
     ValidError 
         If color is neither white or black
     """
-    
-    def __init__(self,color):
-        if type(color) != str:
-            raise ValueError("color must be of type string, current type is " + str(type(color)))
-        
-        self.color = color
-        if self.color == "white":
-            self.texture = pygame.image.load("assets/whiteQueen.png")
-        elif self.color == "black":
-            self.texture = pygame.image.load("assets/blackQueen.png")
-        else:
-            raise Exception("Invalid Piece Color for Queen")
-        self.texture = pygame.transform.scale_by(self.texture,1.5)
-    
-class Night:
+    __slots__ = ()
+    symbol = "Q"
+
+class Night(PieceType):
     """
     Class that implements the knight piece. It can move in an L shape in all eight directions. (2-forward-1 to the side)
     
@@ -199,8 +175,6 @@ class Night:
     -----------
     color : str
         The color of the piece. Ensures thats its value is either "white" or "black"
-    texture : pygame.image
-        The texture associated to the piece. Its a png file found in the assets folder
     
     
     Raises
@@ -210,21 +184,10 @@ class Night:
     ValidError 
         If color is neither white or black
     """
-    
-    def __init__(self,color):
-        if type(color) != str:
-            raise ValueError("color must be of type string, current type is " + str(type(color)))
-        
-        self.color = color
-        if self.color == "white":
-            self.texture = pygame.image.load("assets/whiteKnight.png")
-        elif self.color == "black":
-            self.texture = pygame.image.load("assets/blackKnight.png")
-        else:
-            raise Exception("Invalid Piece Color for Knight")
-        self.texture = pygame.transform.scale_by(self.texture,1.5)
-        
-class King:
+    __slots__ = ()
+    symbol = "N"
+
+class King(PieceType):
     """
     Class that implements the King piece. Can move in all 8 directions but only one square at a time.
     
@@ -232,8 +195,6 @@ class King:
     -----------
     color : str
         The color of the piece. Ensures thats its value is either "white" or "black"
-    texture : pygame.image
-        The texture associated to the piece. Its a png file found in the assets folder
     
     
     Raises
@@ -243,17 +204,33 @@ class King:
     ValidError 
         If color is neither white or black
     """
-    
-    def __init__(self,color):
-        if type(color) != str:
-            raise ValueError("color must be of type string, current type is " + str(type(color)))
-        
-        self.color = color
-        if self.color == "white":
-            self.texture = pygame.image.load("assets/whiteKing.png")
-        elif self.color == "black":
-            self.texture = pygame.image.load("assets/blackKing.png")
-        else:
-            raise Exception("Invalid Piece Color for King")       
-        self.texture = pygame.transform.scale_by(self.texture,1.5)
-        
+    __slots__ = ()
+    symbol = "K"
+
+#Every piece type indexed by its FEN letter, e.g. PIECE_TYPES["n"] is Night("black")
+PIECE_TYPES = {pieceClass(color).letter: pieceClass(color) for pieceClass in (Rook,Bishop,Pawn,Queen,Night,King) for color in ("white","black")}
+
+def getPieceType(letter):
+    """
+    Returns the shared piece type that matches a FEN letter. Uppercase letters are white pieces and
+    lowercase letters are black pieces
+
+    Parameters
+    -----------
+    letter : str
+        One of "PNBRQKpnbrqk"
+
+    Returns
+    --------
+    Rook, Queen, King, Pawn, Bishop, Night
+        The piece type of that letter
+
+    Raises
+    -------
+    ValueError
+        If the letter isnt a valid piece
+    """
+    try:
+        return PIECE_TYPES[letter]
+    except KeyError:
+        raise ValueError("Invalid piece letter: {}".format(letter))
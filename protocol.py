@@ -0,0 +1,342 @@
+"""
+Binary wire protocol between the server and the clients. Every message is framed as:
+
+    length (4 bytes, big endian) | type tag (1 byte) | payload (length bytes)
+
+so the receiver always knows where a message ends, even if TCP joins or splits them, and reads it straight into a
+preallocated buffer with recv_into. The payloads are packed with struct instead of pickle:
+
+    COLOR   (server -> client)  color (1 byte)
+    STATE   (server -> client)  toMove (1), selected square (1, signed, -1 for none), result (1), restart (1),
+                                quit (1), eaten pieces (12 counts in EATEN_ORDER), then the position (70) as
+                                    packed by Chessboard.boardToPosition: squares (64, one byte each from a8 to h1),
+                                    flags (1, NO_POSITION_FLAGS if there is no position yet), en passant square (1),
+                                    halfmoves (2) and fullmoves (2)
+    INPUT   (client -> server)  color (1), click x (2, signed), click y (2, signed), wants to play (1), promotion (1)
+    HEARTBEAT (server -> client)  no payload, sent while a game is idle so a dead connection is noticed
+
+Decoded messages are the same dictionaries the server and clients used with pickle, except the position: the
+"position" of the state is the tuple of Chessboard.boardToPosition, which the server packs once per move and the
+clients load with Chessboard.positionToBoard, so no FEN is written or parsed on the way. A state is packed and
+unpacked with one precompiled struct each, with its header, which is faster than pickle both ways
+(see benchmarks/protocolBenchmark.py).
+"""
+import asyncio
+import struct
+from operator import itemgetter
+from chessboard import NO_SQUARE
+
+HEADER = struct.Struct(">IB")
+HEADER_SIZE = HEADER.size
+
+#Type tags
+COLOR = 1
+STATE = 2
+INPUT = 3
+HEARTBEAT = 4
+
+COLORS = ("white","black")
+COLOR_CODES = {"white": 0,"black": 1,None: 255}
+#The color of every byte, None for the ones that arent a color
+DECODED_COLORS = COLORS + (None,)*(256 - len(COLORS))
+#The "checkmate" field of the state: who won, or a draw
+RESULTS = (None,"white","black","draw")
+RESULT_CODES = {result: code for code,result in enumerate(RESULTS)}
+WANTS_TO_PLAY = (None,"p","q")
+WANTS_TO_PLAY_CODES = {value: code for code,value in enumerate(WANTS_TO_PLAY)}
+PROMOTIONS = (None,"q","r","b","n")
+PROMOTION_CODES = {value: code for code,value in enumerate(PROMOTIONS)}
+#The piece a pawn promotes to when an input has none, the servers never ask for it
+DEFAULT_PROMOTION = "q"
+EATEN_ORDER = "PNBRQKpnbrqk"
+#The 12 counts of an eaten dictionary in EATEN_ORDER, with one call
+EATEN_COUNTS = itemgetter(*EATEN_ORDER)
+NO_EATEN = {letter: 0 for letter in EATEN_ORDER}
+#The flags sent instead of a position before the game has one, Chessboard.boardToPosition never sets them all
+NO_POSITION_FLAGS = 255
+NO_POSITION = (bytes(64),NO_POSITION_FLAGS,NO_SQUARE,0,0)
+
+COLOR_PAYLOAD = struct.Struct(">B")
+STATE_PAYLOAD = struct.Struct(">BbBBB12B64sBBHH")
+#A whole STATE message, header and payload, packed by a single call
+STATE_MESSAGE = struct.Struct(HEADER.format + STATE_PAYLOAD.format[1:])
+INPUT_PAYLOAD = struct.Struct(">BhhBB")
+#Bytes of the receive buffer, enough for many messages. It grows if a bigger one arrives
+BUFFER_SIZE = 65536
+#Longest payload accepted, far more than any message needs, so a broken or hostile peer cant make the buffer grow
+MAX_PAYLOAD_SIZE = 4096
+#The payload size of every message type, all the messages of a type have the same size
+PAYLOAD_SIZES = {COLOR: COLOR_PAYLOAD.size,STATE: STATE_PAYLOAD.size,INPUT: INPUT_PAYLOAD.size,HEARTBEAT: 0}
+
+def checkHeader(length,messageType):
+    """
+    Checks the header of a message before its payload is read: payloads are decoded in place, at an offset of the
+        receive buffer, so one shorter than its type would be decoded with the bytes that follow it
+
+    Raises
+    -------
+    ValueError
+        If the payload is longer than MAX_PAYLOAD_SIZE, the type tag isnt known or the payload doesnt have the size of
+        its type
+    """
+    if length > MAX_PAYLOAD_SIZE:
+        raise ValueError("Message too long: {} bytes".format(length))
+    if PAYLOAD_SIZES.get(messageType) != length:
+        raise ValueError("Invalid message of type {} with a payload of {} bytes".format(messageType,length))
+
+def encodeMessage(messageType,data):
+    """
+    Packs a message with its header
+
+    Parameters
+    ----------
+    messageType : int
+        COLOR, STATE or INPUT
+    data : str or dict
+        The color for COLOR, the state dictionary sent by the server for STATE and the input dictionary sent by the
+        clients for INPUT. Ignored for HEARTBEAT
+
+    Returns
+    --------
+    bytes
+        The framed message
+
+    Raises
+    -------
+    ValueError
+        If messageType isnt a known type tag
+    """
+    if messageType == COLOR:
+        payload = COLOR_PAYLOAD.pack(COLOR_CODES[data])
+    elif messageType == STATE:
+        selected = data["selectedPiecePos"]
+        return STATE_MESSAGE.pack(STATE_PAYLOAD.size,STATE,COLOR_CODES[data["toMove"]],-1 if selected == None else selected,
+                                  RESULT_CODES[data["checkmate"]],data["restart"],data["quit"],
+                                  *EATEN_COUNTS(data["eaten"] or NO_EATEN),*(data["position"] or NO_POSITION))
+    elif messageType == INPUT:
+        x,y = data.get("clickPos") or (-1,-1)
+        payload = INPUT_PAYLOAD.pack(COLOR_CODES[data.get("color")],x,y,WANTS_TO_PLAY_CODES[data.get("wantsToPlay")],
+                                     PROMOTION_CODES[data.get("promotion")])
+    elif messageType == HEARTBEAT:
+        payload = b""
+    else:
+        raise ValueError("Unknown message type: {}".format(messageType))
+    return HEADER.pack(len(payload),messageType) + payload
+
+def decodePayload(messageType,payload,offset = 0):
+    """
+    Unpacks the payload of a message, the inverse of encodeMessage
+
+    Parameters
+    ----------
+    messageType : int
+        The type tag of the message
+    payload : bytes-like
+        The bytes the payload is in, like the receive buffer, so it is read without slicing or copying it
+    offset : int, optional
+        Where the payload starts in payload, defaults to 0
+
+    Returns
+    --------
+    str or dict
+        The color for COLOR, the state or input dictionary for STATE and INPUT, None for HEARTBEAT
+    """
+    if messageType == STATE:
+        #Unpacked into names, building the eaten dictionary from them is twice as fast as dict(zip(...))
+        (toMove,selected,result,restart,quit,P,N,B,R,Q,K,p,n,b,r,q,k,
+         squares,flags,enPassant,halfMoves,fullMoves) = STATE_PAYLOAD.unpack_from(payload,offset)
+        return {"position": None if flags == NO_POSITION_FLAGS else (squares,flags,enPassant,halfMoves,fullMoves),
+                "toMove": DECODED_COLORS[toMove],
+                "selectedPiecePos": selected,
+                "checkmate": RESULTS[result],
+                "restart": restart == 1,
+                "quit": quit == 1,
+                "eaten": {"P": P,"N": N,"B": B,"R": R,"Q": Q,"K": K,"p": p,"n": n,"b": b,"r": r,"q": q,"k": k}}
+    if messageType == INPUT:
+        color,x,y,wantsToPlay,promotion = INPUT_PAYLOAD.unpack_from(payload,offset)
+        return {"color": DECODED_COLORS[color],"clickPos": (x,y),"wantsToPlay": WANTS_TO_PLAY[wantsToPlay],"promotion": PROMOTIONS[promotion]}
+    if messageType == COLOR:
+        return DECODED_COLORS[COLOR_PAYLOAD.unpack_from(payload,offset)[0]]
+    if messageType == HEARTBEAT:
+        return None
+    raise ValueError("Unknown message type: {}".format(messageType))
+
+def decodeMessage(message):
+    """
+    Unpacks a whole framed message
+
+    Returns
+    --------
+    tuple
+        (messageType, data)
+
+    Raises
+    -------
+    ValueError
+        If the header isnt valid or the message is shorter than it says, see checkHeader
+    """
+    length,messageType = HEADER.unpack_from(message)
+    checkHeader(length,messageType)
+    if len(message) < HEADER_SIZE + length:
+        raise ValueError("The message is shorter than its header says")
+    return messageType,decodePayload(messageType,message,HEADER_SIZE)
+
+class MessageStream:
+    """
+    Sends and receives framed messages through a socket. Messages are received into one buffer allocated once,
+        reading as many bytes as the socket has, so a message that arrived with the last one needs no system call
+
+    Attributes
+    ----------
+    socket : socket
+        The connected socket
+    buffer : bytearray
+        The receive buffer
+    view : memoryview
+        A view of buffer, so reading into a part of it doesnt copy
+    start, end : int
+        The received bytes that havent been read yet are buffer[start:end]
+
+    Methods
+    -------
+    send(self,message)
+        Sends a message packed by encodeMessage
+    receive(self)
+        Waits for the next message and returns (messageType, data)
+    """
+    def __init__(self,socket):
+        self.socket = socket
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def send(self,message):
+        self.socket.sendall(message)
+
+    def receiveExactly(self,size):
+        """
+        Returns where the next size bytes start in self.buffer, receiving from the socket until they are in it.
+            They are read from there with unpack_from before the next receive, so no view or copy is made
+
+        Raises
+        -------
+        ConnectionError
+            If the other side closes the connection
+        """
+        while self.end - self.start < size:
+            if self.start + size > len(self.buffer):
+                #Move the unread bytes to the front, into a bigger buffer if the message doesnt fit
+                pending = self.end - self.start
+                if size > len(self.buffer):
+                    buffer = bytearray(max(size,2*len(self.buffer)))
+                    buffer[:pending] = self.view[self.start:self.end]
+                    self.view.release()
+                    self.buffer = buffer
+                    self.view = memoryview(buffer)
+                else:
+                    self.view[:pending] = self.view[self.start:self.end]
+                self.start,self.end = 0,pending
+            count = self.socket.recv_into(self.view[self.end:])
+            if count == 0:
+                raise ConnectionError("The connection was closed")
+            self.end += count
+        start = self.start
+        self.start += size
+        if self.start == self.end:
+            self.start = self.end = 0
+        return start
+
+    def receive(self):
+        """
+        Waits for the next message. A whole message usually arrives with a single recv_into, and then it is decoded
+            straight from the buffer, only a message split by TCP goes through receiveExactly
+
+        Returns
+        --------
+        tuple
+            (messageType, data), data decoded by decodePayload
+
+        Raises
+        -------
+        ConnectionError
+            If the other side closes the connection
+        ValueError
+            If the header isnt valid, see checkHeader
+        """
+        start,end = self.start,self.end
+        if start == end:
+            start = 0
+            end = self.socket.recv_into(self.buffer)
+            if end == 0:
+                raise ConnectionError("The connection was closed")
+        if end - start >= HEADER_SIZE:
+            length,messageType = HEADER.unpack_from(self.buffer,start)
+            payloadStart = start + HEADER_SIZE
+            if payloadStart + length <= end and PAYLOAD_SIZES.get(messageType) == length:
+                start = payloadStart + length
+                if start == end:
+                    start = end = 0
+                self.start,self.end = start,end
+                return messageType,decodePayload(messageType,self.buffer,payloadStart)
+        self.start,self.end = start,end
+        length,messageType = HEADER.unpack_from(self.buffer,self.receiveExactly(HEADER_SIZE))
+        checkHeader(length,messageType)
+        return messageType,decodePayload(messageType,self.buffer,self.receiveExactly(length))
+
+    def close(self):
+        self.socket.close()
+
+class AsyncMessageStream:
+    """
+    The asyncio version of MessageStream, for servers that run many connections on one event loop. asyncio
+        buffers the received bytes itself, so a message is read with readexactly
+
+    Attributes
+    ----------
+    reader : asyncio.StreamReader
+        The stream the messages are read from
+    writer : asyncio.StreamWriter
+        The stream the messages are written to
+
+    Methods
+    -------
+    send(self,message)
+        Sends a message packed by encodeMessage, waiting if the other side reads slower than it is sent
+    receive(self)
+        Waits for the next message and returns (messageType, data)
+    """
+    def __init__(self,reader,writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self,message):
+        self.writer.write(message)
+        await self.writer.drain()
+
+    async def receive(self):
+        """
+        Waits for the next message
+
+        Returns
+        --------
+        tuple
+            (messageType, data), data decoded by decodePayload
+
+        Raises
+        -------
+        ConnectionError
+            If the other side closes the connection
+        ValueError
+            If the header isnt valid, see checkHeader
+        """
+        try:
+            length,messageType = HEADER.unpack(await self.reader.readexactly(HEADER_SIZE))
+            checkHeader(length,messageType)
+            payload = await self.reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("The connection was closed")
+        return messageType,decodePayload(messageType,payload)
+
+    def close(self):
+        self.writer.close()
@@ -1,10 +1,15 @@
 import socket
 import threading
-import random
+import queue
+import argparse
+import struct
 from chessboard import Chessboard
 from serverInterface import ServerInterface
-from graphics import Graphics
-import pickle
+from location import SQUARE_X,SQUARE_Y,SQUARE_NAMES,squareIndex,orientSquare
+from engine import Engine,SearchResult,printResult
+from polyglot import OpeningBook
+from bitbase import Bitbases
+from protocol import MessageStream,encodeMessage,decodeMessage,COLOR,STATE,INPUT,HEARTBEAT,DEFAULT_PROMOTION
 
 
 HOST = '127.0.0.1'  # Localhost
@@ -13,101 +18,298 @@ PORT = 5555
 # List to store client connections
 clients = []
 MAX_CONNECTIONS = 2  # Limit to 2 connections
+ENGINE_MOVETIME = 5.0
+#Seconds between the heartbeats sent while a game is idle, 0 for none
+HEARTBEAT_INTERVAL = 10.0
+HEARTBEAT_MESSAGE = encodeMessage(HEARTBEAT,None)
 
-def convertCoords(x,y,color):
-    if color == "white":
-        return (x,y)
-    return (7-x,7-y)
+class EngineClient:
+    """
+    A virtual client that lets the engine take one of the two seats of a game. It is used like the MessageStream of
+        a client: the server pushes it the game state and receives clicks from it, so runGame and handle_clients dont
+        know if they play against a person or the engine. The search runs on its own thread, so the human client keeps
+        getting updates while the engine thinks, and the clicks of the move are queued when it ends
+
+    Attributes
+    ----------
+    engine : Engine
+        The engine that searches the moves
+    book : OpeningBook
+        The opening book the moves are taken from while the game is in it, None to always search
+    color : str
+        The color the engine plays, assigned by the first message the server sends
+    state : dict
+        The last game state the server sent
+    inputs : queue.Queue
+        The inputs waiting to be received by the server
+    searchedPosition : tuple
+        The packed position of the last search, see Chessboard.boardToPosition
+    result : SearchResult
+        The result of the last search, None while searching
+    searchThread : threading.Thread
+        The thread of the running search
+
+    Methods
+    -------
+    send(self,message)
+        Receives a message from the server
+    receive(self)
+        Waits for the next input of the engine to the server
+    close(self)
+        Nothing to close, the engine has no connection
+    """
+    def __init__(self,timeBudget = ENGINE_MOVETIME,book = None,bitbases = None):
+        self.engine = Engine(timeBudget,report = printResult,bitbases = bitbases)
+        self.book = book
+        self.color = None
+        self.state = {}
+        self.inputs = queue.Queue()
+        self.searchedPosition = None
+        self.result = None
+        self.searchThread = None
+
+    def send(self,message):
+        messageType,data = decodeMessage(message)
+        if messageType == COLOR:
+            self.color = data
+            print("The engine plays {}".format(data))
+        elif messageType == STATE:
+            self.state = data
+            if data["checkmate"] != None:
+                #Game over, the engine always wants a rematch
+                if not data["restart"] and not data["quit"]:
+                    self.inputs.put(self.input(wantsToPlay = "p"))
+            elif data["toMove"] == self.color and data["position"]:
+                self.play(data["position"],data["selectedPiecePos"])
+
+    def receive(self):
+        return INPUT,self.inputs.get()
+
+    def close(self):
+        pass
+
+    def input(self,clickPos = (-1,-1),promotion = None,wantsToPlay = None):
+        return {"color": self.color,"clickPos": clickPos,"promotion": promotion,"wantsToPlay": wantsToPlay}
+
+    def play(self,position,selectedPiecePos):
+        """
+        Starts a search of a new position. If the position didnt change after the clicks of a move and no piece is
+            selected (a click of the other player changed the selected piece in between), the same move is clicked again
+        """
+        if position != self.searchedPosition:
+            self.searchedPosition = position
+            self.result = None
+            self.searchThread = threading.Thread(target = self.search,args = (position,),daemon = True)
+            self.searchThread.start()
+        elif self.result != None and selectedPiecePos == -1 and self.inputs.empty():
+            self.clickMove(self.result.move)
+
+    def clickMove(self,move):
+        """
+        Queues the clicks that play a move: the piece, then its target square
+        """
+        if move != None:
+            self.inputs.put(self.input(self.clickPosition(move.fromSquare)))
+            self.inputs.put(self.input(self.clickPosition(move.toSquare),move.promotion or "q"))
+
+    def search(self,position):
+        board = Chessboard(8,8)
+        board.positionToBoard(position)
+        bookMove = self.book.chooseMove(board) if self.book else None
+        if bookMove:
+            print("The engine plays {} from the book".format(SQUARE_NAMES[bookMove.fromSquare] + SQUARE_NAMES[bookMove.toSquare]))
+            result = SearchResult(bookMove,0,0,0,0.0)
+        else:
+            result = self.engine.search(board)
+            if result.move != None:
+                print("The engine plays {} (depth {}, {:.0f} nodes/s)".format(SQUARE_NAMES[result.move.fromSquare] + SQUARE_NAMES[result.move.toSquare],result.depth,result.nodes / result.elapsed if result.elapsed else 0))
+        #The game may have gone on (a restart) while searching. The clicks are queued before the result is set, so
+        #play doesnt queue them too
+        if self.state.get("position") == position and self.state.get("checkmate") == None:
+            self.clickMove(result.move)
+        self.result = result
+
+    def clickPosition(self,square):
+        """
+        Returns the pixel at the center of a square on the screen of the engine
+        """
+        square = orientSquare(square,self.color)
+        return (SQUARE_X[square]*100 + 50,SQUARE_Y[square]*100 + 50)
 
 def getDataToSend(interface,dataToSend):
-    dataToSend["FEN"] = interface.chessboard.boardToFEN()
+    dataToSend["position"] = interface.chessboard.getPosition()
     dataToSend["toMove"] = interface.chessboard.toMove
     if interface.selectedPiece:
-        dataToSend["selectedPiecePos"] = interface.selectedPiece.position
+        dataToSend["selectedPiecePos"] = interface.selectedPiece.square
     else:
-        dataToSend["selectedPiecePos"] = (-1,-1)
+        dataToSend["selectedPiecePos"] = -1
     dataToSend["eaten"] = interface.eaten
     return dataToSend
 
+def getSnapshot(interface,dataToSend,snapshot):
+    """
+    Returns the encoded state to send to the clients. It only changes after a move (a new board version) or when
+        the selected piece changes, so the last message is kept in snapshot and reused while the game is idle
+    
+    Parameters
+    ----------
+    interface : ServerInterface
+        The interface of the game being played
+    dataToSend : dict
+        The data sent to the clients, updated only when the snapshot is outdated
+    snapshot : dict
+        The key of the state that was encoded last ("key") and its message ("data")
+    
+    Returns
+    --------
+    bytes
+        The STATE message of dataToSend
+    """
+    selectedPiece = interface.selectedPiece
+    key = (interface.chessboard.version,selectedPiece.square if selectedPiece else None)
+    if snapshot.get("key") != key:
+        snapshot["data"] = encodeMessage(STATE,getDataToSend(interface,dataToSend))
+        snapshot["key"] = key
+    return snapshot["data"]
+
+
+def broadcast(clients,message):
+    """
+    Sends a message to every client. A client that cant be reached is left to its reader, which reports the
+        disconnection
+    """
+    for conn, addr in clients:
+        try:
+            conn.send(message)
+        except OSError:
+            print("Lost the connection with {}".format(addr))
+
+def readInputs(conn,index,events):
+    """
+    Runs on its own thread for every client: puts each input of the client in events as (index, data), and
+        (index, None) when it disconnects or sends a message that isnt valid, closing the connection
+    """
+    while True:
+        try:
+            messageType,data = conn.receive()
+        except (OSError,ValueError,IndexError,struct.error):
+            #The connection was closed or sent a message that isnt valid
+            conn.close()
+            events.put((index,None))
+            return
+        if messageType == INPUT:
+            events.put((index,data))
+
+def nextEvent(clients,events,heartbeat):
+    """
+    Waits for the next input of a client, sending a heartbeat to all of them every heartbeat seconds without one
 
-def runGame(FEN,board,interface,dataToSend,clients):
+    Returns
+    --------
+    tuple
+        (index, data) of the client, data None if it disconnected
+    """
     while True:
-        for conn, addr in clients:
-            dataToSend = getDataToSend(interface,dataToSend)
-            conn.send(pickle.dumps(dataToSend))
-            
-            data = conn.recv(1024)
-            if data:
-                data = pickle.loads(data)
-                color =data["color"]
-                #we got a click
-                if data["clickPos"] != (-1,-1):
-                    x,y = data["clickPos"]
-                    
-                    if 0 < x < 800 and 0 < y < 800:
-                        gridx,gridy = convertCoords(x//100,y//100,color)
-                        print("Mouse clicked on ",gridx,gridy)
-                        if not interface.selectedPiece and board.board[gridy][gridx] and board.board[gridy][gridx].pieceType.color == board.toMove:
-                            interface.selectedPiece = board.board[gridy][gridx]
-                            interface.selectedPiece.currentPossibilities.clear()
-                            interface.renderSelectedPiece(None,None,False)
-                            print(interface.selectedPiece.pieceType)
-                            print(interface.selectedPiece.currentPossibilities)
-                        elif interface.selectedPiece and board.board[gridy][gridx] and (gridx,gridy) not in interface.selectedPiece.currentPossibilities:
-                            interface.selectedPiece = board.board[gridy][gridx]
-                            interface.selectedPiece.currentPossibilities.clear()
-                            interface.renderSelectedPiece(None,None,False)
-                        elif interface.selectedPiece and not board.board[gridy][gridx] and (gridx,gridy) not in interface.selectedPiece.currentPossibilities:
-                            interface.selectedPiece = None
-                        elif interface.selectedPiece and (gridx,gridy) in interface.selectedPiece.currentPossibilities:
-                            if board.toMove == "black":
-                                board.fullMoves += 1
-                                board.halfMoves += 1
-                            print(interface.selectedPiece.currentPossibilities)
-                            print("The {} has moved from {} to {}".format(interface.selectedPiece.getPieceInfo(),interface.selectedPiece.position, (gridx,gridy)))
-                            
-                            interface.move(gridx,gridy)
-                            interface.addPosition(interface.chessboard.boardToFEN())
-                            
+        try:
+            return events.get(timeout = heartbeat or None)
+        except queue.Empty:
+            broadcast(clients,HEARTBEAT_MESSAGE)
+
+def handleClick(interface,data,verbose = True):
+    """
+    Applies the click of an input to a game: selects a piece of the player to move, changes or drops the
+        selection, or moves the selected piece
+    
+    Parameters
+    ----------
+    interface : ServerInterface
+        The interface of the game being played
+    data : dict
+        The input sent by a client, clickPos (-1,-1) if it isnt a click
+    verbose : bool, optional
+        If the clicks and moves are printed, defaults to True
+    """
+    board = interface.chessboard
+    color =data["color"]
+    #we got a click
+    if data["clickPos"] != (-1,-1):
+        x,y = data["clickPos"]
+        
+        if 0 < x < 800 and 0 < y < 800:
+            square = orientSquare(squareIndex(x//100,y//100),color)
+            if verbose:
+                print("Mouse clicked on ",SQUARE_NAMES[square])
+            clicked = board.board[square]
+            targets = interface.getLegalTargets() if interface.selectedPiece else frozenset()
+            if not interface.selectedPiece and clicked and clicked.pieceType.color == board.toMove:
+                interface.selectedPiece = clicked
+                if verbose:
+                    print(interface.selectedPiece.pieceType)
+                    print(interface.getLegalTargets())
+            elif interface.selectedPiece and clicked and square not in targets:
+                interface.selectedPiece = clicked
+            elif interface.selectedPiece and not clicked and square not in targets:
+                interface.selectedPiece = None
+            elif interface.selectedPiece and square in targets:
+                if verbose:
+                    print(targets)
+                    print("The {} has moved from {} to {}".format(interface.selectedPiece.getPieceInfo(),SQUARE_NAMES[interface.selectedPiece.square],SQUARE_NAMES[square]))
+                
+                interface.move(square,data.get("promotion") or DEFAULT_PROMOTION)
+
+def gameResult(interface,status):
+    """
+    Returns the "checkmate" field of the state of a finished game: the color that won, or "draw"
+    """
+    if status == "checkmate":
+        return "black" if interface.chessboard.toMove == "white" else "white"
+    return "draw"
+
+def runGame(FEN,board,interface,dataToSend,clients,events,heartbeat = HEARTBEAT_INTERVAL):
+    """
+    Plays a game. The server only works when a client sends an input, and pushes the state to the clients only
+        when it changes (a move, a new selected piece, the end of the game), so an idle game costs no CPU or bandwidth
+        but the heartbeat
+
+    Returns
+    --------
+    bool
+        True when the game has ended, False if a client disconnected
+    """
+    snapshot = {}
+    sent = getSnapshot(interface,dataToSend,snapshot)
+    broadcast(clients,sent)
+    while True:
+        _,data = nextEvent(clients,events,heartbeat)
+        if data == None:
+            return False
+        handleClick(interface,data)
                             
-        #Check for checkmate after move
-        if interface.isValidBoard(interface.chessboard.board,interface.chessboard.whiteKingPos,interface.chessboard.blackKingPos,True) == 1:
-            if interface.isCheckmate("white"):
-                dataToSend["checkmate"] = "black"
-                print("Game has been finished by checkmate")
-                for conn, addr in clients:
-                    dataToSend = getDataToSend(interface,dataToSend)
-                    conn.send(pickle.dumps(dataToSend))
-                    data = conn.recv(1024)
-                return 0
-        elif interface.isValidBoard(interface.chessboard.board,interface.chessboard.whiteKingPos,interface.chessboard.blackKingPos,True) == 2:
-            if interface.isCheckmate("black"):
-                dataToSend["checkmate"] = "white"
+        """
+        Checks if the move has ended the game. gameStatus caches its result by position, so loops without
+            a new move dont generate any moves
+        """
+        status = interface.gameStatus()
+        if status:
+            dataToSend["checkmate"] = gameResult(interface,status)
+            if status == "checkmate":
                 print("Game has been finished by checkmate")
-                for conn, addr in clients:
-                    dataToSend = getDataToSend(interface,dataToSend)
-                    conn.send(pickle.dumps(dataToSend))
-                    data = conn.recv(1024)
-                return 0
             else:
-                print("no data")
-                
+                print("Game has ended by draw ({})".format(status))
+            broadcast(clients,encodeMessage(STATE,getDataToSend(interface,dataToSend)))
+            return True
         
-        """
-        Checks for draw
-        """
-        if interface.isDraw():
-            print("Game has ended by draw")
-            dataToSend["checkmate"] = "draw"
-            for conn, addr in clients:
-                dataToSend = getDataToSend(interface,dataToSend)
-                conn.send(pickle.dumps(dataToSend))
-                data = conn.recv(1024)
-            return 0
+        #Push the state only if the input changed it
+        message = getSnapshot(interface,dataToSend,snapshot)
+        if message is not sent:
+            broadcast(clients,message)
+            sent = message
 
-def handle_clients(clients):
+def handle_clients(clients,heartbeat = HEARTBEAT_INTERVAL,bitbases = None):
     """
     Function to execute after 2 connections are established.
+    The inputs of every client are read on its own thread and queued as events, the games wait on the queue.
+    With bitbases, endings they say are drawn end the game
     """
     print("2 clients connected. Starting the game!")
     # Example: Send a message to both clients
@@ -115,58 +317,90 @@ def handle_clients(clients):
     #asign colors
     whitePlayerIdx = 0
     whitePlayer = clients[whitePlayerIdx]
-    clients[whitePlayerIdx][0].send(pickle.dumps("white"))
+    clients[whitePlayerIdx][0].send(encodeMessage(COLOR,"white"))
     blackPlayer = clients[1] if whitePlayer == clients[0] else clients[0]
-    clients[0 if whitePlayerIdx == 1 else 1][0].send(pickle.dumps("black"))
+    clients[0 if whitePlayerIdx == 1 else 1][0].send(encodeMessage(COLOR,"black"))
     
+    events = queue.Queue()
+    for i in range(len(clients)):
+        threading.Thread(target = readInputs,args = (clients[i][0],i,events),daemon = True).start()
 
     playersWantToPlay = [True,True]
     while playersWantToPlay[0] and playersWantToPlay[1]:
-        FEN = "4k3/4P3/8/4K3/8/8/8/8 w ---- - 0 1"
+        FEN = "4k3/4P3/8/4K3/8/8/8/8 w - - 0 1"
         board = Chessboard(8,8)
-        interface = ServerInterface(board)
+        interface = ServerInterface(board,bitbases)
         board.FENToBoard(FEN)
-        dataToSend = {"FEN":None, "toMove": None, "selectedPiecePos": None,"eaten":None,"checkmate" : None,"restart":False,"quit":False}
-        runGame(FEN,board,interface,dataToSend,clients)
+        dataToSend = {"position":None, "toMove": None, "selectedPiecePos": None,"eaten":None,"checkmate" : None,"restart":False,"quit":False}
         playersWantToPlay = [None,None]
+        if not runGame(FEN,board,interface,dataToSend,clients,events,heartbeat):
+            print("A player has disconnected")
+            playersWantToPlay = [False,False]
+        #Wait for the answers of the players to the end screen
         while playersWantToPlay[0] == None or playersWantToPlay[1] == None:
-            for i in range(len(clients)):
-                conn,addr = clients[i]
-                conn.send(pickle.dumps(dataToSend))
-                data = pickle.loads(conn.recv(1024))
-                if data["wantsToPlay"] == "p":
-                    playersWantToPlay[i] =  True
-                elif data["wantsToPlay"] == "q":
-                    playersWantToPlay[i] =  False
+            i,data = nextEvent(clients,events,heartbeat)
+            if data == None:
+                playersWantToPlay = [False,False]
+            elif data["wantsToPlay"] == "p":
+                playersWantToPlay[i] =  True
+            elif data["wantsToPlay"] == "q":
+                playersWantToPlay[i] =  False
         if playersWantToPlay[0] == True == playersWantToPlay[1]:
             print("Play again")
             dataToSend["restart"] = True
         else:
             print("Quit")
             dataToSend["quit"] = True
-        for conn, addr in clients:
-            conn.send(pickle.dumps(dataToSend))
-            data = pickle.loads(conn.recv(1024))
+        broadcast(clients,encodeMessage(STATE,dataToSend))
     
     print("Server finished succesfully")
 
-def start_server():
+def start_server(engineColor = None,movetime = ENGINE_MOVETIME,bookPath = None,heartbeat = HEARTBEAT_INTERVAL,bitbasesPath = None):
+    """
+    Waits for the players to connect and starts the games
+
+    Parameters
+    ----------
+    engineColor : str, optional
+        "white" or "black" to let the engine play that color against a single human, None for two humans
+    movetime : float, optional
+        The seconds the engine thinks per move
+    bookPath : str, optional
+        A Polyglot opening book for the engine
+    heartbeat : float, optional
+        The seconds between the heartbeats sent while a game is idle, 0 for none
+    bitbasesPath : str, optional
+        A directory of endgame bitbases made by bitbase.py, for the engine and to adjudicate drawn endings
+    """
+    bitbases = Bitbases(bitbasesPath) if bitbasesPath else None
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.bind((HOST, PORT))
     server.listen()
-    print(f"Server started on {HOST}:{PORT}, waiting for {MAX_CONNECTIONS} connections...")
+    humans = MAX_CONNECTIONS - 1 if engineColor else MAX_CONNECTIONS
+    print(f"Server started on {HOST}:{PORT}, waiting for {humans} connections...")
 
-    while len(clients) < MAX_CONNECTIONS:
+    while len(clients) < humans:
         conn, addr = server.accept()
         print(f"Connection from {addr}")
-        clients.append((conn, addr))
+        clients.append((MessageStream(conn), addr))
+    #The first client plays white
+    if engineColor:
+        book = OpeningBook(bookPath) if bookPath else None
+        clients.insert(0 if engineColor == "white" else len(clients),(EngineClient(movetime,book,bitbases),"engine"))
 
     # Stop accepting connections
     print("Max connections reached. No longer accepting new clients.")
     server.close()  # Close the server socket to stop new connections
 
     # Execute the function with the connected clients
-    handle_clients(clients)
+    handle_clients(clients,heartbeat,bitbases)
 
 if __name__ == "__main__":
-    start_server()
+    parser = argparse.ArgumentParser(description = "Chess server for two players, or one player against the engine")
+    parser.add_argument("--engine",choices = ["white","black"],help = "color the engine plays, leave out for two human players")
+    parser.add_argument("--movetime",type = float,default = ENGINE_MOVETIME,help = "seconds the engine thinks per move")
+    parser.add_argument("--book",help = "Polyglot opening book for the engine")
+    parser.add_argument("--heartbeat",type = float,default = HEARTBEAT_INTERVAL,help = "seconds between the heartbeats of an idle game, 0 for none")
+    parser.add_argument("--bitbases",help = "directory of the endgame bitbases made by bitbase.py, to adjudicate drawn endings")
+    arguments = parser.parse_args()
+    start_server(arguments.engine,arguments.movetime,arguments.book,arguments.heartbeat,arguments.bitbases)
@@ -1,7 +1,6 @@
-import pygame
-import copy
-from pieces import Piece,King,Night,Bishop,Queen,Rook,Pawn
-from location import Square
+from pieces import Piece,Bishop
+from location import SQUARE_COUNT,SQUARE_COLORS
+from moveGenerator import legalMoves,legalMovesFrom,checkStatus,isInCheck
 class ServerInterface:
     """
     The ServerInterface class handles all chessboard interactions server side.
@@ -17,469 +16,39 @@ class ServerInterface:
         the piece that was clicked, to display its red square and all its possibilitie
     eaten : dict
         All the pieces that have been eaten throughout the game
+    statusCache : dict[int] = str
+        The result of positionStatus for the current position key only, so it doesnt grow with the game
+    bitbases : Bitbases
+        The endgame bitbases the drawn endings are adjudicated with, None to play them out
 
     Methods
     -------
-    rookPossiblities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Rook
-    bishopPossiblities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Bishop
-    kingPossibilities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType King
-    knightPossibilities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Night
-    pawnPossibilities(self,draw,piece,board,renderAllPossibilities)
-        Calculates and renders the possibilities of a piece with a pieceType Pawn
     getBoard(self)
         Returns the board
     isValidBoard(self,board,whiteKingPos, blackKingPos,renderAllPossibilities)
         Checks board and returns an integer representing no checks, white in check or black in check
-    move(self,x,y)
+    move(self,square)
         All the process behind moving a piece
-    renderSelectedPiece(self,draw = True,piece = None,board = None,renderAllPossibilities = True)
-        Renders the possibilities of a piece no matter the type
+    getLegalTargets(self,piece = None)
+        Returns the squares a piece can legally move to, using moveGenerator.legalMoves
     isCheckmate(self,color)
         Looks at a position in check and checks if it is salvagable or if its checkmate
     isDraw(self)
         Looks at a position and determines if its a draw
+    gameStatus(self)
+        Returns if the game has ended by checkmate or by any kind of draw
+    positionStatus(self)
+        Returns checkmate, stalemate or insufficient material, the part of gameStatus cached by position
+    isInsufficientMaterial(self)
+        Checks if no player has enough pieces left to checkmate
     """
-    def __init__(self,board):
+    def __init__(self,board,bitbases = None):
         self.chessboard = board
         self.selectedPiece = None
         self.eaten = {"r":0 , "b": 0, "n":0,"q":0,"k":0,"p":0, "R":0 , "B": 0, "N":0,"Q":0,"K":0,"P":0}
-        self.previousPositions = [self.chessboard.boardToFEN()]
+        self.statusCache = {}
+        self.bitbases = bitbases
 
-    def rookPossiblities(self,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Rook
-
-        Parameters
-        ----------
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Returns
-        ---------
-        int 
-            Number of moves possible by that piece
-            
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.position
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        Iterates through all four main directions of the rook (up,down,left,right)
-        Second loop repeats until the position is out of the grid, or found a piece. If the piece is of a different color, allows 
-            that possibility but stops anyway
-        
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for dx,dy in [(1,0),(0,1),(-1,0),(0,-1)]:
-            p = 1
-            while currentPosX  + p*dx < self.chessboard.width and currentPosY  + p*dy < self.chessboard.height and currentPosX  + p*dx >= 0 and currentPosY  + p*dy >= 0:
-                validBoardStatus = -1
-                
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+p*dx,currentPosY+p*dy)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                    
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+p*dy][currentPosX+p*dx] or  board[currentPosY+p*dy][currentPosX+p*dx].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+p*dx,currentPosY+p*dy))
-                
-                if board[currentPosY+p*dy][currentPosX+p*dx] != None:
-                    break
-                
-                p+= 1
-        return len(piece.currentPossibilities)
-                  
-    def bishopPossiblities(self,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Bishop
-
-        Parameters
-        ----------
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Returns
-        ---------
-        int 
-            Number of moves possible by that piece
-            
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.position
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-        
-        """
-        Iterates through all four main directions of the bishop (top-left,top-right,bottom-left,bottom-right)
-        Second loop repeats until the position is out of the grid, or found a piece. If the piece is of a different color, allows 
-            that possibility but stops anyway
-        
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for dx,dy in [(1,1),(1,-1),(-1,1),(-1,-1)]:
-            p = 1
-            while 0 <= currentPosX  + p*dx < len(board) and 0 <= currentPosY  + p*dy < len(board[0]):
-                
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+p*dx,currentPosY+p*dy)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+p*dy][currentPosX+p*dx] or  board[currentPosY+p*dy][currentPosX+p*dx].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+p*dx,currentPosY+p*dy))
-                
-                if board[currentPosY+p*dy][currentPosX+p*dx] != None:
-                    break
-                
-                p+= 1
-        return len(piece.currentPossibilities)
-        
-    def kingPossibilities(self,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType King
-
-        Parameters
-        ----------
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        
-        Returns
-        ---------
-        int 
-            Number of moves possible by that piece
-            
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.position
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        Iterates through all eight main directions of the king (up,down,left,right,top-left,top-right,bottom-left,bottom-right)
-            and ensures it is within the boards bounds.If the the target square has a piece of the same color, the move isnt added
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for x,y in [(-1,0),(-1,1),(1,-1),(0,-1),(1,0),(0,1),(1,1),(-1,-1)]:
-            dx = currentPosX + x
-            dy = currentPosY + y
-            if 0 <= dy < len(board) and 0 <= dx < len(board[0]):
-                validBoardStatus = -1
-                if not renderAllPossibilities:
-                    
-                    if piece.pieceType.color == "white":
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(dx,dy)),(dx,dy),self.chessboard.blackKingPos,True)
-                    else:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(dx,dy)),self.chessboard.whiteKingPos,(dx,dy),True)
-                
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-
-                    if not board[dy][dx] or board[dy][dx].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((dx,dy))
-                    
-                    
-        #Check for castling
-        if piece.pieceType.color == "white":
-            if self.chessboard.whiteQueenCastling and self.chessboard.board[7][1] == self.chessboard.board[7][2]  == self.chessboard.board[7][3] == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(2,7)),(2,7),self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[2][7] or board[2][7].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((2,7))
-                                
-            if self.chessboard.whiteKingCastling and self.chessboard.board[7][5] == self.chessboard.board[7][6]  == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(6,7)),(6,7),self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[7][6] or board[7][6].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((6,7))
-                    
-        else:
-            if self.chessboard.blackQueenCastling and self.chessboard.board[0][1] == self.chessboard.board[0][2]  == self.chessboard.board[0][3] == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(2,0)),self.chessboard.whiteKingPos,(2,0),True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[0][2] or board[0][2].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((2,0))
-            if self.chessboard.blackKingCastling and self.chessboard.board[0][5] == self.chessboard.board[0][6]  == None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(6,0)),self.chessboard.whiteKingPos,(6,0),True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[0][6] or board[0][6].pieceType.color != piece.pieceType.color:
-                        piece.currentPossibilities.add((6,0))
-        return len(piece.currentPossibilities)
-    
-    def knightPossibilities(self,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Night
-
-        Parameters
-        ----------
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        Returns
-        ---------
-        int 
-            Number of moves possible by that piece
-            
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.position
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        Iterates through all eight main directions of the knight (2-up-1-left,2-up-1-right,2-down-1-left,
-            2-down-1-right,2-left-1-up,2-left-1-down,2-right-1-up,2-right-1-down) and ensures it is within the
-            boards bounds. If the the target square has a piece of the same color, the move isnt added
-        If renderAllPossibilities is disabled, it simulates the move and if the move puts you in check, doesnt allow it
-        """
-        for x,y in [(2,-1),(2,1),(1,2),(-1,2),(-2,1),(-2,-1),(-1,-2),(1,-2)]:
-            dx = currentPosX + x
-            dy = currentPosY + y
-            
-            if 0 <= dy < len(board) and 0 <= dx < len(board[0]):
-                if not board[dy][dx] or board[dy][dx].pieceType.color != piece.pieceType.color:
-                    
-                    if not renderAllPossibilities:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(dx,dy)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                    
-                    if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                        if not board[dy][dx] or  board[dy][dx].pieceType.color != piece.pieceType.color:
-                            piece.currentPossibilities.add((dx,dy))
-        return len(piece.currentPossibilities)
-                        
-    def pawnPossibilities(self,piece,board,renderAllPossibilities):
-        """
-        Calculates the possibilities of movement for a Piece of pieceType Pawn
-
-        Parameters
-        ----------
-        piece : Piece
-            The Piece to be rendered
-            Ensures that 0 <= piece.column < self.chessboard.width
-            Ensures that 0 <= piece.row < self.chessboard.height
-        board : List<List<Piece>>>
-            2D matrix that represents the chessboard of the game played
-            Ensures all the items in array are either None or Piece objects
-        renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
-        Returns
-        ---------
-        int 
-            Number of moves possible by that piece
-        
-        Raises
-        ------
-        ValueError
-            Either the board input size doesnt match the self.chessboard size, or the board input doesnt have the appropiate format
-        """
-        currentPosX,currentPosY = piece.position
-        
-        #Ensures the piece position is correct
-        if currentPosX < 0 or currentPosX >= self.chessboard.width:
-            raise ValueError("The x current position is invalid, cant be lower than 0 or higher than the chessboards width - 1. Value is: "+ str(currentPosX))
-        if currentPosY < 0 or currentPosY >= self.chessboard.height:
-            raise ValueError("The y current position is invalid, cant be lower than 0 or higher than the chessboards height - 1. Value is: "+ str(currentPosY))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-                
-        
-        """
-        For each pawn, the following checks are made:
-        - For one square forward, checking if the square in front is empty 
-        - For two squares forward, that the pawn is in its initial rank (either the second row for black or the seventh for white).
-            and that the two squares in front are empty
-        -For diagonal captures, that there is a piece of the opposite color in said diagonal
-        -For en passant, that the diagonal is the en Passant Target square (found in self.chessboard.enPassantSquare)
-        
-        For all the previous check, the move isnt added if not renderAllPossibilities and the move puts you in check
-            or if the move puts you out of the bounds of the board
-        """
-        if piece.pieceType.color == "white":
-            #One and two squares forward
-            if currentPosY > 0 and board[currentPosY-1][currentPosX] == None:
-                if not renderAllPossibilities:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY-1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY-1][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY-1))
-            if currentPosY == 6  and board[currentPosY-2][currentPosX] == None == board[currentPosY-1][currentPosX] :
-                
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY-2)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY-2][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY-2))
-                
-            #diagonals
-            if currentPosX > 0 and currentPosY > 0 and board[currentPosY-1][currentPosX-1] != None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY-1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY-1][currentPosX-1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX-1,currentPosY-1))
-            if currentPosX < len(board[0])-1 and currentPosY > 0 and board[currentPosY-1][currentPosX+1] != None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY-1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY-1][currentPosX+1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY-1))
-                    
-            #look for en passant 
-            if currentPosX > 0 and currentPosY > 0 and (currentPosX-1,currentPosY-1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY-1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    piece.currentPossibilities.add((currentPosX-1,currentPosY-1))
-            if currentPosX < len(board[0])-1 and currentPosY > 0 and (currentPosX+1,currentPosY-1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY-1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY-1))
-
-        else:
-            #One and two squares forward
-            if currentPosY < len(board)-1 and board[currentPosY+1][currentPosX] == None:
-                if not renderAllPossibilities:
-                        validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY+1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+1][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY+1))
-            if currentPosY == 1  and board[currentPosY+2][currentPosX] == None == board[currentPosY+1][currentPosX]:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX,currentPosY+2)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if not board[currentPosY+2][currentPosX]:
-                        piece.currentPossibilities.add((currentPosX,currentPosY+2))
-                
-            #diagonals
-            if currentPosX > 0 and currentPosY < len(board)-1 and board[currentPosY+1][currentPosX-1] != None:
-                #check for oposite color
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY+1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY+1][currentPosX-1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX-1,currentPosY+1))
-            if currentPosX < len(board[0])-1 and currentPosY < len(board)-1 and board[currentPosY+1][currentPosX+1] != None:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY+1)),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    if piece.pieceType.color != board[currentPosY+1][currentPosX+1].pieceType.color:
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY+1))
-            
-            #EN PASSANT
-            if currentPosX > 0 and currentPosY < len(board)-1 and (currentPosX-1,currentPosY+1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX-1,currentPosY+1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                    piece.currentPossibilities.add((currentPosX-1,currentPosY+1))
-            if currentPosX < len(board[0])-1 and currentPosY < len(board)-1 and (currentPosX+1,currentPosY+1) == self.chessboard.enPassantSquare:
-                if not renderAllPossibilities:
-                    validBoardStatus = self.isValidBoard(self.chessboard.simulateMoveTempBoard(piece,(currentPosX+1,currentPosY+1),True),self.chessboard.whiteKingPos,self.chessboard.blackKingPos,True)
-                if renderAllPossibilities or validBoardStatus == 0 or (self.chessboard.toMove == "black" and validBoardStatus == 1) or (self.chessboard.toMove == "white" and validBoardStatus == 2):
-                        piece.currentPossibilities.add((currentPosX+1,currentPosY+1))
-        return len(piece.currentPossibilities)
-   
     def getBoard(self):
         """
         Getter returning the board
@@ -500,16 +69,14 @@ class ServerInterface:
 
         Parameters
         ----------
-        board : <List<List<Piece>>>
-            2D Matrix representing a chess board
-        whiteKingPos : tuple(int,int)
-            A tuple of (x,y) integers that represents the current grid position of the white king
-            Ensures that 0 <= x < self.chessboard.width and 0 <= y < self.chessboard.height
-        blackKingPos : tuple(int,int)
-            A tuple of (x,y) integers that represents the current grid position of the black king
-            Ensures that 0 <= x < self.chessboard.width and 0 <= y < self.chessboard.height
+        board : <List<Piece>>
+            The 64 squares of a chess board
+        whiteKingPos : int
+            The square of the white king. Ensures that 0 <= whiteKingPos < 64
+        blackKingPos : int
+            The square of the black king. Ensures that 0 <= blackKingPos < 64
         renderAllPossibilities : bool
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal)
+            Not used anymore, checks are found by moveGenerator.checkStatus. Kept so old calls still work
         
         Returns
         -------
@@ -522,242 +89,59 @@ class ServerInterface:
             If the board has an invalid format (wrong size or values) or the king positions arent valid
         """
         #Validate the kings positions
-        if whiteKingPos[0] < 0 or whiteKingPos[0] >= self.chessboard.width:
-            raise ValueError("White kings position has an invalid x value: ", str(whiteKingPos[0]))
-        if whiteKingPos[1] < 0 or whiteKingPos[1] >= self.chessboard.height:
-            raise ValueError("White kings position has an invalid y value: ", str(whiteKingPos[1]))
-        
-        if blackKingPos[0] < 0 or blackKingPos[0] >= self.chessboard.width:
-            raise ValueError("White kings position has an invalid x value: ", str(whiteKingPos[0]))
-        if blackKingPos[1] < 0 or blackKingPos[1] >= self.chessboard.height:
-            raise ValueError("Black kings position has an invalid y value: ", str(whiteKingPos[1]))
+        if whiteKingPos < 0 or whiteKingPos >= SQUARE_COUNT:
+            raise ValueError("White kings position has an invalid square: ", str(whiteKingPos))
+        if blackKingPos < 0 or blackKingPos >= SQUARE_COUNT:
+            raise ValueError("Black kings position has an invalid square: ", str(blackKingPos))
         
         #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
+        if len(board) != SQUARE_COUNT:
+            raise ValueError("Input board size doesnt align with chessboard size. Input board squares: ",str(len(board)) ,", chessboard squares: ", str(SQUARE_COUNT))
+        for item in board:
+            if item != None and type(item) != Piece:
+                raise ValueError("Item in board is invalid: " + item)
                 
         
-        #Quick check if the kings are too close
-        if abs(whiteKingPos[0]-blackKingPos[0]) == 1 or abs(whiteKingPos[1]-blackKingPos[1]) == 1:
-            return 3
-        
-        """
-        Loops through the entire board. If the current square has a value, we render its possibilities and look if any 
-            of those possibilities include the opposite kings position.
-            
-        Return accordingly
-        If nothing is found, no checks
-        """
-        for i in range(len(board)):
-            for j in range(len(board[0])):
-                #If the square isnt empty, look at what its targeting and check if the opposite king position is there
-                if board[i][j] != None:
-                    temporarySelectedPiece = board[i][j]
-                    temporarySelectedPiece.currentPossibilities.clear()
-
-                    self.renderSelectedPiece(temporarySelectedPiece,board,renderAllPossibilities)
-                    if temporarySelectedPiece.pieceType.color == "black" and whiteKingPos in temporarySelectedPiece.currentPossibilities:
-                        return 1
-                    if temporarySelectedPiece.pieceType.color == "white" and blackKingPos in temporarySelectedPiece.currentPossibilities:
-                        return 2
-        return 0
+        return checkStatus(self.chessboard,board,whiteKingPos,blackKingPos)
     
-    def move(self,x,y):
-        if self.chessboard.board[y][x] == None:
-            pass
-        else:
-            self.chessboard.halfMoves = 0
-            pieceTypeLetter = str(type(self.chessboard.board[y][x].pieceType))[15]
-            if self.chessboard.board[y][x].pieceType.color == "white":
-                self.chessboard.whiteMaterial[pieceTypeLetter] -= 1
-                self.eaten[pieceTypeLetter] += 1
-            else:
-                self.chessboard.blackMaterial[pieceTypeLetter.lower()] -= 1
-                self.eaten[pieceTypeLetter.lower()] += 1
-        
-        #delete pawn when in en passant
-        if self.selectedPiece.pieceType.color == "white":
-            if type(self.selectedPiece.pieceType) == Pawn and (x,y) == self.chessboard.enPassantSquare:
-                self.chessboard.blackMaterial["p"]-=1
-                self.eaten["p"] += 1
-                self.chessboard.board[y+1][x] = None
-        else:
-            if type(self.selectedPiece.pieceType) == Pawn and (x,y) == self.chessboard.enPassantSquare:
-                self.chessboard.whiteMaterial["P"]-=1
-                self.eaten["P"] += 1
-                self.chessboard.board[y-1][x] = None
-        
-        
-        #check either to disable or keep en passant square
-        if type(self.selectedPiece.pieceType) == Pawn and abs(y-self.selectedPiece.row) == 2:
-            print("KEEP EN PASSANT SQUARE")
-            if self.selectedPiece.pieceType.color == "white":
-                self.chessboard.enPassantSquare = (self.selectedPiece.column,self.selectedPiece.row-1)
-            else:
-                self.chessboard.enPassantSquare = (self.selectedPiece.column,self.selectedPiece.row+1)
-        else:
-            self.chessboard.enPassantSquare = None
-        
-        
-        
-        if self.chessboard.toMove == "white":
-            if type(self.selectedPiece.pieceType) == King:
-                
-                self.chessboard.whiteKingPos = (x,y)
-                if abs(self.selectedPiece.position[0] - x) != 2:
-                    self.chessboard.whiteKingCastling = False
-                    self.chessboard.whiteQueenCastling = False
-                else:
-                    if (x,y) == (6,7) and self.chessboard.whiteKingCastling:
-                        self.chessboard.board[7][5] = self.chessboard.board[7][7]
-                        self.chessboard.board[7][7] = None
-                        self.chessboard.board[7][5].setPosition(5,7)
-                    elif (x,y) == (2,7) and self.chessboard.whiteQueenCastling:
-                        self.chessboard.board[7][3] = self.chessboard.board[7][0]
-                        self.chessboard.board[7][0] = None
-                        self.chessboard.board[7][3].setPosition(3,7)
-                    self.chessboard.whiteKingCastling = False
-                    self.chessboard.whiteQueenCastling = False
-            #Disable castling in case rook is moved
-            if type(self.selectedPiece.pieceType) == Rook:
-                if (self.selectedPiece.column, self.selectedPiece.row) == (0,7):
-                    self.chessboard.whiteQueenCastling = False
-                elif (self.selectedPiece.column, self.selectedPiece.row) == (7,7):
-                    self.chessboard.whiteKingCastling = False
-                
-            self.chessboard.toMove = "black"
-        else:
-            if type(self.selectedPiece.pieceType) == King:
-                
-                self.chessboard.blackKingPos = (x,y)
-                if abs(self.selectedPiece.position[0] - x) != 2:
-                    self.chessboard.blackKingCastling = False
-                    self.chessboard.blackQueenCastling = False
-                else:
-                    if (x,y) == (6,0) and self.chessboard.blackKingCastling:
-                        self.chessboard.board[0][5] = self.chessboard.board[0][7]
-                        self.chessboard.board[0][7] = None
-                        self.chessboard.board[0][5].setPosition(5,0) 
-                    elif (x,y) == (2,0) and self.chessboard.blackQueenCastling:
-                        self.chessboard.board[0][3] = self.chessboard.board[0][0]
-                        self.chessboard.board[0][0] = None
-                        self.chessboard.board[0][3].setPosition(3,0)
-                    self.chessboard.blackKingCastling = False
-                    self.chessboard.blackQueenCastling = False
-            #Disable castling in case rook is moved
-            if type(self.selectedPiece.pieceType) == Rook:
-                if self.selectedPiece.position == (0,0):
-                    self.chessboard.blackQueenCastling = False
-                elif self.selectedPiece.position == (7,0):
-                    self.chessboard.blackKingCastling = False
-            self.chessboard.toMove = "white"
-        self.chessboard.board[self.selectedPiece.position[1]][self.selectedPiece.position[0]] = None
-        self.selectedPiece.row = y
-        self.selectedPiece.column = x
-        self.chessboard.board[y][x] = self.selectedPiece
-        self.selectedPiece.setPosition(x,y)
-        
-        
-            #check for promotions
-        if type(self.selectedPiece.pieceType) == Pawn:
-            self.chessboard.halfMoves = 0
-            if (self.selectedPiece.pieceType.color == "white" and y == 0) or (self.selectedPiece.pieceType.color == "black" and y == 7):
-                print("PROMOTION!")
-                newType = None
-                while newType != "n" and newType != "b" and newType != "q" and newType != "r":
-                    newType = input("Type n for knight, b for bishop, q for queen and r for rook: ")   
-                    if newType == "n":
-                        self.chessboard.board[y][x] = Piece(self.selectedPiece.row,self.selectedPiece.column,Night(self.selectedPiece.pieceType.color))
-                    elif newType == "b":
-                        self.chessboard.board[y][x] = Piece(self.selectedPiece.row,self.selectedPiece.column,Bishop(self.selectedPiece.pieceType.color))
-                    elif newType == "r":
-                        
-                        self.chessboard.board[y][x] = Piece(self.selectedPiece.row,self.selectedPiece.column,Rook(self.selectedPiece.pieceType.color))
-                    elif newType == "q":
-                        self.chessboard.board[y][x] = Piece(self.selectedPiece.row,self.selectedPiece.column,Queen(self.selectedPiece.pieceType.color))
-                    else:
-                        print("INCORRECT INPUT")
-
+    def move(self,square,promotion = None):
+        """
+        Moves self.selectedPiece to a square. The move itself is played by self.chessboard.makeMove
         
-            
+        Parameters
+        ----------
+        square : int
+            The square where the selected piece moves. Ensures that 0 <= square < 64
+        promotion : str, optional
+            The piece a pawn promotes to ("q", "r", "b" or "n") if the move reaches the last rank, the client sends it.
+            Defaults to None, which promotes to a queen
+        """
+        captured = self.chessboard.makeMove(self.selectedPiece.square,square,promotion or "q")
+        #The moves of a game are never taken back, dont keep what it would take
+        self.chessboard.clearUndoStack()
+        if captured:
+            self.eaten[captured.pieceType.letter] += 1
         
         self.selectedPiece = None
-        
-    def renderSelectedPiece(self,piece = None,board = None,renderAllPossibilities = True):
+    
+    def getLegalTargets(self,piece = None):
         """
-        Renders the possibilities of a piece, no matter its type. Acts like a parent method for the methods with
-            the name <PieceType>Possibilities
-
+        Returns the squares a piece can legally move to in the current position. Pieces of the player
+            that isnt moving get no squares
+        
         Parameters
         ----------
-        draw : bool , optional
-            If the pssibility circles should be drawn onto the screen or not. Defaults to True
         piece : Piece, optional
-            The piece to be rendered, if left blank, defaults to None, which defaults to self.selectedPiece
-            Ensures valid position
-        board : <List<List<Piece>>>, optional
-            The board which to which the piece is compared. If left blank defaults to none, which 
-            defaults to self.chessboard.board
-            Ensures the board size matches the self.chessboard size and all its pieceTypes are valid or None
-        renderAllPossibilities : bool, optional
-            If false, excludes those possibilities that puts you in a discovered check (which would be illegal).
-            Defaults to true
+            The piece to look at, if left blank, defaults to None, which defaults to self.selectedPiece
         
         Returns
         ---------
-        int 
-            Number of moves possible by that piece
-        Raises
-        -------
-        TypeError
-            If the input of the piece not of the allowed values, this will be triggered
-        ValueError
-            Will appear if either the pieces position is invalid, the boards size is invalid or the boards contents are invalid
+        frozenset
+            The squares that piece can move to
         """
-        
-        #Defaulting the variables
         if not piece:
             piece = self.selectedPiece
-        if not board:
-            board = self.chessboard.board
-            
-            
-        if piece.column < 0 or piece.column >= self.chessboard.width:
-            raise ValueError("piece position has an invalid x value: ", str(piece.column))
-        if piece.row < 0 or piece.row >= self.chessboard.height:
-            raise ValueError("piece position has an invalid y value: ", str(piece.row))
-        
-        #Ensures board is valid
-        if len(board) != self.chessboard.height or len(board[0]) != self.chessboard.width:
-            raise ValueError("Input board size doesnt align with chessboard size. Input board height: ",str(len(board)) ,", chessboard height: ", str(self.chessboard.height), "Input board width: ",str(len(board[0])) ,", chessboard width: ", str(self.chessboard.width))
-        for row in board:
-            for item in row:
-                if item != None and type(item) != Piece:
-                    raise ValueError("Item in board is invalid: " + item)
-        
-        """
-        Looks at the type of the piece and triggers the children methods accordingly
-        
-        Note: a queen is seen as the combination of rook and bishop, not its own method
-        """
-        if type(piece.pieceType) == Rook:
-            return self.rookPossiblities(piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Bishop:
-            return self.bishopPossiblities(piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Queen:
-            return self.bishopPossiblities(piece,board,renderAllPossibilities) + self.rookPossiblities(piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == King:
-            return self.kingPossibilities(piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Night:
-            return self.knightPossibilities(piece,board,renderAllPossibilities)
-        elif type(piece.pieceType) == Pawn:
-            return self.pawnPossibilities(piece,board,renderAllPossibilities)
-        else:
-            raise TypeError("Piece has no correct type")
+        return frozenset(move.toSquare for move in legalMovesFrom(self.chessboard,piece.square))
     
     def isCheckmate(self,color):
         """
@@ -790,68 +174,87 @@ class ServerInterface:
         if color != "black" and color != "white":
             raise ValueError("the value of color is neither black or white, its: ", color)
         
+        #Only the player to move can be checkmated
+        return color == self.chessboard.toMove and self.gameStatus() == "checkmate"
+    
+    def isDraw(self):
         """
-        Iterates through the entire move, and for each piece do the following
-        
-        Calculate all its possibilities. And simulate each of the possibilities.
-        If any of those possibilities stop the check, return False inmediatly
-        
-        In case none of the moves of any of the pieces stop the check, return False
+        Looks at the current position and determines if the game has ended in a draw
+
+        Returns
+        --------
+        bool
+            True if its stalemate, the fifty move rule, a threefold repetition, insufficient material or an ending
+            the bitbases say is drawn
         """
-        for i in range(len(self.chessboard.board)):
-            for j in range(len(self.chessboard.board[0])):
-                
-                temporaryBoard = self.chessboard.getTempBoard()
-                currentPiece = temporaryBoard[i][j]
-                
-                if currentPiece and currentPiece.pieceType.color == color:
-                    
-                    self.renderSelectedPiece(currentPiece,temporaryBoard)
-                    whiteKingPos = self.chessboard.whiteKingPos
-                    blackKingPos = self.chessboard.blackKingPos
-                    
-                    movesToCheck = copy.copy(currentPiece.currentPossibilities)
-                    for moves in movesToCheck:
-                        
-                        if type(currentPiece.pieceType) == King:
-                            if color == "white":
-                                whiteKingPos = moves
-                            else:
-                                blackKingPos = moves
-                                
-                        temporaryBoard = self.chessboard.getTempBoard()
-                        temporaryBoard[i][j] = None
-                        temporaryBoard[moves[1]][moves[0]] = currentPiece
-                        currentPiece.setPosition(moves[0],moves[1])
-                        
-                        if self.isValidBoard(temporaryBoard,whiteKingPos,blackKingPos,True) == 0:
+        return self.gameStatus() in ("stalemate","fiftyMoves","repetition","insufficientMaterial","drawnEndgame")
+    
+    def gameStatus(self):
+        """
+        Finds out if the game has ended, generating the legal moves of the player to move only once. The result
+            that depends only on the position (checkmate, stalemate and insufficient material) is cached for the
+            current position key, so asking again without a new move is a dictionary lookup
 
-                            return False
-        return True
+        Returns
+        --------
+        str
+            "checkmate" if the player to move is checkmated, "stalemate", "fiftyMoves", "repetition",
+            "insufficientMaterial" or "drawnEndgame" if its a draw, None if the game goes on
+        """
+        key = self.chessboard.zobristKey
+        if key in self.statusCache:
+            status = self.statusCache[key]
+        else:
+            status = self.positionStatus()
+            self.statusCache = {key: status}
+        if status:
+            return status
+        
+        #halfMoves counts plies, so 50 moves of each player
+        if self.chessboard.halfMoves >= 100:
+            return "fiftyMoves"
+        if self.chessboard.repetitionCount() >= 3:
+            return "repetition"
+        return None
     
-    def isDraw(self):
-        
-        if self.chessboard.halfMoves >= 50:
-            return True
-        lastPosition = self.previousPositions[-1]
-        if self.previousPositions.count(lastPosition) >= 3:
-            return True
-        
-        totalMovesWhite = 0
-        totalMovesBlack = 0
-        boardCopy = self.chessboard.getTempBoard()
-        for row in boardCopy:
-            for element in row:
-                if element:
-                    if element.pieceType.color == "white":
-                        totalMovesWhite += self.renderSelectedPiece(element,None,False)
-                    if element.pieceType.color == "black":
-                        totalMovesBlack += self.renderSelectedPiece(element,None,False)
-        if totalMovesBlack == 0 or totalMovesWhite == 0:
-            return True
+    def positionStatus(self):
+        """
+        The part of gameStatus that only depends on the position and not on the moves that led to it. With
+            bitbases, an ending they have that neither player can win is adjudicated as a draw
 
-        return False
-        
+        Returns
+        --------
+        str
+            "checkmate", "stalemate", "insufficientMaterial", "drawnEndgame" or None if the game goes on
+        """
+        if not legalMoves(self.chessboard):
+            if isInCheck(self.chessboard,self.chessboard.toMove):
+                return "checkmate"
+            return "stalemate"
+        if self.isInsufficientMaterial():
+            return "insufficientMaterial"
+        if self.bitbases and self.bitbases.probe(self.chessboard) == 0:
+            return "drawnEndgame"
+        return None
+    
+    def isInsufficientMaterial(self):
+        """
+        Checks if neither player has enough material left to checkmate: only kings, a single bishop or knight,
+            or any number of bishops all on squares of the same color
+
+        Returns
+        --------
+        bool
+            True if no checkmate is possible
+        """
+        white = self.chessboard.whiteMaterial
+        black = self.chessboard.blackMaterial
+        if white["P"] or white["R"] or white["Q"] or black["p"] or black["r"] or black["q"]:
+            return False
+        if white["B"] + white["N"] + black["b"] + black["n"] <= 1:
+            return True
+        if white["N"] or black["n"]:
+            return False
+        bishopSquareColors = {SQUARE_COLORS[square] for square,piece in enumerate(self.chessboard.board) if piece and type(piece.pieceType) == Bishop}
+        return len(bishopSquareColors) == 1
         
-    def addPosition(self,posToAdd):
-        self.previousPositions.append(posToAdd)
\ No newline at end of file
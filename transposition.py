@@ -0,0 +1,211 @@
+"""
+Fixed size transposition table for the engine, indexed by the Zobrist key of the positions. It remembers the result
+of every position searched, so a position reached again through another move order (a transposition) or by the next
+iteration of the iterative deepening is not searched twice, and its best move is tried first.
+
+The table is one block of memory allocated once, so storing an entry never allocates memory, and the block can be
+shared between processes (see parallel.py). Every slot is two 64 bit words: the packed entry, and the Zobrist key
+XORed with it. A slot only matches a key if both words were written by the same store, so a slot half written by
+another process is taken as empty instead of returning the score of another position. The slots are grouped in pairs
+(buckets): the first slot keeps the deepest search (depth preferred), the second one keeps the latest search that
+didnt fit in the first one (always replace)
+"""
+from moveGenerator import Move
+
+#Types of score, the search returns the exact score only when it is inside the alpha-beta window
+EXACT = 0
+#The score is at least the stored one (the search failed high, beta cutoff)
+LOWER_BOUND = 1
+#The score is at most the stored one (the search failed low, no move raised alpha)
+UPPER_BOUND = 2
+
+DEFAULT_TABLE_SIZE = 16
+#Bytes per slot: key XOR entry (8), entry (8), generation (1)
+SLOT_BYTES = 17
+SLOTS_PER_BUCKET = 2
+#Moves are packed as fromSquare*64 + toSquare plus the promotion code times 4096. 0 is no move, a8a8 cant be played
+PROMOTION_CODES = {None: 0,"q": 1,"r": 2,"b": 3,"n": 4}
+PROMOTION_LETTERS = (None,"q","r","b","n")
+#Scores this far from MATE are mate scores, stored relative to the position instead of the root
+MATE_THRESHOLD = 100000 - 1000
+#Entries are packed in 64 bits: score + SCORE_OFFSET (32 bits), move (16 bits), depth (8 bits), bound (8 bits)
+SCORE_OFFSET = 1 << 31
+
+def tableBytes(sizeMB):
+    """
+    Returns the number of buckets of a table of sizeMB megabytes, the largest power of two that fits, and the
+        bytes of memory it takes
+    """
+    buckets = max(1,int(sizeMB * 1024 * 1024) // (SLOT_BYTES * SLOTS_PER_BUCKET))
+    buckets = 1 << (buckets.bit_length() - 1)
+    return buckets,buckets * SLOTS_PER_BUCKET * SLOT_BYTES
+
+def encodeMove(move):
+    """
+    Packs a move into a 16 bit number, 0 for None
+    """
+    if move == None:
+        return 0
+    return move.fromSquare*64 + move.toSquare + PROMOTION_CODES[move.promotion]*4096
+
+def decodeMove(code):
+    """
+    Unpacks a move packed by encodeMove
+    """
+    if code == 0:
+        return None
+    return Move((code >> 6) & 63,code & 63,PROMOTION_LETTERS[code >> 12])
+
+class TranspositionTable:
+    """
+    Transposition table of a fixed number of slots, two per bucket. The bucket of a position is given by the low bits
+        of its Zobrist key and the whole key is stored to tell positions of the same bucket apart
+
+    Attributes
+    ----------
+    bucketCount : int
+        The number of buckets, a power of two
+    mask : int
+        bucketCount - 1, the bits of the key that give the bucket
+    memory : memoryview
+        The bytes of the whole table
+    keys, entries, generations : memoryview
+        The fields of every slot as views of memory, slot i of the table is index i of each one
+    generation : int
+        The number of the current search, entries of older searches are replaced first
+    probes, hits : int
+        The lookups made and the ones that found their position, to measure the table
+
+    Methods
+    -------
+    probe(self,key,ply)
+        Returns the stored entry of a position, or None
+    store(self,key,depth,bound,score,move,ply)
+        Stores the result of a search
+    newSearch(self)
+        Ages the stored entries, called at the start of every search
+    clear(self)
+        Empties the table
+    """
+    def __init__(self,sizeMB = DEFAULT_TABLE_SIZE,buffer = None):
+        """
+        Parameters
+        ----------
+        sizeMB : float
+            The megabytes of memory of the table, rounded down to a power of two of buckets
+        buffer : buffer, optional
+            Writable memory of at least tableBytes(sizeMB) bytes to build the table on, e.g. memory shared between
+            processes. Defaults to None, which allocates it. The table doesnt clear it
+        """
+        if type(sizeMB) not in (int,float):
+            raise TypeError("sizeMB must be a number, current type is " + str(type(sizeMB)))
+        if sizeMB <= 0:
+            raise ValueError("sizeMB must be positive, current value is " + str(sizeMB))
+        self.bucketCount,size = tableBytes(sizeMB)
+        self.mask = self.bucketCount - 1
+        if buffer == None:
+            buffer = bytearray(size)
+        self.memory = memoryview(buffer).cast("B")
+        if len(self.memory) < size:
+            raise ValueError("The buffer has {} bytes, the table needs {}".format(len(self.memory),size))
+        slots = self.bucketCount * SLOTS_PER_BUCKET
+        self.keys = self.memory[:8 * slots].cast("Q")
+        self.entries = self.memory[8 * slots:16 * slots].cast("Q")
+        self.generations = self.memory[16 * slots:17 * slots]
+        self.generation = 1
+        self.probes = 0
+        self.hits = 0
+
+    def newSearch(self):
+        """
+        Starts a new generation of entries. Deep entries of older searches no longer protect their slot
+        """
+        self.generation = self.generation % 255 + 1
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        """
+        Empties every slot of the table
+        """
+        self.memory[:] = bytes(len(self.memory))
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self,key,ply):
+        """
+        Looks up a position in its bucket
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist key of the position
+        ply : int
+            The distance of the position to the root, to convert mate scores back
+
+        Returns
+        --------
+        tuple
+            (depth, bound, score, move) of the stored search, move can be None. None if the position isnt stored
+        """
+        self.probes += 1
+        slot = (key & self.mask) * SLOTS_PER_BUCKET
+        entry = self.entries[slot]
+        if self.keys[slot] ^ entry != key:
+            slot += 1
+            entry = self.entries[slot]
+            if self.keys[slot] ^ entry != key:
+                return None
+        self.hits += 1
+        score = (entry >> 32) - SCORE_OFFSET
+        if score > MATE_THRESHOLD:
+            score -= ply
+        elif score < -MATE_THRESHOLD:
+            score += ply
+        return ((entry >> 8) & 255,entry & 255,score,decodeMove((entry >> 16) & 65535))
+
+    def store(self,key,depth,bound,score,move,ply):
+        """
+        Stores the result of a search in the depth preferred slot of the bucket if its deeper than the entry there
+            (or that entry is from an older search or the same position), and in the always replace slot otherwise
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist key of the position
+        depth : int
+            The depth searched
+        bound : int
+            EXACT, LOWER_BOUND or UPPER_BOUND
+        score : int
+            The score found
+        move : Move
+            The best move found, None if there isnt one. If the position is already stored, its move is kept
+        ply : int
+            The distance of the position to the root. Mate scores are stored as the distance from the position
+        """
+        slot = (key & self.mask) * SLOTS_PER_BUCKET
+        keys = self.keys
+        entries = self.entries
+        entry = entries[slot]
+        if not (keys[slot] ^ entry == key or depth >= (entry >> 8) & 255 or self.generations[slot] != self.generation):
+            slot += 1
+            entry = entries[slot]
+        if move == None and keys[slot] ^ entry == key:
+            code = (entry >> 16) & 65535
+        else:
+            code = encodeMove(move)
+        if score > MATE_THRESHOLD:
+            score += ply
+        elif score < -MATE_THRESHOLD:
+            score -= ply
+        entry = (score + SCORE_OFFSET) << 32 | code << 16 | depth << 8 | bound
+        keys[slot] = key ^ entry
+        entries[slot] = entry
+        self.generations[slot] = self.generation
+
+    def usage(self):
+        """
+        Returns the fraction of slots filled by the current search
+        """
+        return self.generations.tobytes().count(self.generation) / len(self.generations)
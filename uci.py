@@ -0,0 +1,247 @@
+"""
+UCI (Universal Chess Interface) front end of the engine, so it can be used from any chess GUI or match runner. The
+GUI writes commands to the standard input one per line and reads the answers from the standard output.
+
+The commands are read as a stream while the engine searches on a worker thread, so "stop", "isready" and "quit"
+are answered during a search. Supported commands:
+    uci                                         Identifies the engine, answers uciok
+    isready                                     Answers readyok
+    ucinewgame                                  Forgets the previous game (transposition table, history)
+    setoption name Hash value <MB>              Size of the transposition table
+    setoption name BitbasePath value <dir>      Directory of the endgame bitbases made by bitbase.py
+    position startpos|fen <FEN> [moves ...]     Sets the position, moves in coordinate notation (e2e4, e7e8q)
+    go [depth N] [movetime ms] [wtime ms btime ms winc ms binc ms movestogo N] [infinite]
+    stop                                        Stops the search, the best move so far is played
+    quit
+
+Usage, from the root of the repository:
+    python uci.py
+    python uci.py --bitbases bitbases
+"""
+import sys
+import argparse
+import threading
+from chessboard import Chessboard
+from moveGenerator import legalMoves
+from location import SQUARE_INDICES,START_FEN,moveToString
+from engine import Engine,MAX_PLY,scoreToString
+from transposition import TranspositionTable,DEFAULT_TABLE_SIZE
+from bitbase import Bitbases
+
+ENGINE_NAME = "Chess-Part-2"
+ENGINE_AUTHOR = "Voranto"
+#Time budget of searches that only stop with "stop" or their depth
+UNLIMITED_TIME = 10**9
+#Moves the remaining time is shared between when the GUI doesnt say it
+DEFAULT_MOVES_TO_GO = 30
+#Milliseconds kept back for the communication with the GUI
+MOVE_OVERHEAD = 50
+
+class UCIInterface:
+    """
+    Reads UCI commands from a stream and writes the answers to another one
+
+    Attributes
+    ----------
+    engine : Engine
+        The engine that searches
+    chessboard : Chessboard
+        The position set by the last position command
+    searchThread : threading.Thread
+        The thread of the running search, None if there isnt one
+    input, output : file
+        The streams the commands are read from and the answers written to
+
+    Methods
+    -------
+    run(self)
+        Reads and executes commands until quit or the end of the input
+    execute(self,line)
+        Executes one command, returns False for quit
+    """
+    def __init__(self,input = sys.stdin,output = sys.stdout,bitbases = None):
+        self.input = input
+        self.output = output
+        self.outputLock = threading.Lock()
+        self.engine = Engine(UNLIMITED_TIME,report = self.reportIteration,bitbases = bitbases)
+        self.chessboard = Chessboard(8,8)
+        self.chessboard.FENToBoard(START_FEN)
+        self.searchThread = None
+
+    def send(self,line):
+        """
+        Writes one line for the GUI. Both threads write, so lines are never mixed
+        """
+        with self.outputLock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self):
+        for line in self.input:
+            if not self.execute(line):
+                break
+        self.stopSearch()
+
+    def execute(self,line):
+        """
+        Executes one command. Unknown commands are ignored, as UCI says
+
+        Returns
+        --------
+        bool
+            False if the command was quit
+        """
+        words = line.split()
+        if not words:
+            return True
+        command,arguments = words[0],words[1:]
+        if command == "uci":
+            self.send("id name " + ENGINE_NAME)
+            self.send("id author " + ENGINE_AUTHOR)
+            self.send("option name Hash type spin default {} min 0 max 4096".format(DEFAULT_TABLE_SIZE))
+            self.send("option name BitbasePath type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stopSearch()
+            if self.engine.table:
+                self.engine.table.clear()
+            self.engine.history = {"white": [0]*4096,"black": [0]*4096}
+        elif command == "setoption":
+            self.stopSearch()
+            self.setOption(arguments)
+        elif command == "position":
+            self.stopSearch()
+            self.setPosition(arguments)
+        elif command == "go":
+            self.stopSearch()
+            self.go(arguments)
+        elif command == "stop":
+            self.stopSearch()
+        elif command == "quit":
+            return False
+        return True
+
+    def setOption(self,arguments):
+        if "name" not in arguments or "value" not in arguments:
+            return
+        name = " ".join(arguments[arguments.index("name") + 1:arguments.index("value")]).lower()
+        value = " ".join(arguments[arguments.index("value") + 1:])
+        if name == "hash":
+            try:
+                size = float(value)
+            except ValueError:
+                return
+            self.engine.table = TranspositionTable(size) if size > 0 else None
+        elif name == "bitbasepath":
+            if self.engine.bitbases:
+                self.engine.bitbases.close()
+            self.engine.bitbases = Bitbases(value) if value and value != "<empty>" else None
+
+    def setPosition(self,arguments):
+        """
+        Sets the position of "position startpos|fen <FEN> [moves ...]". The moves are played with makeMove, so the
+            engine knows the repetitions of the game. Stops at the first move that isnt legal
+        """
+        if not arguments:
+            return
+        movesIndex = arguments.index("moves") if "moves" in arguments else len(arguments)
+        if arguments[0] == "startpos":
+            FEN = START_FEN
+        elif arguments[0] == "fen":
+            FEN = " ".join(arguments[1:movesIndex])
+        else:
+            return
+        chessboard = Chessboard(8,8)
+        try:
+            chessboard.FENToBoard(FEN)
+        except (ValueError,TypeError) as error:
+            self.send("info string invalid FEN: {}".format(error))
+            return
+        for text in arguments[movesIndex + 1:]:
+            move = self.parseMove(chessboard,text)
+            if move == None:
+                self.send("info string illegal move: " + text)
+                break
+            chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+        self.chessboard = chessboard
+
+    def parseMove(self,chessboard,text):
+        """
+        Returns the legal Move of a move in coordinate notation, None if it isnt legal
+        """
+        fromSquare = SQUARE_INDICES.get(text[:2])
+        toSquare = SQUARE_INDICES.get(text[2:4])
+        promotion = text[4:5] or None
+        for move in legalMoves(chessboard):
+            if move.fromSquare == fromSquare and move.toSquare == toSquare and move.promotion == promotion:
+                return move
+        return None
+
+    def go(self,arguments):
+        """
+        Starts a search of the current position on the worker thread with the limits of a go command
+        """
+        limits = {}
+        for i,word in enumerate(arguments[:-1]):
+            if word in ("depth","movetime","wtime","btime","winc","binc","movestogo"):
+                try:
+                    limits[word] = int(arguments[i + 1])
+                except ValueError:
+                    pass
+        self.engine.maxDepth = max(1,min(limits.get("depth",MAX_PLY - 1),MAX_PLY - 1))
+        self.engine.timeBudget = self.timeBudget(limits,"infinite" in arguments)
+        self.searchThread = threading.Thread(target = self.search,daemon = True)
+        self.searchThread.start()
+
+    def timeBudget(self,limits,infinite):
+        """
+        Returns the seconds of a search: movetime if given, else a share of the remaining time plus half the
+            increment, and no limit for go infinite, go depth or a go without limits
+        """
+        if infinite:
+            return UNLIMITED_TIME
+        if "movetime" in limits:
+            return max(1,limits["movetime"] - MOVE_OVERHEAD) / 1000
+        white = self.chessboard.toMove == "white"
+        remaining = limits.get("wtime" if white else "btime")
+        if remaining == None:
+            return UNLIMITED_TIME
+        increment = limits.get("winc" if white else "binc",0)
+        movesToGo = limits.get("movestogo",DEFAULT_MOVES_TO_GO)
+        budget = remaining / max(1,movesToGo) + increment / 2
+        return max(1,min(budget,remaining - MOVE_OVERHEAD)) / 1000
+
+    def search(self):
+        result = self.engine.search(self.chessboard)
+        self.send("bestmove " + (moveToString(result.move) if result.move else "0000"))
+
+    def reportIteration(self,result):
+        """
+        Sends the info line of a completed iteration of the search
+        """
+        milliseconds = int(result.elapsed * 1000)
+        nodesPerSecond = int(result.nodes / result.elapsed) if result.elapsed else 0
+        self.send("info depth {} score {} nodes {} nps {} time {} pv {}".format(result.depth,scoreToString(result.score),result.nodes,nodesPerSecond,milliseconds,moveToString(result.move)))
+
+    def stopSearch(self):
+        """
+        Stops the running search and waits for it to send its best move. The stop is repeated until the thread
+            ends, in case it came before the search started
+        """
+        if self.searchThread:
+            while self.searchThread.is_alive():
+                self.engine.stop()
+                self.searchThread.join(0.05)
+            self.searchThread = None
+
+def main():
+    parser = argparse.ArgumentParser(description = "UCI front end of the engine")
+    parser.add_argument("--bitbases",help = "directory of the endgame bitbases made by bitbase.py")
+    arguments = parser.parse_args()
+    UCIInterface(bitbases = Bitbases(arguments.bitbases) if arguments.bitbases else None).run()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
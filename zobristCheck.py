@@ -0,0 +1,101 @@
+"""
+Checks the Zobrist key that Chessboard.makeMove and unmakeMove update incrementally: random games are played from
+the reference positions of perft.py, and after every move and every move taken back the key must be the one
+Chessboard.computeZobristKey calculates from scratch. A key that drifts makes the transposition table and the
+repetition counts wrong without any error, so this catches it at the move where it happens.
+
+Usage, from the root of the repository:
+    python zobristCheck.py                          100 random games of up to 200 plies
+    python zobristCheck.py --games 1000 --seed 7    More games, with another seed
+"""
+import argparse
+import random
+import time
+from chessboard import Chessboard
+from moveGenerator import legalMoves
+from location import moveToString
+from perft import REFERENCE_POSITIONS
+
+def checkKey(chessboard,history,action):
+    """
+    Compares the incremental Zobrist key of a board with the one calculated from scratch
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The board to check
+    history : list<Move>
+        The moves played from the starting position, to report where the keys differ
+    action : str
+        What was just done, "makeMove" or "unmakeMove"
+
+    Raises
+    -------
+    AssertionError
+        If the keys differ
+    """
+    expected = chessboard.computeZobristKey()
+    assert chessboard.zobristKey == expected, "zobristKey {:016x} != computeZobristKey {:016x} after {} with moves {}".format(
+        chessboard.zobristKey,expected,action," ".join(moveToString(move) for move in history))
+
+def playRandomGame(chessboard,generator,maxPlies):
+    """
+    Plays random legal moves until the game ends or maxPlies, then takes them all back, checking the key after
+        every makeMove and unmakeMove
+
+    Parameters
+    ----------
+    chessboard : Chessboard
+        The board to play on, it is back at its starting position at the end
+    generator : random.Random
+        The source of the random moves
+    maxPlies : int
+        The most moves played
+
+    Returns
+    --------
+    int
+        The number of moves played
+    """
+    history = []
+    checkKey(chessboard,history,"FENToBoard")
+    for _ in range(maxPlies):
+        moves = legalMoves(chessboard)
+        if not moves:
+            break
+        move = generator.choice(moves)
+        #Every promotion piece is a move of its own, so all of them get played
+        chessboard.makeMove(move.fromSquare,move.toSquare,move.promotion or "q")
+        history.append(move)
+        checkKey(chessboard,history,"makeMove")
+    plies = len(history)
+    while history:
+        chessboard.unmakeMove()
+        history.pop()
+        checkKey(chessboard,history,"unmakeMove")
+    return plies
+
+def main():
+    parser = argparse.ArgumentParser(description = "Checks the incremental Zobrist key against computeZobristKey over random games")
+    parser.add_argument("--games",type = int,default = 100,help = "number of random games, spread over the perft reference positions")
+    parser.add_argument("--moves",type = int,default = 200,help = "most plies played in every game")
+    parser.add_argument("--seed",type = int,default = 0,help = "seed of the random moves, to replay a failure")
+    arguments = parser.parse_args()
+
+    generator = random.Random(arguments.seed)
+    chessboard = Chessboard(8,8)
+    start = time.perf_counter()
+    checks = 0
+    for game in range(arguments.games):
+        name,FEN,_ = REFERENCE_POSITIONS[game % len(REFERENCE_POSITIONS)]
+        chessboard.FENToBoard(FEN)
+        try:
+            checks += 2 * playRandomGame(chessboard,generator,arguments.moves) + 1
+        except AssertionError as error:
+            print("Game {} from {}: {}".format(game,name,error))
+            return 1
+    print("{} games, {} keys checked in {:.2f}s, all equal".format(arguments.games,checks,time.perf_counter() - start))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())